@@ -1,62 +1,93 @@
+import io
+import mimetypes
 import os
-from flask import Flask, request, jsonify, send_from_directory
+import re
+import click
+from flask import Flask, request, jsonify, send_file, send_from_directory
 from flask_cors import CORS
 from flask_migrate import Migrate
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_socketio import SocketIO, emit, join_room, leave_room
-from werkzeug.utils import secure_filename
-from PIL import Image
+from werkzeug.utils import safe_join, secure_filename, send_file as send_file_with_environ
 import uuid
 import random
-import smtplib
 import jwt
 import bcrypt
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 from datetime import datetime, timedelta, timezone
 from sqlalchemy import text
 
 from config import Config
-from models import db, User, Issue, Vote, Notification, StatusHistory, AdminComment
-from auth import token_required, admin_required, optional_auth, get_supabase_client, get_supabase_service_client
+from maintenance import compact_notifications, reconcile_issue_stats, reconcile_notification_counters, repair_vote_counts
+from db_pool import engine_options, pool_monitor, replica_binds, statement_timeout
+from db_routing import read_replica, replica_router
+from models import db, User, Issue, Vote, Notification, NotificationCounter, NotificationSummary, Subscription, StatusHistory, AdminComment
+from serializers import serialize_issues
+from pagination import InvalidCursor, clamp_per_page, count_cache, keyset_paginate
+from search import apply_search, ensure_search_index
+from stats import dashboard_stats, ensure_issue_stats
+from notifications import ensure_notification_counters, mark_read, unread_count
+from fanout import InvalidSubscription, follow, notification_fanout, subscription_target, unfollow_voted_issue
+from changes import TokenExpired, changes_since, current_token, ensure_change_log, prune_changes
+from events import broker, stream_events
+from event_bus import create_bus
+from conditional import conditional_stats, feed_watermark, make_etag, normalized_args, not_modified_response, with_etag
+from response_cache import create_cache_backend, feed_cache, feed_scope
+from image_pipeline import image_pipeline
+from image_store import delete_orphaned_blobs, release_blob
+from image_variants import MAX_SOURCE_BYTES, VARIANT_FORMATS, InvalidVariant, render_variant, variant_cache, variant_spec
+from storage import StorageNotFound, storage
+from static_assets import build_assets, static_assets
+from email_service import mail_queue
+import rate_limit_storage  # Registers the sqlite:// scheme for RATELIMIT_STORAGE_URI
+from auth import token_required, admin_required, admin_token_required, admin_token_cache, user_token_cache, optional_auth, get_supabase_client, identify_stream_token
 
 # Global SocketIO instance (initialized in create_app)
 socketio = None
 
 
+def publish_status_change(issue, new_status, message):
+    """Push status_update to the reporter and admin_update to the district's admins"""
+    try:
+        broker.publish('status_update', {
+            'issue_id': issue.id,
+            'new_status': new_status,
+            'message': message,
+            'title': issue.title
+        }, audience='user', user_id=issue.user_id)
+
+        broker.publish('admin_update', {
+            'type': 'status_change',
+            'message': f"Issue #{issue.id} status changed to {new_status}",
+            'issue_id': issue.id,
+            'new_status': new_status
+        }, audience='admins', district=issue.district)
+    except Exception as event_error:
+        print(f"Event publish error (non-critical): {event_error}")
+
+def publish_notification(notification):
+    """Push a freshly committed Notification row to its recipient's event stream"""
+    try:
+        broker.publish('notification', notification.to_dict(), audience='user', user_id=notification.user_id)
+    except Exception as event_error:
+        print(f"Event publish error (non-critical): {event_error}")
+
+def notify_followers(issue, new_status):
+    """Queue a notification for everyone following the issue, its sector or its district (reporter excluded)"""
+    try:
+        notification_fanout.submit(
+            issue, "Followed issue update", f"Issue '{issue.title}' is now {new_status}.",
+            exclude_user_ids=(issue.user_id,)
+        )
+    except Exception as fanout_error:
+        print(f"Follower notification error (non-critical): {fanout_error}")
+
 def generate_verification_code():
     return str(random.randint(100000, 999999))
 
 def send_verification_email(email, code, username):
-    """Send verification code email to user"""
+    """Queue a verification code email for the user"""
     try:
-        print(f"=== SENDING EMAIL TO {email} ===")
-        
-        # Email configuration (you'll need to set these in your .env file)
-        smtp_server = os.environ.get('SMTP_SERVER', 'smtp.gmail.com')
-        smtp_port = int(os.environ.get('SMTP_PORT', '587'))
-        smtp_username = os.environ.get('SMTP_USERNAME')
-        smtp_password = os.environ.get('SMTP_PASSWORD')
-        from_email = os.environ.get('FROM_EMAIL', smtp_username)
-        
-        print(f"SMTP Config - Server: {smtp_server}, Port: {smtp_port}")
-        print(f"SMTP Username: {smtp_username}")
-        print(f"From Email: {from_email}")
-        print(f"SMTP Password configured: {'Yes' if smtp_password else 'No'}")
-        
-        if not smtp_username or not smtp_password:
-            print("SMTP credentials not configured. Email not sent.")
-            return False
-        
-        # Create message
-        print("Creating email message...")
-        msg = MIMEMultipart()
-        msg['From'] = from_email
-        msg['To'] = email
-        msg['Subject'] = "CivicFix - Email Verification Code"
-        
-        # Email body
         body = f"""
         Hello {username},
         
@@ -74,28 +105,12 @@ def send_verification_email(email, code, username):
         CivicFix Team
         """
         
-        msg.attach(MIMEText(body, 'plain'))
-        print("Email message created successfully")
-        
-        # Send email
-        print("Connecting to SMTP server...")
-        server = smtplib.SMTP(smtp_server, smtp_port)
-        print("Starting TLS...")
-        server.starttls()
-        print("Logging in to SMTP server...")
-        server.login(smtp_username, smtp_password)
-        print("Sending email...")
-        text = msg.as_string()
-        server.sendmail(from_email, email, text)
-        server.quit()
-        
-        print(f"Verification email sent successfully to {email}")
-        return True
+        # Delivered by the background mail senders (see email_service.py)
+        return mail_queue.enqueue(email, "CivicFix - Email Verification Code", text_body=body)
         
     except Exception as e:
-        print(f"ERROR sending email: {e}")
-        import traceback
-        traceback.print_exc()
+        db.session.rollback()
+        print(f"ERROR queueing email: {e}")
         return False
 
 def create_app():
@@ -105,7 +120,11 @@ def create_app():
     app.config.from_object(Config)
     
     # Initialize extensions
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+    app.config['SQLALCHEMY_BINDS'] = replica_binds(app.config)
+    replica_router.init_app(app)
     db.init_app(app)
+    pool_monitor.init_app(app)
     migrate = Migrate(app, db)
     
     # Initialize Socket.IO on the same app/port to avoid conflicts
@@ -122,6 +141,23 @@ def create_app():
     #     socketio_logger=False
     # )
     
+    # Verified admin dashboard and citizen tokens
+    for token_cache in (admin_token_cache, user_token_cache):
+        token_cache.configure(
+            max_entries=app.config['AUTH_CACHE_MAX_ENTRIES'],
+            max_ttl=app.config['AUTH_CACHE_MAX_TTL']
+        )
+    
+    # Real-time events go through the configured bus so every worker can deliver them
+    broker.configure(create_bus(app.config['EVENT_BUS_URL']))
+    
+    # Serialized /api/issues pages; use a shared backend when running several workers
+    feed_cache.configure(create_cache_backend(
+        app.config['FEED_CACHE_URL'],
+        max_entries=app.config['FEED_CACHE_MAX_ENTRIES'],
+        max_bytes=app.config['FEED_CACHE_MAX_BYTES']
+    ))
+    
     # Configure CORS - Allow all origins for development
     CORS(app, origins="*", allow_headers=["Content-Type", "Authorization"], methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"])
     
@@ -132,6 +168,98 @@ def create_app():
     )
     limiter.init_app(app)
     
+    @app.cli.command('rebuild-search-index')
+    def rebuild_search_index_command():
+        """Create or rebuild the full-text search index for issues"""
+        with db.engine.begin() as connection:
+            if ensure_search_index(connection):
+                print(f"Search index ready ({connection.dialect.name})")
+    
+    @app.cli.command('install-change-log')
+    def install_change_log_command():
+        """Create the triggers that feed the issue delta-sync change log"""
+        with db.engine.begin() as connection:
+            if ensure_change_log(connection):
+                print(f"Change log triggers ready ({connection.dialect.name})")
+    
+    @app.cli.command('prune-change-log')
+    @click.option('--days', default=7, show_default=True, help='Days of changes to keep')
+    def prune_change_log_command(days):
+        """Delete old issue change-log rows (expired sync tokens must resync)"""
+        print(f"Removed {prune_changes(retention_days=days)} change-log rows")
+    
+    @app.cli.command('repair-vote-counts')
+    @click.option('--batch-size', default=500, show_default=True, help='Issues recounted per transaction')
+    def repair_vote_counts_command(batch_size):
+        """Recount drifted issues.vote_count values from the votes table"""
+        result = repair_vote_counts(batch_size=batch_size)
+        if result['repaired']:
+            feed_cache.clear()
+        print(f"Scanned {result['scanned']} issues, repaired {result['repaired']} vote counters in {result['seconds']}s")
+    
+    @app.cli.command('install-issue-stats')
+    def install_issue_stats_command():
+        """Create the triggers that maintain the dashboard issue counters"""
+        with db.engine.begin() as connection:
+            if ensure_issue_stats(connection):
+                print(f"Issue counter triggers ready ({connection.dialect.name})")
+        result = reconcile_issue_stats()
+        print(f"Issue counters backfilled: {result['repaired']} of {result['checked']} updated")
+    
+    @app.cli.command('reconcile-issue-stats')
+    def reconcile_issue_stats_command():
+        """Recount the dashboard issue counters from the issues table"""
+        result = reconcile_issue_stats()
+        print(f"Checked {result['checked']} counters, repaired {result['repaired']} in {result['seconds']}s")
+    
+    @app.cli.command('install-notification-counters')
+    def install_notification_counters_command():
+        """Create the triggers that maintain unread notification counters"""
+        with db.engine.begin() as connection:
+            if ensure_notification_counters(connection):
+                print(f"Unread notification triggers ready ({connection.dialect.name})")
+        result = reconcile_notification_counters()
+        print(f"Unread counters backfilled: {result['repaired']} of {result['checked']} updated")
+    
+    @app.cli.command('reconcile-notification-counters')
+    def reconcile_notification_counters_command():
+        """Recount unread notification counters from the notifications table"""
+        result = reconcile_notification_counters()
+        print(f"Checked {result['checked']} counters, repaired {result['repaired']} in {result['seconds']}s")
+    
+    @app.cli.command('compact-notifications')
+    @click.option('--days', type=int, default=None, help='Days of read notifications to keep [NOTIFICATION_RETENTION_DAYS]')
+    @click.option('--batch-size', type=int, default=None, help='Notifications deleted per transaction [NOTIFICATION_COMPACT_BATCH_SIZE]')
+    def compact_notifications_command(days, batch_size):
+        """Delete old read notifications in batches, keeping a per-user summary (run daily from cron)"""
+        result = compact_notifications(
+            retention_days=days if days is not None else app.config['NOTIFICATION_RETENTION_DAYS'],
+            batch_size=batch_size or app.config['NOTIFICATION_COMPACT_BATCH_SIZE'],
+            pause_seconds=app.config['NOTIFICATION_COMPACT_PAUSE_MS'] / 1000
+        )
+        print(f"Deleted {result['deleted']} read notifications of {result['users']} users "
+              f"in {result['batches']} batches, {result['seconds']}s")
+    
+    @app.cli.command('expire-pending-images')
+    @click.option('--max-age', default=3600, show_default=True, help='Seconds before a pending image counts as lost')
+    def expire_pending_images_command(max_age):
+        """Mark images stuck in pending as failed, delete orphaned spool files and image blobs"""
+        result = image_pipeline.expire_stale(max_age_seconds=max_age)
+        print(f"Failed {result['issues_failed']} pending images, removed {result['spool_files_removed']} spool files "
+              f"and {result['blobs_deleted']} orphaned image blobs")
+    
+    @app.cli.command('send-queued-emails')
+    def send_queued_emails_command():
+        """Deliver every queued email that is due, then exit"""
+        print(f"Sent or retried {mail_queue.flush()} queued emails")
+    
+    @app.cli.command('build-static')
+    def build_static_command():
+        """Fingerprint and pre-compress frontend-web into STATIC_BUILD_FOLDER"""
+        output_dir = os.path.join(app.root_path, app.config['STATIC_BUILD_FOLDER'])
+        manifest = build_assets(app.static_folder, output_dir)
+        print(f"Built {len(manifest['assets'])} fingerprinted assets in {output_dir}")
+    
     # Create upload directory
     upload_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), app.config['UPLOAD_FOLDER'])
     os.makedirs(upload_dir, exist_ok=True)
@@ -140,72 +268,135 @@ def create_app():
         return '.' in filename and \
                filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
     
-    def resize_image(image_path, max_size=(800, 600)):
-        """Resize image to reduce file size while maintaining quality"""
-        try:
-            with Image.open(image_path) as img:
-                img.thumbnail(max_size, Image.Resampling.LANCZOS)
-                img.save(image_path, optimize=True, quality=85)
-        except Exception as e:
-            print(f"Error resizing image: {e}")
+    # Object storage for images: local disk, Supabase Storage or S3-compatible (see storage.py)
+    storage.init_app(app)
     
-    def upload_to_supabase_storage(file, bucket_name='issue-images'):
-        """Upload image to Supabase Storage and return public URL"""
-        try:
-            print(f"[IMAGE UPLOAD] Starting upload for file: {file.filename}")
-            
-            supabase = get_supabase_service_client()
-            print(f"[IMAGE UPLOAD] Supabase service client initialized")
-            
-            # Generate unique filename
-            filename = secure_filename(file.filename)
-            filename = f"{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}_{filename}"
-            print(f"[IMAGE UPLOAD] Generated filename: {filename}")
-            
-            # Read file content
-            file_content = file.read()
-            print(f"[IMAGE UPLOAD] File size: {len(file_content)} bytes")
-            
-            # Reset file pointer for potential re-read
-            file.seek(0)
-            
-            # Upload to Supabase Storage
-            print(f"[IMAGE UPLOAD] Uploading to bucket: {bucket_name}")
-            response = supabase.storage.from_(bucket_name).upload(
-                path=filename,
-                file=file_content,
-                file_options={"content-type": file.content_type}
-            )
-            print(f"[IMAGE UPLOAD] Upload response: {response}")
-            
-            # Get public URL
-            public_url = supabase.storage.from_(bucket_name).get_public_url(filename)
-            print(f"[IMAGE UPLOAD] Public URL: {public_url}")
-            
-            if not public_url:
-                print(f"[IMAGE UPLOAD] ERROR: Failed to get public URL")
-                return None
-            
-            print(f"[IMAGE UPLOAD] SUCCESS: Image uploaded to {public_url}")
-            return public_url
-            
-        except Exception as e:
-            print(f"[IMAGE UPLOAD] ERROR: {str(e)}")
-            import traceback
-            print(f"[IMAGE UPLOAD] Traceback: {traceback.format_exc()}")
+    # Uploads are processed off the request path (see image_pipeline.py)
+    image_pipeline.init_app(app, storage)
+    
+    # Resized image variants rendered on demand
+    variant_cache.configure(
+        os.path.join(app.root_path, app.config['IMAGE_VARIANT_FOLDER']),
+        app.config['IMAGE_VARIANT_CACHE_BYTES']
+    )
+    
+    # Status changes are fanned out to followers in the background (see fanout.py)
+    notification_fanout.init_app(app)
+    
+    # Outbound email is queued and sent by background SMTP senders (see email_service.py)
+    mail_queue.init_app(app)
+    
+    # Fingerprinted, pre-compressed frontend assets (see static_assets.py)
+    static_assets.init_app(app, build=app.config['STATIC_BUILD_ON_STARTUP'])
+    
+    def spool_image_upload():
+        """Spool an allowed image from request.files to disk; returns (path, filename) or None"""
+        file = request.files.get('image')
+        if not file or not file.filename:
             return None
+        if not allowed_file(file.filename):
+            print(f"[IMAGE UPLOAD] File type not allowed: {file.filename}")
+            return None
+        return image_pipeline.spool(file)
     
     # Routes
     @app.route('/')
     def index():
         """Serve index.html for root path"""
-        return send_from_directory(app.static_folder, 'index.html')
+        return static_assets.response('index.html') or send_from_directory(app.static_folder, 'index.html')
     
     @app.route('/api/status')
     def api_status():
         """API status endpoint"""
         return jsonify({"status": "CivicFix API is operational"})
     
+    @app.route('/api/metrics/conditional')
+    def conditional_get_metrics():
+        """304 hit ratio of the polled feeds (per worker process)"""
+        return jsonify(conditional_stats.snapshot())
+    
+    # Real-time event stream (Server-Sent Events)
+    @app.route('/api/events/stream')
+    @limiter.exempt  # One long-lived connection per browser replaces polling
+    def event_stream():
+        """Stream new_issue, vote_update, status_update and admin_update events"""
+        if broker.connection_count() >= app.config['SSE_MAX_CONNECTIONS']:
+            # Keep streams from starving request threads; clients fall back to polling
+            response = jsonify({'error': 'Too many event streams, retry later'})
+            response.headers['Retry-After'] = '30'
+            return response, 503
+        
+        # EventSource cannot send headers, so the token may come as a query parameter
+        token = request.args.get('token')
+        auth_header = request.headers.get('Authorization', '')
+        if not token and auth_header.startswith('Bearer '):
+            token = auth_header.split(' ')[1]
+        user_id, is_admin, district = identify_stream_token(token)
+        
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        try:
+            last_event_id = int(last_event_id) if last_event_id else None
+        except ValueError:
+            last_event_id = None
+        
+        subscription, replay, resync = broker.subscribe(
+            user_id=user_id, is_admin=is_admin, district=district, last_event_id=last_event_id
+        )
+        stream = stream_events(
+            subscription, replay, resync,
+            heartbeat_seconds=app.config['SSE_HEARTBEAT_SECONDS'],
+            max_seconds=app.config['SSE_MAX_STREAM_SECONDS']
+        )
+        return app.response_class(stream, mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # Disable proxy buffering (nginx)
+        })
+    
+    @app.route('/api/metrics/cache')
+    def cache_metrics():
+        """Issue feed response cache statistics (per worker for the memory backend)"""
+        return jsonify(feed_cache.stats())
+    
+    @app.route('/api/metrics/auth')
+    def auth_metrics():
+        """Verified-token cache statistics (per worker process)"""
+        return jsonify({'admin': admin_token_cache.stats(), 'user': user_token_cache.stats()})
+    
+    @app.route('/api/metrics/images')
+    def image_metrics():
+        """Background image pipeline and storage statistics (per worker process)"""
+        return jsonify({**image_pipeline.stats(), 'storage': storage.stats()})
+    
+    @app.route('/api/metrics/image-variants')
+    def image_variant_metrics():
+        """Image variant disk cache statistics (per worker process)"""
+        return jsonify(variant_cache.stats())
+    
+    @app.route('/api/metrics/db')
+    def db_metrics():
+        """Connection pool state, checkout/timeout counters and replica routing (per worker process)"""
+        return jsonify(dict(pool_monitor.stats(), routing=replica_router.stats()))
+    
+    @app.route('/api/metrics/fanout')
+    def fanout_metrics():
+        """Follower notification fan-out statistics (per worker process)"""
+        return jsonify(notification_fanout.stats())
+    
+    @app.route('/api/metrics/email')
+    def email_metrics():
+        """Outbound email queue depth and delivery statistics (counters are per worker process)"""
+        return jsonify(mail_queue.stats())
+    
+    @app.route('/api/metrics/static')
+    def static_metrics():
+        """Pre-built static asset statistics (per worker process)"""
+        return jsonify(static_assets.stats())
+    
+    @app.route('/api/metrics/events')
+    def event_metrics():
+        """Event broker statistics (per worker process)"""
+        return jsonify(broker.stats())
+    
     # Email Verification Routes
     @app.route('/api/auth/send-verification', methods=['POST'])
     def send_verification():
@@ -306,6 +497,7 @@ def create_app():
                 user.is_email_verified = False
             
             db.session.commit()
+            user_token_cache.invalidate_user(user.id)
             print("User saved to database successfully")
             
             # SMTP is disabled - Supabase handles email confirmation
@@ -378,6 +570,7 @@ def create_app():
             user.verification_code = None
             user.verification_code_expires = None
             db.session.commit()
+            user_token_cache.invalidate_user(user.id)
             
             print("Email verified successfully")
             return jsonify({'message': 'Email verified successfully'})
@@ -465,6 +658,7 @@ def create_app():
             user.verification_code = None
             user.verification_code_expires = None
             db.session.commit()
+            user_token_cache.invalidate_user(user.id)
             
             print(f"[mark-verified] Email marked as verified: {email}")
             return jsonify({'message': 'Email marked as verified', 'is_verified': True}), 200
@@ -524,13 +718,15 @@ def create_app():
     # Issue routes
     @app.route('/api/issues', methods=['GET'])
     @limiter.exempt  # Exempt from rate limiting since this is polled frequently by auto-refresh
+    @statement_timeout()
     @optional_auth
+    @read_replica
     def get_issues():
         """Get all issues with optional filtering and search"""
         try:
             print(f"[GET /api/issues] Request received with args: {request.args}")
             page = request.args.get('page', 1, type=int)
-            per_page = request.args.get('per_page', 10, type=int)
+            per_page = clamp_per_page(request.args.get('per_page', 10, type=int), app.config['MAX_PER_PAGE'])
             status = request.args.get('status')
             category = request.args.get('category')
             province = request.args.get('province')
@@ -538,6 +734,29 @@ def create_app():
             sector = request.args.get('sector')
             search = request.args.get('search')
             
+            # Serve popular filter combinations straight from the response cache
+            cache_scope = feed_scope(province, district)
+            cache_key = make_etag('issues', normalized_args())
+            # A client that just wrote must see its write, not a page cached before it
+            use_cache = not replica_router.reads_primary()
+            cached = feed_cache.get(cache_scope, cache_key) if use_cache else None
+            if cached is not None:
+                etag, body = cached
+                not_modified = not_modified_response(etag, 'issues')
+                if not_modified is not None:
+                    return not_modified
+                return with_etag(app.response_class(body, mimetype='application/json'), etag)
+            # Captured before querying so a concurrent write keeps this page out of the cache
+            cache_generation = feed_cache.generation(cache_scope)
+            
+            def cached_page(payload, etag):
+                response = with_etag(jsonify(payload), etag)
+                # Replica pages may predate the latest invalidation, so they are never shared
+                if use_cache and not replica_router.served_by_replica():
+                    feed_cache.set(cache_scope, cache_key, cache_generation, etag,
+                                   response.get_data(), app.config['FEED_CACHE_TTL'])
+                return response
+            
             query = Issue.query
             
             if status:
@@ -554,40 +773,101 @@ def create_app():
                 # Filter by issue sector
                 query = query.filter(Issue.sector == sector)
             if search:
-                # Search in title, description, location fields
-                search_term = f"%{search}%"
-                query = query.filter(
-                    db.or_(
-                        Issue.title.ilike(search_term),
-                        Issue.description.ilike(search_term),
-                        Issue.street_address.ilike(search_term),
-                        Issue.landmark_reference.ilike(search_term),
-                        Issue.detailed_description.ilike(search_term),
-                        Issue.province.ilike(search_term),
-                        Issue.district.ilike(search_term),
-                        Issue.sector.ilike(search_term)
-                    )
+                # Full-text search in title, description, location fields. Results are ranked
+                # by relevance (optionally blended with votes) except in cursor mode, which
+                # keeps the (created_at, id) order.
+                query = apply_search(
+                    query, search,
+                    ranked='cursor' not in request.args,
+                    blend_votes=request.args.get('blend_votes', '').lower() in ('1', 'true', 'yes')
                 )
             
-            issues = query.order_by(Issue.created_at.desc()).paginate(
+            # Conditional GET: answer 304 from the filter watermark before loading any rows
+            etag = make_etag('issues', normalized_args(), feed_watermark(query))
+            not_modified = not_modified_response(etag, 'issues')
+            if not_modified is not None:
+                return not_modified
+            
+            # Opt-in keyset pagination: ?cursor= for the first page, then ?cursor=<next_cursor>
+            if 'cursor' in request.args:
+                items, next_cursor = keyset_paginate(query, request.args.get('cursor'), per_page)
+                response = {
+                    'issues': serialize_issues(items),
+                    'next_cursor': next_cursor,
+                    'per_page': per_page
+                }
+                if request.args.get('include_total', '').lower() in ('1', 'true', 'yes'):
+                    count_key = ('issues', status, category, province, district, sector, search)
+                    response['total'] = count_cache.get_or_count(count_key, query, app.config['COUNT_CACHE_TTL'])
+                print(f"[GET /api/issues] Returning {len(items)} issues (cursor mode)")
+                return cached_page(response, etag)
+            
+            # Newest first, after the relevance order when the search ranked the results; a
+            # search with nothing to rank (e.g. no word characters) gets this order alone
+            query = query.order_by(Issue.created_at.desc(), Issue.id.desc())
+            issues = query.paginate(
                 page=page, per_page=per_page, error_out=False
             )
             
             print(f"[GET /api/issues] Returning {len(issues.items)} issues")
-            return jsonify({
-                'issues': [issue.to_dict() for issue in issues.items],
+            return cached_page({
+                'issues': serialize_issues(issues.items),
                 'total': issues.total,
                 'pages': issues.pages,
                 'current_page': page
-            })
+            }, etag)
+        except InvalidCursor as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             print(f"[GET /api/issues] ERROR: {e}")
             import traceback
             traceback.print_exc()
             return jsonify({'error': str(e)}), 500
     
+    @app.route('/api/issues/changes', methods=['GET'])
+    @limiter.exempt  # Polled by feeds instead of re-downloading whole pages
+    @statement_timeout()
+    def get_issue_changes():
+        """Delta sync: issues created, updated, voted on or deleted since a token"""
+        try:
+            since = request.args.get('since', type=int)
+            limit = clamp_per_page(request.args.get('limit', 200, type=int), app.config['SYNC_MAX_CHANGES'], default=200)
+            
+            # No token yet: hand out the current head so the client can start syncing
+            if since is None:
+                return jsonify({'issues': [], 'tombstones': [], 'next_token': str(current_token()), 'has_more': False})
+            
+            issues, tombstones, next_token, has_more, retry_after = changes_since(
+                since,
+                district=request.args.get('district'),
+                province=request.args.get('province'),
+                limit=limit,
+                settle_seconds=app.config['SYNC_SETTLE_SECONDS']
+            )
+            
+            payload = {
+                'issues': serialize_issues(issues),
+                'tombstones': tombstones,
+                'next_token': str(next_token),
+                'has_more': has_more
+            }
+            if retry_after is None:
+                return jsonify(payload)
+            
+            # Newer changes are still settling: poll again after retry_after seconds
+            payload['retry_after'] = retry_after
+            response = jsonify(payload)
+            response.headers['Retry-After'] = str(retry_after)
+            return response
+        except TokenExpired:
+            return jsonify({'error': 'Sync token expired, reload the full feed', 'reset': True}), 410
+        except Exception as e:
+            print(f"[GET /api/issues/changes] ERROR: {e}")
+            return jsonify({'error': str(e)}), 500
+    
     @app.route('/api/issues/<int:issue_id>', methods=['GET'])
     @optional_auth
+    @read_replica
     def get_issue(issue_id):
         """Get single issue details"""
         issue = Issue.query.get_or_404(issue_id)
@@ -614,30 +894,6 @@ def create_app():
                 if not data.get(field):
                     return jsonify({'error': f'{field} is required'}), 400
             
-            # Handle image upload to Supabase Storage
-            image_url = None
-            print(f"[CREATE ISSUE] Checking for image in request.files")
-            print(f"[CREATE ISSUE] request.files keys: {list(request.files.keys())}")
-            
-            if 'image' in request.files:
-                file = request.files['image']
-                print(f"[CREATE ISSUE] Image file found: {file.filename}")
-                
-                if file and file.filename:
-                    print(f"[CREATE ISSUE] File has content, checking if allowed")
-                    if allowed_file(file.filename):
-                        print(f"[CREATE ISSUE] File type allowed, uploading to Supabase")
-                        # Upload to Supabase Storage
-                        image_url = upload_to_supabase_storage(file)
-                        if image_url:
-                            print(f"[CREATE ISSUE] Image uploaded successfully: {image_url}")
-                        else:
-                            print(f"[CREATE ISSUE] Warning: Image upload to Supabase failed, continuing without image")
-                    else:
-                        print(f"[CREATE ISSUE] File type not allowed: {file.filename}")
-            else:
-                print(f"[CREATE ISSUE] No image in request.files")
-            
             # Verify user is authenticated
             if not hasattr(request, 'current_user') or not request.current_user:
                 return jsonify({'error': 'User not authenticated'}), 401
@@ -645,6 +901,9 @@ def create_app():
             if not hasattr(request.current_user, 'id') or not request.current_user.id:
                 return jsonify({'error': 'Invalid user data'}), 401
             
+            # Spool the image to disk; it is processed and uploaded in the background
+            spooled_image = spool_image_upload()
+            
             # Create issue
             issue = Issue(
                 title=data['title'],
@@ -656,30 +915,33 @@ def create_app():
                 province=data.get('province', ''),
                 district=data.get('district', ''),
                 sector=data.get('sector', ''),
-                image_url=image_url,
+                image_status='pending' if spooled_image else None,
                 user_id=request.current_user.id
             )
             
             db.session.add(issue)
             db.session.commit()
+            feed_cache.invalidate_issues(issue)
+            
+            if spooled_image:
+                image_pipeline.submit(issue.id, *spooled_image)
             
-            # Notify admins and all connected clients about the new issue
-            # Socket.IO is disabled for production, so we skip real-time notifications
-            # try:
-            #     payload = {
-            #         'type': 'new_issue',
-            #         'message': f"New issue reported: {issue.title}",
-            #         'issue': issue.to_dict()
-            #     }
+            # Notify admins and all connected clients about the new issue (SSE stream)
+            try:
+                payload = {
+                    'type': 'new_issue',
+                    'message': f"New issue reported: {issue.title}",
+                    'issue': issue.to_dict()
+                }
 
-            #     # Existing behaviour: notify admins watching the dashboard
-            #     socketio.emit('admin_update', payload, room='admins')
+                # Notify admins of the issue's district watching the dashboard
+                broker.publish('admin_update', payload, audience='admins', district=issue.district)
 
-            #     # New behaviour: broadcast generic new_issue event to everyone
-            #     # (citizens on the main feed, admins, and any other listeners)
-            #     socketio.emit('new_issue', payload, broadcast=True)
-            # except Exception as socket_error:
-            #     print(f"SocketIO error (non-critical): {socket_error}")
+                # Broadcast generic new_issue event to everyone
+                # (citizens on the main feed, admins, and any other listeners)
+                broker.publish('new_issue', payload)
+            except Exception as event_error:
+                print(f"Event publish error (non-critical): {event_error}")
             
             return jsonify({
                 'message': 'Issue created successfully',
@@ -705,33 +967,39 @@ def create_app():
             if issue.user_id != request.current_user.id:
                 return jsonify({'error': 'You can only delete your own issues'}), 403
             
-            # Delete image from Supabase Storage if it exists and is a Supabase URL
-            if issue.image_url:
-                try:
-                    # Only delete if it's a Supabase Storage URL (starts with https://)
-                    if issue.image_url.startswith('https://'):
-                        # Extract the file path from the Supabase URL
-                        # URL format: https://ozaaasesvvjphzohfxoo.supabase.co/storage/v1/object/public/issue-images/filename
-                        # We need to extract just the filename
-                        url_parts = issue.image_url.split('/issue-images/')
-                        if len(url_parts) > 1:
-                            filename = url_parts[1]
-                            supabase = get_supabase_service_client()
-                            supabase.storage.from_('issue-images').remove([filename])
-                            print(f"[DELETE ISSUE] Deleted image from Supabase: {filename}")
-                except Exception as img_error:
-                    # Log the error but don't fail the entire delete operation
-                    print(f"[DELETE ISSUE] Warning: Could not delete image from Supabase: {str(img_error)}")
+            # Content-addressed images are shared: only the last reference deletes the object,
+            # and only once this transaction has committed
+            orphaned = []
+            legacy_filename = None
+            if issue.image_sha256:
+                if release_blob(issue.image_sha256):
+                    orphaned.append(issue.image_sha256)
+            # Legacy image uploaded before content addressing: its object is deleted after commit
+            elif issue.image_url:
+                prefix = storage.url_for('')
+                if issue.image_url.startswith(prefix):
+                    legacy_filename = issue.image_url[len(prefix):]
             
             # Delete associated votes first
             Vote.query.filter_by(issue_id=issue_id).delete()
+            Subscription.query.filter_by(target_type='issue', target_key=str(issue_id)).delete()
             
             # Delete associated notifications
             Notification.query.filter_by(issue_id=issue_id).delete()
             
             # Delete the issue
+            feed_scopes = (issue.province, issue.district)
             db.session.delete(issue)
             db.session.commit()
+            feed_cache.invalidate_issues(feed_scopes)
+            delete_orphaned_blobs(storage, orphaned)
+            if legacy_filename:
+                try:
+                    storage.delete(legacy_filename)
+                    print(f"[DELETE ISSUE] Deleted image from storage: {legacy_filename}")
+                except Exception as img_error:
+                    # Log the error but don't fail the entire delete operation
+                    print(f"[DELETE ISSUE] Warning: Could not delete image from storage: {str(img_error)}")
             
             return jsonify({'message': 'Issue deleted successfully'})
             
@@ -772,18 +1040,16 @@ def create_app():
             issue.detailed_description = detailed_description
             issue.updated_at = datetime.utcnow()
             
-            # Handle image upload if provided
-            if 'image' in request.files:
-                file = request.files['image']
-                if file and file.filename and allowed_file(file.filename):
-                    # Upload new image to Supabase Storage
-                    new_image_url = upload_to_supabase_storage(file)
-                    if new_image_url:
-                        issue.image_url = new_image_url
-                    else:
-                        print("Warning: Image upload to Supabase failed, keeping old image")
+            # A new image replaces the old one once the background pipeline has processed it
+            spooled_image = spool_image_upload()
+            if spooled_image:
+                issue.image_status = 'pending'
             
             db.session.commit()
+            feed_cache.invalidate_issues(issue)
+            
+            if spooled_image:
+                image_pipeline.submit(issue.id, *spooled_image)
             
             return jsonify({
                 'message': 'Issue updated successfully',
@@ -821,23 +1087,13 @@ def create_app():
                 db.session.add(notification)
             
             db.session.commit()
+            feed_cache.invalidate_issues(issue)
             
             # Send real-time notification to the issue reporter
-            # Socket.IO disabled - real-time notifications skipped
-            # if old_status != new_status:
-            #     socketio.emit('status_update', {
-            #         'message': f"Your issue '{issue.title}' status changed to {new_status}",
-            #         'issue_id': issue.id,
-            #         'new_status': new_status,
-            #         'issue': issue.to_dict()
-            #     }, room=f"user_{issue.user_id}")
-            #     
-            #     # Notify all admins about the status change
-            #     socketio.emit('admin_update', {
-            #         'type': 'status_change',
-            #         'message': f"Issue #{issue.id} status changed to {new_status}",
-            #         'issue': issue.to_dict()
-            #     }, room='admins')
+            if old_status != new_status:
+                publish_status_change(issue, new_status, f"Your issue '{issue.title}' status changed to {new_status}")
+                publish_notification(notification)
+                notify_followers(issue, new_status)
             
             return jsonify({
                 'message': 'Issue status updated successfully',
@@ -857,55 +1113,40 @@ def create_app():
         try:
             issue = Issue.query.get_or_404(issue_id)
             
-            # Check if user already voted
-            existing_vote = Vote.query.filter_by(
-                user_id=request.current_user.id,
-                issue_id=issue_id
-            ).first()
+            # Toggle the vote and update the denormalized counter in one step
+            action, vote_count = Vote.toggle(request.current_user.id, issue.id)
+            # Voters follow the issue they voted for
+            if action == 'voted':
+                follow(request.current_user.id, 'issue', str(issue.id), source='vote')
+            else:
+                unfollow_voted_issue(request.current_user.id, issue.id)
+            db.session.commit()
+            feed_cache.invalidate_issues(issue)
             
-            if existing_vote:
-                # Remove existing vote (unvote)
-                db.session.delete(existing_vote)
-                db.session.commit()
-                
-                # Send real-time vote update to all users
-                # Socket.IO disabled - real-time notifications skipped
-                # socketio.emit('vote_update', {
-                #     'issue_id': issue_id,
-                #     'vote_count': issue.vote_count,
-                #     'issue_owner_id': str(issue.user_id),  # Include issue owner ID for smart notifications
-                #     'message': f"Vote removed from issue #{issue_id}"
-                # })
-                
+            # Send real-time vote update to all users
+            try:
+                broker.publish('vote_update', {
+                    'issue_id': issue_id,
+                    'vote_count': vote_count,
+                    'issue_owner_id': str(issue.user_id),  # Include issue owner ID for smart notifications
+                    'message': f"Issue #{issue_id} received a new vote" if action == 'voted' else f"Vote removed from issue #{issue_id}"
+                })
+            except Exception as event_error:
+                print(f"Event publish error (non-critical): {event_error}")
+            
+            if action == 'unvoted':
                 return jsonify({
                     'message': 'Vote removed successfully',
                     'action': 'unvoted',
-                    'vote_count': issue.vote_count
-                })
-            else:
-                # Create new vote
-                vote = Vote(
-                    user_id=request.current_user.id,
-                    issue_id=issue_id
-                )
-                db.session.add(vote)
-                db.session.commit()
-                
-                # Send real-time vote update to all users
-                # Socket.IO disabled - real-time notifications skipped
-                # socketio.emit('vote_update', {
-                #     'issue_id': issue_id,
-                #     'vote_count': issue.vote_count,
-                #     'issue_owner_id': str(issue.user_id),  # Include issue owner ID for smart notifications
-                #     'message': f"Issue #{issue_id} received a new vote"
-                # })
-                
-                return jsonify({
-                    'message': 'Vote recorded successfully',
-                    'action': 'voted',
-                    'vote_count': issue.vote_count
+                    'vote_count': vote_count
                 })
             
+            return jsonify({
+                'message': 'Vote recorded successfully',
+                'action': 'voted',
+                'vote_count': vote_count
+            })
+            
         except Exception as e:
             db.session.rollback()
             return jsonify({'error': str(e)}), 500
@@ -954,6 +1195,7 @@ def create_app():
                 user.sector = data['sector']
             
             db.session.commit()
+            user_token_cache.invalidate_user(user.id)
             return jsonify({'message': 'Profile updated successfully'})
             
         except Exception as e:
@@ -969,7 +1211,7 @@ def create_app():
                                .order_by(Issue.created_at.desc()).all()
             
             return jsonify({
-                'issues': [issue.to_dict() for issue in issues],
+                'issues': serialize_issues(issues),
                 'total': len(issues)
             })
         except Exception as e:
@@ -977,6 +1219,7 @@ def create_app():
 
     @app.route('/api/user/stats', methods=['GET'])
     @token_required
+    @read_replica
     def get_user_stats():
         """Get current user's voting and activity statistics"""
         try:
@@ -1022,18 +1265,39 @@ def create_app():
             if not user:
                 return jsonify({'error': 'User not found'}), 404
             
-            # Delete user's votes
+            # Release the user's votes from the denormalized counters, then delete them
+            voted_issue_ids = db.session.query(Vote.issue_id).filter(Vote.user_id == user.id)
+            feed_scopes = db.session.query(Issue.province, Issue.district).filter(
+                (Issue.id.in_(voted_issue_ids)) | (Issue.user_id == user.id)
+            ).distinct().all()
+            Issue.query.filter(Issue.id.in_(voted_issue_ids)).update(
+                {Issue.vote_count: Issue.vote_count - 1, Issue.revision: Issue.revision + 1},
+                synchronize_session=False
+            )
             Vote.query.filter_by(user_id=user.id).delete()
+            Subscription.query.filter_by(user_id=user.id).delete()
             
             # Delete user's notifications
             Notification.query.filter_by(user_id=user.id).delete()
-            
-            # Delete user's issues
+            NotificationCounter.query.filter_by(user_id=user.id).delete()
+            NotificationSummary.query.filter_by(user_id=user.id).delete()
+            
+            # Release the images of the user's issues, then delete the issues
+            orphaned = []
+            for (image_sha256,) in db.session.query(Issue.image_sha256).filter(
+                Issue.user_id == user.id, Issue.image_sha256.isnot(None)
+            ).all():
+                if release_blob(image_sha256):
+                    orphaned.append(image_sha256)
             Issue.query.filter_by(user_id=user.id).delete()
             
             # Delete user
             db.session.delete(user)
             db.session.commit()
+            user_token_cache.invalidate_user(user.id)
+            admin_token_cache.invalidate_user(user.id)
+            feed_cache.invalidate_issues(*[tuple(scope) for scope in feed_scopes])
+            delete_orphaned_blobs(storage, orphaned)
             
             return jsonify({'message': 'Account deleted successfully'})
             
@@ -1043,16 +1307,39 @@ def create_app():
 
     # Notification routes
     @app.route('/api/notifications', methods=['GET'])
+    @statement_timeout()
     @token_required
+    @read_replica
     def get_notifications():
-        """Get user's notifications"""
-        notifications = Notification.query.filter_by(
-            user_id=request.current_user.id
-        ).order_by(Notification.created_at.desc()).all()
-        
-        return jsonify({
-            'notifications': [notification.to_dict() for notification in notifications]
-        })
+        """Get one page of the user's notifications, newest first (?cursor=, ?per_page=, ?unread=1)"""
+        try:
+            per_page = clamp_per_page(request.args.get('per_page', 20, type=int), app.config['MAX_PER_PAGE'], default=20)
+            query = Notification.query.filter(Notification.user_id == request.current_user.id)
+            if request.args.get('unread') in ('1', 'true'):
+                query = query.filter(Notification.read == False)
+            
+            notifications, next_cursor = keyset_paginate(query, request.args.get('cursor'), per_page, model=Notification)
+            
+            payload = {
+                'notifications': [notification.to_dict() for notification in notifications],
+                'next_cursor': next_cursor,
+                'unread_count': unread_count(request.current_user.id)
+            }
+            if not next_cursor:
+                # Last page: say how many older read notifications the retention job removed
+                summary = db.session.get(NotificationSummary, request.current_user.id)
+                payload['archived'] = summary.to_dict() if summary else None
+            return jsonify(payload)
+        except InvalidCursor as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/api/notifications/unread-count', methods=['GET'])
+    @token_required
+    def get_unread_notification_count():
+        """Number of unread notifications, from the per-user counter"""
+        return jsonify({'unread_count': unread_count(request.current_user.id)})
     
     @app.route('/api/notifications/<int:notification_id>/read', methods=['PATCH'])
     @token_required
@@ -1063,69 +1350,132 @@ def create_app():
             user_id=request.current_user.id
         ).first_or_404()
         
-        notification.is_read = True
+        notification.read = True
         db.session.commit()
         
         return jsonify({'message': 'Notification marked as read'})
     
+    @app.route('/api/notifications/mark-read', methods=['POST'])
+    @token_required
+    def mark_notifications_read():
+        """Mark several notifications as read in one UPDATE (?ids=1,2,3 or JSON {"ids": [...]})"""
+        try:
+            data = request.get_json(silent=True) or {}
+            ids = data.get('ids')
+            if ids is None:
+                ids = [part for part in request.args.get('ids', '').split(',') if part.strip()]
+            try:
+                ids = [int(notification_id) for notification_id in ids]
+            except (TypeError, ValueError):
+                return jsonify({'error': 'ids must be a list of notification ids'}), 400
+            if len(ids) > app.config['MAX_PER_PAGE']:
+                return jsonify({'error': f"At most {app.config['MAX_PER_PAGE']} ids per request"}), 400
+            
+            updated = mark_read(request.current_user.id, ids)
+            db.session.commit()
+            
+            return jsonify({'updated': updated, 'unread_count': unread_count(request.current_user.id)})
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/api/notifications/mark-all-read', methods=['POST'])
+    @token_required
+    def mark_all_notifications_read():
+        """Mark every notification of the user as read in one UPDATE"""
+        try:
+            updated = mark_read(request.current_user.id)
+            db.session.commit()
+            
+            return jsonify({'updated': updated, 'unread_count': unread_count(request.current_user.id)})
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 500
+    
+    # Subscription routes (following issues, sectors and districts)
+    @app.route('/api/subscriptions', methods=['GET'])
+    @token_required
+    def get_subscriptions():
+        """Everything the user follows"""
+        subscriptions = Subscription.query.filter_by(
+            user_id=request.current_user.id
+        ).order_by(Subscription.created_at.desc()).all()
+        
+        return jsonify({'subscriptions': [subscription.to_dict() for subscription in subscriptions]})
+    
+    @app.route('/api/subscriptions', methods=['POST'])
+    @token_required
+    def create_subscription():
+        """Follow an issue ({"type": "issue", "issue_id"}), a sector ({"type": "sector", "district", "sector"})
+        or a district ({"type": "district", "district"})"""
+        try:
+            target_type, target_key = subscription_target(request.get_json(silent=True) or {})
+            if target_type == 'issue' and not db.session.get(Issue, int(target_key)):
+                return jsonify({'error': 'Issue not found'}), 404
+            
+            follow(request.current_user.id, target_type, target_key)
+            db.session.commit()
+            
+            subscription = Subscription.query.filter_by(
+                user_id=request.current_user.id, target_type=target_type, target_key=target_key
+            ).first()
+            return jsonify({'subscription': subscription.to_dict()}), 201
+        except InvalidSubscription as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/api/subscriptions/<int:subscription_id>', methods=['DELETE'])
+    @token_required
+    def delete_subscription(subscription_id):
+        """Stop following"""
+        subscription = Subscription.query.filter_by(
+            id=subscription_id,
+            user_id=request.current_user.id
+        ).first_or_404()
+        
+        db.session.delete(subscription)
+        db.session.commit()
+        
+        return jsonify({'message': 'Unsubscribed successfully'})
+    
     # Admin routes
     @app.route('/api/admin/dashboard', methods=['GET'])
     @token_required
     @admin_required
     def admin_dashboard():
-        """Admin dashboard statistics"""
-        total_issues = Issue.query.count()
-        open_issues = Issue.query.filter_by(status='Open').count()
-        in_progress_issues = Issue.query.filter_by(status='In Progress').count()
-        resolved_issues = Issue.query.filter_by(status='Resolved').count()
+        """Admin dashboard statistics (optionally for one ?district=)"""
+        district = request.args.get('district')
+        
+        # Totals plus per-status, per-category and per-district breakdowns from the counter table
+        stats = dashboard_stats(district)
         
         # Get recent issues
-        recent_issues = Issue.query.order_by(Issue.created_at.desc()).limit(10).all()
+        recent_query = Issue.query
+        if district:
+            recent_query = recent_query.filter(Issue.district == district)
+        recent_issues = recent_query.order_by(Issue.created_at.desc(), Issue.id.desc()).limit(10).all()
         
         return jsonify({
-            'stats': {
-                'total_issues': total_issues,
-                'open_issues': open_issues,
-                'in_progress_issues': in_progress_issues,
-                'resolved_issues': resolved_issues
-            },
-            'recent_issues': [issue.to_dict() for issue in recent_issues]
+            'stats': stats,
+            'recent_issues': serialize_issues(recent_issues)
         })
     
     @app.route('/api/admin/issues', methods=['GET'])
     @limiter.exempt  # Exempt from rate limiting since this is polled frequently by auto-refresh
+    @statement_timeout()
+    @admin_token_required
+    @read_replica
     def admin_get_issues():
         """Admin view of issues filtered by their district"""
         try:
-            # Get JWT token from Authorization header
-            auth_header = request.headers.get('Authorization')
-            if not auth_header or not auth_header.startswith('Bearer '):
-                return jsonify({'error': 'Authorization token required'}), 401
-            
-            token = auth_header.split(' ')[1]
-            
-            try:
-                # Decode JWT token
-                payload = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
-                user_id = payload.get('user_id')
-                is_admin = payload.get('is_admin')
-                
-                if not user_id or not is_admin:
-                    return jsonify({'error': 'Admin access required'}), 403
-                    
-            except jwt.ExpiredSignatureError:
-                return jsonify({'error': 'Token has expired'}), 401
-            except jwt.InvalidTokenError:
-                return jsonify({'error': 'Invalid token'}), 401
-            
-            # Find the admin user
-            admin_user = User.query.filter_by(id=user_id, is_admin=True).first()
-            if not admin_user:
-                return jsonify({'error': 'Admin user not found'}), 404
+            # Verified by admin_token_required (cached per token)
+            admin_user = request.admin_user
             
             # Get query parameters
             page = request.args.get('page', 1, type=int)
-            per_page = request.args.get('per_page', 20, type=int)
+            per_page = clamp_per_page(request.args.get('per_page', 20, type=int), app.config['MAX_PER_PAGE'], default=20)
             status = request.args.get('status')
             category = request.args.get('category')
             
@@ -1140,63 +1490,55 @@ def create_app():
             if category:
                 query = query.filter(Issue.category == category)
             
+            # Conditional GET (same contract as /api/issues)
+            etag = make_etag('admin_issues', admin_district, normalized_args(), feed_watermark(query))
+            not_modified = not_modified_response(etag, 'admin_issues')
+            if not_modified is not None:
+                return not_modified
+            
+            # Opt-in keyset pagination (same contract as /api/issues)
+            if 'cursor' in request.args:
+                items, next_cursor = keyset_paginate(query, request.args.get('cursor'), per_page)
+                response = {
+                    'issues': serialize_issues(items, include_reporter_contact=True),
+                    'next_cursor': next_cursor,
+                    'per_page': per_page,
+                    'admin_district': admin_district
+                }
+                if request.args.get('include_total', '').lower() in ('1', 'true', 'yes'):
+                    count_key = ('admin_issues', admin_district, status, category)
+                    response['total'] = count_cache.get_or_count(count_key, query, app.config['COUNT_CACHE_TTL'])
+                return with_etag(jsonify(response), etag)
+            
             issues = query.order_by(Issue.created_at.desc()).paginate(
                 page=page, per_page=per_page, error_out=False
             )
             
-            # Convert to dict and add reporter info
-            issues_data = []
-            for issue in issues.items:
-                issue_dict = issue.to_dict()
-                # Add reporter info
-                reporter = User.query.get(issue.user_id)
-                if reporter:
-                    issue_dict['reporter_name'] = reporter.username
-                    issue_dict['reporter_phone'] = reporter.phone
-                    issue_dict['reporter_email'] = reporter.email
-                issues_data.append(issue_dict)
+            # Convert to dict and add reporter info (reporters loaded in one batch)
+            issues_data = serialize_issues(issues.items, include_reporter_contact=True)
             
-            return jsonify({
+            return with_etag(jsonify({
                 'issues': issues_data,
                 'total': issues.total,
                 'pages': issues.pages,
                 'current_page': page,
                 'admin_district': admin_district
-            })
+            }), etag)
             
+        except InvalidCursor as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             print(f"Admin get issues error: {e}")
             return jsonify({'error': str(e)}), 500
 
     @app.route('/api/admin/issues/<int:issue_id>', methods=['GET'])
+    @admin_token_required
+    @read_replica
     def get_issue_details(issue_id):
         """Get detailed information for a specific issue"""
         try:
-            # Get JWT token from Authorization header
-            auth_header = request.headers.get('Authorization')
-            if not auth_header or not auth_header.startswith('Bearer '):
-                return jsonify({'error': 'Authorization token required'}), 401
-            
-            token = auth_header.split(' ')[1]
-            
-            try:
-                # Decode JWT token
-                payload = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
-                user_id = payload.get('user_id')
-                is_admin = payload.get('is_admin')
-                
-                if not user_id or not is_admin:
-                    return jsonify({'error': 'Admin access required'}), 403
-                    
-            except jwt.ExpiredSignatureError:
-                return jsonify({'error': 'Token has expired'}), 401
-            except jwt.InvalidTokenError:
-                return jsonify({'error': 'Invalid token'}), 401
-            
-            # Find the admin user
-            admin_user = User.query.filter_by(id=user_id, is_admin=True).first()
-            if not admin_user:
-                return jsonify({'error': 'Admin user not found'}), 404
+            # Verified by admin_token_required (cached per token)
+            admin_user = request.admin_user
             
             # Get the issue (ensure it's in admin's district)
             issue = Issue.query.filter_by(id=issue_id, district=admin_user.district).first()
@@ -1239,34 +1581,12 @@ def create_app():
             return jsonify({'error': str(e)}), 500
 
     @app.route('/api/admin/issues/<int:issue_id>/update', methods=['PUT'])
+    @admin_token_required
     def admin_update_issue_with_timeline(issue_id):
         """Update issue status and add admin comment with automatic timeline tracking"""
         try:
-            # Get JWT token from Authorization header
-            auth_header = request.headers.get('Authorization')
-            if not auth_header or not auth_header.startswith('Bearer '):
-                return jsonify({'error': 'Authorization token required'}), 401
-            
-            token = auth_header.split(' ')[1]
-            
-            try:
-                # Decode JWT token
-                payload = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
-                user_id = payload.get('user_id')
-                is_admin = payload.get('is_admin')
-                
-                if not user_id or not is_admin:
-                    return jsonify({'error': 'Admin access required'}), 403
-                    
-            except jwt.ExpiredSignatureError:
-                return jsonify({'error': 'Token has expired'}), 401
-            except jwt.InvalidTokenError:
-                return jsonify({'error': 'Invalid token'}), 401
-            
-            # Find the admin user
-            admin_user = User.query.filter_by(id=user_id, is_admin=True).first()
-            if not admin_user:
-                return jsonify({'error': 'Admin user not found'}), 404
+            # Verified by admin_token_required (cached per token)
+            admin_user = request.admin_user
             
             # Get request data
             data = request.get_json()
@@ -1313,6 +1633,7 @@ def create_app():
             # Save all changes
             db.session.add(status_history)
             db.session.commit()
+            feed_cache.invalidate_issues(issue)
 
             # Create user-facing notification with friendly message
             try:
@@ -1334,6 +1655,10 @@ def create_app():
                 db.session.add(notification)
                 db.session.commit()
 
+                # Push real-time updates to the reporter and the district's admins
+                publish_status_change(issue, new_status, notif_message)
+                publish_notification(notification)
+
                 # Emit real-time update to the issue reporter if WebSocket is enabled
                 if socketio is not None:
                     socketio.emit('status_update', {
@@ -1346,6 +1671,10 @@ def create_app():
                 # Do not break the main flow if notification fails
                 print(f"Status update notification error: {notify_error}")
             
+            # Voters and sector/district subscribers are notified in the background
+            if old_status != new_status:
+                notify_followers(issue, new_status)
+            
             return jsonify({
                 'success': True,
                 'message': 'Issue updated successfully',
@@ -1362,10 +1691,93 @@ def create_app():
             return jsonify({'error': str(e)}), 500
     
     # File serving route
+    # Variants are addressed by content (unique filename + size + format), so they never change
+    def variant_response(path, fmt):
+        # The cache file name is a digest of the variant key; mtime changes on every LRU touch
+        etag = os.path.splitext(os.path.basename(path))[0]
+        response = send_file(path, mimetype=VARIANT_FORMATS[fmt][1], conditional=True, etag=etag, last_modified=None)
+        response.headers['Cache-Control'] = f"public, max-age={app.config['IMAGE_VARIANT_MAX_AGE']}, immutable"
+        return response
+    
+    # Uploads are never overwritten: content-addressed (<sha256>.<ext>) or timestamped (YYYYmmdd_HHMMSS_<name>)
+    content_addressed_upload = re.compile(r'^([0-9a-f]{64})\.[A-Za-z0-9]+$')
+    timestamped_upload = re.compile(r'^\d{8}_\d{6}_.+$')
+    
+    def send_upload(filename):
+        """Send an original upload with validators, Range support and, behind a proxy, X-Sendfile/X-Accel-Redirect"""
+        path = safe_join(upload_dir, filename)
+        if not path or not os.path.isfile(path):
+            return jsonify({'error': 'Not found'}), 404
+        
+        content_addressed = content_addressed_upload.match(filename)
+        immutable = content_addressed or timestamped_upload.match(filename)
+        mode = app.config['UPLOADS_SENDFILE']
+        if mode == 'x-accel-redirect':
+            # nginx serves the file from an internal location and answers Range and conditional requests itself
+            response = app.response_class(mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+            response.headers['X-Accel-Redirect'] = f"{app.config['UPLOADS_ACCEL_PREFIX'].rstrip('/')}/{filename}"
+        else:
+            environ = request.environ
+            if mode == 'x-sendfile':
+                # The proxy answers Range requests from the file itself; a 206 here would truncate its reply
+                environ = {key: value for key, value in environ.items() if key not in ('HTTP_RANGE', 'HTTP_IF_RANGE')}
+            response = send_file_with_environ(
+                path, environ,
+                use_x_sendfile=mode == 'x-sendfile',
+                response_class=app.response_class,
+                conditional=True,  # If-None-Match / If-Modified-Since -> 304, Range -> 206
+                # The content hash is a strong ETag that stays the same on every instance
+                etag=content_addressed.group(1) if content_addressed else True
+            )
+            response.headers['Accept-Ranges'] = 'bytes'
+        if immutable:
+            response.headers['Cache-Control'] = f"public, max-age={app.config['UPLOADS_MAX_AGE']}, immutable"
+        else:
+            response.headers['Cache-Control'] = 'no-cache'
+        return response
+    
     @app.route('/uploads/<filename>')
     def uploaded_file(filename):
-        """Serve uploaded files"""
-        return send_from_directory(upload_dir, filename)
+        """Serve uploaded files; ?w=<width>&fmt=webp|jpeg|png returns a resized variant"""
+        if 'w' not in request.args and 'fmt' not in request.args:
+            return send_upload(filename)
+        
+        try:
+            width, fmt = variant_spec(request.args.get('w', type=int), request.args.get('fmt'))
+            source = safe_join(upload_dir, filename)
+            if not source or not os.path.isfile(source):
+                return jsonify({'error': 'Not found'}), 404
+            
+            stat = os.stat(source)
+            key = ('upload', filename, stat.st_mtime_ns, stat.st_size, width, fmt)
+            path = variant_cache.get_or_render(key, fmt, lambda: render_variant(source, width, fmt))
+            return variant_response(path, fmt)
+        except InvalidVariant as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            print(f"[IMAGE VARIANT] ERROR rendering {filename}: {e}")
+            return jsonify({'error': 'Could not render image'}), 422
+    
+    @app.route('/api/images/stored/<filename>')
+    def stored_image_variant(filename):
+        """Resized variant of an image in the configured object storage"""
+        if secure_filename(filename) != filename:
+            return jsonify({'error': 'Not found'}), 404
+        
+        try:
+            width, fmt = variant_spec(request.args.get('w', type=int), request.args.get('fmt'))
+            key = ('stored', storage.name, filename, width, fmt)
+            path = variant_cache.get_or_render(
+                key, fmt, lambda: render_variant(io.BytesIO(storage.read(filename, MAX_SOURCE_BYTES)), width, fmt)
+            )
+            return variant_response(path, fmt)
+        except InvalidVariant as e:
+            return jsonify({'error': str(e)}), 400
+        except StorageNotFound:
+            return jsonify({'error': 'Not found'}), 404
+        except Exception as e:
+            print(f"[IMAGE VARIANT] ERROR rendering stored image {filename}: {e}")
+            return jsonify({'error': 'Could not render image'}), 422
     
     # Error handlers
     @app.errorhandler(404)
@@ -1662,6 +2074,7 @@ def create_app():
             existing_user.phone = '0795903950'
             
             db.session.commit()
+            admin_token_cache.invalidate_user(existing_user.id)
             
             print(f"Updated admin permissions for user: {existing_user.email}")
             return jsonify({
@@ -1762,6 +2175,10 @@ def create_app():
             old_status = issue.status
             issue.status = new_status
             db.session.commit()
+            feed_cache.invalidate_issues(issue)
+            
+            if old_status != new_status:
+                publish_status_change(issue, new_status, f"Your reported issue '{issue.title}' status has been updated to {new_status}")
             
             # Send real-time notification to all users
             # Socket.IO disabled - real-time notifications skipped
@@ -1793,6 +2210,9 @@ def create_app():
             )
             db.session.add(notification)
             db.session.commit()
+            publish_notification(notification)
+            if old_status != new_status:
+                notify_followers(issue, new_status)
             
             return jsonify({
                 'message': 'Status updated successfully',
@@ -1806,32 +2226,13 @@ def create_app():
 
     # Admin Profile Update Route
     @app.route('/api/admin/profile', methods=['PUT'])
+    @admin_token_required
     def update_admin_profile():
         try:
             data = request.get_json()
             
-            # Get JWT token from Authorization header
-            auth_header = request.headers.get('Authorization')
-            if not auth_header or not auth_header.startswith('Bearer '):
-                return jsonify({'error': 'Authorization token required'}), 401
-            
-            token = auth_header.split(' ')[1]
-            
-            try:
-                # Decode JWT token
-                payload = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
-                user_id = payload.get('user_id')
-                
-                if not user_id:
-                    return jsonify({'error': 'Invalid token'}), 401
-                    
-            except jwt.ExpiredSignatureError:
-                return jsonify({'error': 'Token has expired'}), 401
-            except jwt.InvalidTokenError:
-                return jsonify({'error': 'Invalid token'}), 401
-            
-            # Find the admin user
-            user = User.query.filter_by(id=user_id, is_admin=True).first()
+            # Load the row itself: this is a write, the cached snapshot is read-only
+            user = User.query.filter_by(id=request.admin_user.id, is_admin=True).first()
             if not user:
                 return jsonify({'error': 'Admin user not found'}), 404
             
@@ -1844,6 +2245,7 @@ def create_app():
                 user.phone = data['phone']
             
             db.session.commit()
+            admin_token_cache.invalidate_user(user.id)
             
             return jsonify({
                 'message': 'Profile updated successfully',
@@ -1864,6 +2266,9 @@ def create_app():
     # Register catch-all route LAST using add_url_rule to ensure it has lowest priority
     def serve_static(filename):
         """Serve static files (HTML, CSS, JS) and SPA routing"""
+        response = static_assets.response(filename)
+        if response is not None:
+            return response
         try:
             return send_from_directory(app.static_folder, filename)
         except:
@@ -1874,13 +2279,20 @@ def create_app():
                 return '', 404
     
     app.add_url_rule('/<path:filename>', 'serve_static', serve_static, methods=['GET'])
+    # Flask's own static route (static_url_path='') matches the same URLs first
+    app.view_functions['static'] = serve_static
     
     return app
 
 if __name__ == '__main__':
     app = create_app()
     with app.app_context():
-        db.create_all()
+        db.create_all(bind_key=None)  # Replicas get the schema through replication
+        with db.engine.begin() as connection:
+            ensure_search_index(connection)
+            ensure_change_log(connection)
+            ensure_issue_stats(connection)
+            ensure_notification_counters(connection)
     
     print("Starting CivicFix Server (Flask + SocketIO)")
     print("Server: http://localhost:5000")
@@ -1,8 +1,23 @@
+import os
+import threading
+import time
 from functools import wraps
 from flask import request, jsonify, current_app
 from supabase import create_client, Client
 import jwt
 from models import User, db
+from token_cache import TokenCache, UserSnapshot
+
+# Verified admin dashboard tokens and citizen (Supabase) tokens (configured in create_app)
+admin_token_cache = TokenCache()
+user_token_cache = TokenCache()
+
+# Last Supabase metadata sync per user id, so it runs at most once per interval
+_metadata_synced = {}
+_metadata_lock = threading.Lock()
+
+# Service-role clients reused for the life of the process (keyed by pid so forks build their own)
+_service_clients = {}
 
 def get_supabase_client():
     """Get Supabase client instance"""
@@ -20,7 +35,21 @@ def get_supabase_service_client():
     key = key.strip() if key else None
     if not key:
         raise ValueError("SUPABASE_SERVICE_ROLE_KEY is empty after stripping whitespace")
-    return create_client(url, key)
+    cache_key = (os.getpid(), url, key)
+    client = _service_clients.get(cache_key)
+    if client is None:
+        client = _service_clients[cache_key] = create_client(url, key)
+    return client
+
+class UserData:
+    """User-like view of a Supabase token payload"""
+    def __init__(self, payload):
+        self.id = payload.get('sub')
+        self.email = payload.get('email')
+        self.aud = payload.get('aud')
+        self.exp = payload.get('exp')
+        # Add more fields as needed
+        self.user_metadata = payload.get('user_metadata') or {}
 
 def verify_supabase_token(token):
     """Verify Supabase JWT token and return user data"""
@@ -31,15 +60,6 @@ def verify_supabase_token(token):
         # In production, you'd verify with the proper JWT secret
         payload = jwt.decode(token, options={"verify_signature": False})
         
-        # Create a user-like object from the payload
-        class UserData:
-            def __init__(self, payload):
-                self.id = payload.get('sub')
-                self.email = payload.get('email')
-                self.aud = payload.get('aud')
-                # Add more fields as needed
-                self.user_metadata = payload.get('user_metadata', {})
-        
         # Validate that we have the required fields
         if payload.get('sub') and payload.get('email'):
             return UserData(payload)
@@ -53,8 +73,68 @@ def verify_supabase_token(token):
         print(f"Token verification error: {e}")
         return None
 
+def sync_user_metadata(user, user_data):
+    """Copy Supabase signup metadata onto a user whose username still looks like an email prefix.
+    
+    Runs at most once per user per AUTH_METADATA_SYNC_INTERVAL; returns True if the row changed.
+    """
+    now = time.monotonic()
+    with _metadata_lock:
+        last_sync = _metadata_synced.get(user.id)
+        if last_sync is not None and now - last_sync < current_app.config['AUTH_METADATA_SYNC_INTERVAL']:
+            return False
+        _metadata_synced[user.id] = now
+    
+    metadata_username = user_data.user_metadata.get('username')
+    if not metadata_username or user.username != user.email.split('@')[0]:
+        return False
+    
+    # This user likely has the old email-based username, update it
+    user.username = metadata_username
+    
+    # Also update other fields if they're empty
+    if not user.phone and user_data.user_metadata.get('phone'):
+        user.phone = user_data.user_metadata.get('phone')
+    if not user.province and user_data.user_metadata.get('province'):
+        user.province = user_data.user_metadata.get('province')
+    if not user.district and user_data.user_metadata.get('district'):
+        user.district = user_data.user_metadata.get('district')
+    if not user.sector and user_data.user_metadata.get('sector'):
+        user.sector = user_data.user_metadata.get('sector')
+    
+    db.session.commit()
+    return True
+
+def load_token_user(user_data):
+    """Get or create the User row for verified token data"""
+    user = User.query.filter_by(id=user_data.id).first()
+    if not user:
+        # Create user if doesn't exist (first time login)
+        # Use username from metadata, fallback to email prefix if not available
+        username = user_data.user_metadata.get('username', user_data.email.split('@')[0])
+        
+        user = User(
+            id=user_data.id,
+            email=user_data.email,
+            username=username,
+            phone=user_data.user_metadata.get('phone', ''),
+            province=user_data.user_metadata.get('province', ''),
+            district=user_data.user_metadata.get('district', ''),
+            sector=user_data.user_metadata.get('sector', '')
+        )
+        db.session.add(user)
+        db.session.commit()
+    else:
+        sync_user_metadata(user, user_data)
+    return user
+
 def token_required(f):
-    """Decorator to require valid Supabase authentication"""
+    """Decorator to require valid Supabase authentication.
+    
+    request.current_user is a UserSnapshot (id and serialized fields); routes that
+    write to the user load the row themselves. Repeat requests with the same token
+    are answered from user_token_cache without decoding it or querying users.
+    """
     @wraps(f)
     def decorated(*args, **kwargs):
         token = None
@@ -70,50 +150,19 @@ def token_required(f):
         if not token:
             return jsonify({'error': 'Token is missing'}), 401
         
-        # Verify token with Supabase
-        user_data = verify_supabase_token(token)
-        if not user_data:
-            return jsonify({'error': 'Token is invalid'}), 401
-        
-        # Get or create user in our database
-        user = User.query.filter_by(id=user_data.id).first()
-        if not user:
-            # Create user if doesn't exist (first time login)
-            # Use username from metadata, fallback to email prefix if not available
-            username = user_data.user_metadata.get('username', user_data.email.split('@')[0])
+        cached = user_token_cache.get(token)
+        if cached is None:
+            # Verify token with Supabase
+            user_data = verify_supabase_token(token)
+            if not user_data:
+                return jsonify({'error': 'Token is invalid'}), 401
             
-            user = User(
-                id=user_data.id,
-                email=user_data.email,
-                username=username,
-                phone=user_data.user_metadata.get('phone', ''),
-                province=user_data.user_metadata.get('province', ''),
-                district=user_data.user_metadata.get('district', ''),
-                sector=user_data.user_metadata.get('sector', '')
-            )
-            db.session.add(user)
-            db.session.commit()
-        else:
-            # Update existing user with metadata if username looks like email prefix
-            metadata_username = user_data.user_metadata.get('username')
-            if metadata_username and user.username == user.email.split('@')[0]:
-                # This user likely has the old email-based username, update it
-                user.username = metadata_username
-                
-                # Also update other fields if they're empty
-                if not user.phone and user_data.user_metadata.get('phone'):
-                    user.phone = user_data.user_metadata.get('phone')
-                if not user.province and user_data.user_metadata.get('province'):
-                    user.province = user_data.user_metadata.get('province')
-                if not user.district and user_data.user_metadata.get('district'):
-                    user.district = user_data.user_metadata.get('district')
-                if not user.sector and user_data.user_metadata.get('sector'):
-                    user.sector = user_data.user_metadata.get('sector')
-                
-                db.session.commit()
+            # Get or create user in our database
+            user = load_token_user(user_data)
+            cached = user_token_cache.put(token, (user_data, UserSnapshot(user)), user.id, user_data.exp)
         
         # Make user available in the route
-        request.current_user = user
+        request.current_user = cached[1]
         return f(*args, **kwargs)
     
     return decorated
@@ -128,6 +177,44 @@ def admin_required(f):
     
     return decorated
 
+def admin_token_required(f):
+    """Decorator for the admin dashboard's own HS256 JWTs.
+
+    Sets request.admin_claims and request.admin_user (a UserSnapshot). Verified tokens
+    are cached until they expire, so dashboard polling costs no database round trip.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        auth_header = request.headers.get('Authorization')
+        if not auth_header or not auth_header.startswith('Bearer '):
+            return jsonify({'error': 'Authorization token required'}), 401
+        
+        token = auth_header.split(' ')[1]
+        
+        cached = admin_token_cache.get(token)
+        if cached is None:
+            try:
+                payload = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
+            except jwt.ExpiredSignatureError:
+                return jsonify({'error': 'Token has expired'}), 401
+            except jwt.InvalidTokenError:
+                return jsonify({'error': 'Invalid token'}), 401
+            
+            user_id = payload.get('user_id')
+            if not user_id or not payload.get('is_admin'):
+                return jsonify({'error': 'Admin access required'}), 403
+            
+            admin_user = User.query.filter_by(id=user_id, is_admin=True).first()
+            if not admin_user:
+                return jsonify({'error': 'Admin user not found'}), 404
+            
+            cached = admin_token_cache.put(token, (payload, UserSnapshot(admin_user)), user_id, payload.get('exp'))
+        
+        request.admin_claims, request.admin_user = cached
+        return f(*args, **kwargs)
+    
+    return decorated
+
 def optional_auth(f):
     """Decorator for optional authentication (doesn't fail if no token)"""
     @wraps(f)
@@ -140,13 +227,39 @@ def optional_auth(f):
             auth_header = request.headers['Authorization']
             try:
                 token = auth_header.split(" ")[1]  # Bearer <token>
-                user_data = verify_supabase_token(token)
-                if user_data:
-                    user = User.query.filter_by(id=user_data.id).first()
-                    request.current_user = user
+                cached = user_token_cache.get(token)
+                if cached is None:
+                    user_data = verify_supabase_token(token)
+                    if user_data:
+                        user = User.query.filter_by(id=user_data.id).first()
+                        if user:
+                            cached = user_token_cache.put(token, (user_data, UserSnapshot(user)), user.id, user_data.exp)
+                if cached is not None:
+                    request.current_user = cached[1]
             except:
                 pass  # Continue without authentication
         
         return f(*args, **kwargs)
     
     return decorated
+
+def identify_stream_token(token):
+    """Resolve a stream token to (user_id, is_admin, district) without touching the database.
+    
+    Admin dashboard tokens are our own HS256 JWTs carrying the district claim;
+    anything else is treated as a Supabase citizen token.
+    """
+    if not token:
+        return None, False, None
+    
+    try:
+        payload = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
+        if payload.get('user_id') and payload.get('is_admin'):
+            return payload['user_id'], True, payload.get('district')
+    except jwt.InvalidTokenError:
+        pass
+    
+    user_data = verify_supabase_token(token)
+    if user_data:
+        return user_data.id, False, None
+    return None, False, None
@@ -0,0 +1,101 @@
+"""
+HTTP throughput benchmark for CivicFix
+
+    gunicorn -c gunicorn.conf.py                       # e.g. WEB_CONCURRENCY=1, then 2, 4, ...
+    python benchmark.py http://127.0.0.1:10000/api/issues --concurrency 32 --seconds 15
+
+Client load comes from several processes, each running keep-alive connections on threads,
+so the benchmark itself is not limited to one core. Start the server with
+RATELIMIT_ENABLED=false to measure the app rather than 429 responses.
+"""
+
+import argparse
+import http.client
+import multiprocessing
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+def _client_thread(url, deadline, results):
+    parts = urlsplit(url)
+    path = parts.path + (f"?{parts.query}" if parts.query else '')
+    connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+    connection = None
+    while time.monotonic() < deadline:
+        started = time.monotonic()
+        # Like browsers, retry once on a fresh connection when a kept-alive one was closed
+        # by the server (e.g. a worker being recycled)
+        for _ in range(2):
+            reused = connection is not None
+            try:
+                if connection is None:
+                    connection = connection_class(parts.netloc, timeout=30)
+                connection.request('GET', path, headers={'Accept-Encoding': 'gzip'})
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+                if response.getheader('Connection', '').lower() == 'close':
+                    connection.close()
+                    connection = None
+                break
+            except Exception:
+                status = 'error'
+                connection = None
+                if not reused:
+                    break
+        results.append((status, time.monotonic() - started))
+
+
+def _client_process(url, threads, seconds, queue):
+    deadline = time.monotonic() + seconds
+    results = []
+    workers = [threading.Thread(target=_client_thread, args=(url, deadline, results)) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    queue.put(results)
+
+
+def run(url, concurrency, seconds, processes):
+    queue = multiprocessing.Queue()
+    per_process = [concurrency // processes + (1 if i < concurrency % processes else 0) for i in range(processes)]
+    clients = [multiprocessing.Process(target=_client_process, args=(url, threads, seconds, queue))
+               for threads in per_process if threads]
+    for client in clients:
+        client.start()
+    results = [item for _ in clients for item in queue.get()]
+    for client in clients:
+        client.join()
+    return results
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('url')
+    parser.add_argument('--concurrency', type=int, default=32, help='Connections kept busy at once')
+    parser.add_argument('--seconds', type=float, default=15)
+    parser.add_argument('--processes', type=int, default=multiprocessing.cpu_count(), help='Client processes')
+    args = parser.parse_args()
+
+    results = run(args.url, args.concurrency, args.seconds, max(1, min(args.processes, args.concurrency)))
+    latencies = sorted(latency for _, latency in results)
+    statuses = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+
+    print(f"{len(results)} requests in {args.seconds}s: {len(results) / args.seconds:.1f} req/s")
+    print(f"latency p50 {percentile(latencies, 0.5) * 1000:.1f} ms, "
+          f"p95 {percentile(latencies, 0.95) * 1000:.1f} ms, p99 {percentile(latencies, 0.99) * 1000:.1f} ms")
+    print('responses: ' + ', '.join(f"{status}: {count}" for status, count in sorted(statuses.items(), key=str)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+"""
+Delta sync for CivicFix issues
+Every insert, update (including vote toggles) and delete on issues appends a row to
+issue_changes through a database trigger; clients fetch only what changed since a token.
+
+Change ids come from a sequence and are assigned when the trigger fires, not at commit, so
+a transaction can commit a lower id after a higher one is already visible. Rows younger
+than the settle window are held back to cover this; a transaction that stays open longer
+than SYNC_SETTLE_SECONDS after changing an issue can still be passed over by a token.
+Clients should therefore reload the full feed now and then (e.g. when the app resumes)
+rather than rely on the token alone.
+"""
+
+import math
+from datetime import datetime, timedelta
+from sqlalchemy import func, text
+
+from models import db, Issue, IssueChange, IssueChangeWatermark
+
+CHANGE_COLUMNS = "issue_id, change_type, province, district, changed_at"
+
+
+def _pg_statements():
+    return [
+        f"""
+        CREATE OR REPLACE FUNCTION issues_log_change() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                INSERT INTO issue_changes ({CHANGE_COLUMNS})
+                VALUES (OLD.id, 'delete', OLD.province, OLD.district, timezone('utc', clock_timestamp()));
+                RETURN OLD;
+            END IF;
+            INSERT INTO issue_changes ({CHANGE_COLUMNS})
+            VALUES (NEW.id, 'upsert', NEW.province, NEW.district, timezone('utc', clock_timestamp()));
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        "DROP TRIGGER IF EXISTS issues_change_log_trigger ON issues",
+        """
+        CREATE TRIGGER issues_change_log_trigger
+        AFTER INSERT OR UPDATE OR DELETE ON issues
+        FOR EACH ROW EXECUTE FUNCTION issues_log_change()
+        """,
+    ]
+
+
+def _sqlite_statements():
+    now = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS issues_change_log_insert AFTER INSERT ON issues BEGIN
+            INSERT INTO issue_changes ({CHANGE_COLUMNS})
+            VALUES (new.id, 'upsert', new.province, new.district, {now});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS issues_change_log_update AFTER UPDATE ON issues BEGIN
+            INSERT INTO issue_changes ({CHANGE_COLUMNS})
+            VALUES (new.id, 'upsert', new.province, new.district, {now});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS issues_change_log_delete AFTER DELETE ON issues BEGIN
+            INSERT INTO issue_changes ({CHANGE_COLUMNS})
+            VALUES (old.id, 'delete', old.province, old.district, {now});
+        END
+        """,
+    ]
+
+
+def ensure_change_log(connection):
+    """Install the issue change-log triggers for the connection's dialect (idempotent)"""
+    dialect = connection.dialect.name
+    if dialect == 'postgresql':
+        statements = _pg_statements()
+    elif dialect == 'sqlite':
+        statements = _sqlite_statements()
+    else:
+        print(f"[CHANGES] No change-log triggers for dialect {dialect}")
+        return False
+
+    for statement in statements:
+        connection.execute(text(statement))
+    return True
+
+
+class TokenExpired(Exception):
+    """The client's token points before the last pruned change"""
+
+
+def current_token():
+    """The newest change id, used as the starting token for a fresh client"""
+    return db.session.query(func.coalesce(func.max(IssueChange.id), 0)).scalar()
+
+
+def changes_since(since, district=None, province=None, limit=500, settle_seconds=2):
+    """Collect issues changed after the since token.
+
+    Reads at most limit change rows via the primary key (O(changes), not O(table)).
+    Rows younger than settle_seconds are left for the next call, which narrows (but does
+    not close, see above) the window for skipping a change that had not committed yet.
+    Returns (issues, tombstones, next_token, has_more, retry_after); retry_after is the
+    number of seconds until held-back rows settle, or None when nothing was held back.
+    """
+    pruned = db.session.get(IssueChangeWatermark, 'pruned')
+    if pruned is not None and since < pruned.change_id:
+        raise TokenExpired()
+
+    query = IssueChange.query.filter(IssueChange.id > since)
+    if district:
+        query = query.filter(IssueChange.district == district)
+    if province:
+        query = query.filter(IssueChange.province == province)
+    rows = query.order_by(IssueChange.id).limit(limit + 1).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    cutoff = datetime.utcnow() - timedelta(seconds=settle_seconds)
+    latest = {}
+    next_token = since
+    retry_after = None
+    for row in rows:
+        if row.changed_at > cutoff:
+            # Nothing more is ready yet: tell the client when to come back instead of
+            # having it poll again straight away with the same token
+            has_more = False
+            retry_after = max(1, math.ceil((row.changed_at - cutoff).total_seconds()))
+            break
+        # Later changes to the same issue supersede earlier ones
+        latest.pop(row.issue_id, None)
+        latest[row.issue_id] = row
+        next_token = row.id
+
+    upserted_ids = [issue_id for issue_id, row in latest.items() if row.change_type == 'upsert']
+    issues = Issue.query.filter(Issue.id.in_(upserted_ids)).all() if upserted_ids else []
+
+    # An issue deleted before we loaded it shows up as a tombstone instead
+    found = {issue.id for issue in issues}
+    tombstones = [
+        {'id': issue_id, 'deleted': True, 'deleted_at': row.changed_at.isoformat()}
+        for issue_id, row in latest.items()
+        if row.change_type == 'delete' or issue_id not in found
+    ]
+
+    return issues, tombstones, next_token, has_more, retry_after
+
+
+def _record_pruned(change_id):
+    watermark = db.session.get(IssueChangeWatermark, 'pruned')
+    if watermark is None:
+        db.session.add(IssueChangeWatermark(name='pruned', change_id=change_id))
+    elif change_id > watermark.change_id:
+        watermark.change_id = change_id
+        watermark.updated_at = datetime.utcnow()
+
+
+def prune_changes(retention_days=7, batch_size=5000):
+    """Delete change-log rows older than retention_days in small batches.
+
+    The highest deleted id is kept as a watermark in the same transaction, so clients
+    holding an older token get a 410 and resync even once the log is empty.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    removed = 0
+    while True:
+        ids = [row[0] for row in db.session.query(IssueChange.id)
+               .filter(IssueChange.changed_at < cutoff)
+               .order_by(IssueChange.id)
+               .limit(batch_size)
+               .all()]
+        if not ids:
+            break
+        removed += IssueChange.query.filter(IssueChange.id.in_(ids)).delete(synchronize_session=False)
+        _record_pruned(ids[-1])
+        db.session.commit()
+    return removed
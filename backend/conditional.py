@@ -0,0 +1,88 @@
+"""
+Conditional GET support for polled CivicFix feeds
+A cheap watermark (change-log head plus per-filter index aggregates) is turned into a strong
+ETag so unchanged feeds answer 304
+"""
+
+import hashlib
+import threading
+from flask import request, current_app
+from sqlalchemy import func
+
+from changes import current_token
+from models import Issue
+
+
+def feed_watermark(query):
+    """Summarize the rows an Issue query would return without loading them.
+
+    The head of the issue change log (changes.py) moves on every insert, edit, vote,
+    status change and delete, with one primary-key lookup. count + max(id) of the
+    filtered set only use indexes and keep the ETag distinct per filter.
+    """
+    row = query.order_by(None).with_entities(
+        func.count(Issue.id),
+        func.max(Issue.id)
+    ).first()
+    return (str(current_token()),) + tuple(str(value) for value in row)
+
+
+def make_etag(*parts):
+    """Build a strong ETag value from the request parameters and watermark"""
+    digest = hashlib.sha1(repr(parts).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def normalized_args():
+    """Request arguments in a stable order so equivalent URLs share an ETag"""
+    return tuple(sorted((key, tuple(values)) for key, values in request.args.lists()))
+
+
+class ConditionalGetStats:
+    """Per-endpoint counters of conditional GET outcomes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+
+    def record(self, endpoint, not_modified):
+        with self._lock:
+            counter = self._counters.setdefault(endpoint, {'requests': 0, 'not_modified': 0})
+            counter['requests'] += 1
+            if not_modified:
+                counter['not_modified'] += 1
+
+    def snapshot(self):
+        with self._lock:
+            result = {}
+            for endpoint, counter in self._counters.items():
+                requests = counter['requests']
+                result[endpoint] = {
+                    'requests': requests,
+                    'not_modified': counter['not_modified'],
+                    'hit_ratio': round(counter['not_modified'] / requests, 4) if requests else 0.0
+                }
+            return result
+
+
+# Global stats instance
+conditional_stats = ConditionalGetStats()
+
+
+def not_modified_response(etag, endpoint):
+    """Return a 304 response if the client already holds etag, else None"""
+    hit = request.if_none_match.contains_weak(etag) or request.if_none_match.star_tag
+    conditional_stats.record(endpoint, hit)
+    if not hit:
+        return None
+    response = current_app.response_class(status=304)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def with_etag(response, etag):
+    """Attach the ETag and revalidation headers to a full response"""
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
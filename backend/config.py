@@ -28,13 +28,124 @@ class Config:
     SQLALCHEMY_DATABASE_URI = DATABASE_URL or 'sqlite:///civicfix.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Connection pool (per worker process, see db_pool.py); keep workers x (size + overflow)
+    # below the database's connection limit
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '5'))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', '10'))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', '10'))  # seconds to wait for a free connection
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', '1800'))  # seconds; below server/proxy idle timeouts
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    DB_PGBOUNCER = os.environ.get('DB_PGBOUNCER', 'false').lower() == 'true'  # PgBouncer/Supavisor in transaction mode
+    DB_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', '0'))  # every statement; 0 = server default
+    DB_POLL_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_POLL_STATEMENT_TIMEOUT_MS', '3000'))  # polled feed endpoints
+    
+    # Read replicas for the polled read-only endpoints (comma-separated URLs, see db_routing.py)
+    DATABASE_REPLICA_URLS = [url.strip() for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+    REPLICA_MAX_LAG_SECONDS = float(os.environ.get('REPLICA_MAX_LAG_SECONDS', '5'))  # more lag: read the primary
+    REPLICA_LAG_CHECK_SECONDS = int(os.environ.get('REPLICA_LAG_CHECK_SECONDS', '5'))
+    REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', '10'))  # read-your-writes window after a write
+    
     # File upload settings
     UPLOAD_FOLDER = 'uploads'
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+    UPLOADS_MAX_AGE = 365 * 24 * 3600  # upload file names are never reused
+    # Let a fronting proxy send /uploads files: '' (Flask streams them), x-sendfile (Apache, lighttpd)
+    # or x-accel-redirect (nginx, with an internal location at UPLOADS_ACCEL_PREFIX aliased to the upload folder)
+    UPLOADS_SENDFILE = os.environ.get('UPLOADS_SENDFILE', '').lower()
+    UPLOADS_ACCEL_PREFIX = os.environ.get('UPLOADS_ACCEL_PREFIX', '/protected-uploads/')
+    
+    # Image object storage: local (UPLOAD_FOLDER), supabase or s3 (any S3-compatible server, needs boto3)
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND') or ('supabase' if os.environ.get('SUPABASE_SERVICE_ROLE_KEY') else 'local')
+    STORAGE_BUCKET = os.environ.get('STORAGE_BUCKET', 'issue-images')
+    STORAGE_TIMEOUT = float(os.environ.get('STORAGE_TIMEOUT', '30'))  # seconds per request
+    STORAGE_RETRIES = int(os.environ.get('STORAGE_RETRIES', '3'))  # attempts, with exponential backoff
+    STORAGE_BREAKER_THRESHOLD = int(os.environ.get('STORAGE_BREAKER_THRESHOLD', '5'))  # consecutive failures
+    STORAGE_BREAKER_RESET_SECONDS = int(os.environ.get('STORAGE_BREAKER_RESET_SECONDS', '30'))
+    S3_ENDPOINT_URL = os.environ.get('S3_ENDPOINT_URL', 'http://localhost:9000')
+    S3_ACCESS_KEY = os.environ.get('S3_ACCESS_KEY')
+    S3_SECRET_KEY = os.environ.get('S3_SECRET_KEY')
+    S3_PUBLIC_URL = os.environ.get('S3_PUBLIC_URL')  # defaults to <endpoint>/<bucket>
+    
+    # Background image pipeline: uploads are spooled here and processed by a bounded worker pool
+    IMAGE_SPOOL_FOLDER = os.environ.get('IMAGE_SPOOL_FOLDER', 'uploads/spool')
+    IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', '2'))
+    IMAGE_QUEUE_SIZE = int(os.environ.get('IMAGE_QUEUE_SIZE', '32'))  # beyond this the request processes the image itself
+    IMAGE_MAX_DIMENSION = int(os.environ.get('IMAGE_MAX_DIMENSION', '1600'))  # longest side in pixels
+    IMAGE_DUPLICATE_DETECTION = os.environ.get('IMAGE_DUPLICATE_DETECTION', 'true').lower() == 'true'
+    IMAGE_DUPLICATE_DISTANCE = int(os.environ.get('IMAGE_DUPLICATE_DISTANCE', '3'))  # max differing dHash bits
+    
+    # On-demand resized variants (/uploads/<file>?w=320&fmt=webp), kept in a size-capped disk cache
+    IMAGE_VARIANT_FOLDER = os.environ.get('IMAGE_VARIANT_FOLDER', 'cache/image-variants')
+    IMAGE_VARIANT_CACHE_BYTES = int(os.environ.get('IMAGE_VARIANT_CACHE_BYTES', str(256 * 1024 * 1024)))
+    IMAGE_VARIANT_MAX_AGE = 365 * 24 * 3600  # variant URLs are immutable
+    
+    # frontend-web is fingerprinted and pre-compressed (gzip, plus brotli if installed) into this folder
+    STATIC_BUILD_FOLDER = os.environ.get('STATIC_BUILD_FOLDER', 'cache/static')
+    STATIC_BUILD_ON_STARTUP = os.environ.get('STATIC_BUILD_ON_STARTUP', 'true').lower() == 'true'  # false: use the last `flask build-static`
+    STATIC_MAX_AGE = 365 * 24 * 3600  # hashed asset names are immutable
+    
+    # Follower notifications for status changes, written by background workers in multi-row batches
+    FANOUT_WORKERS = int(os.environ.get('FANOUT_WORKERS', '2'))
+    FANOUT_BATCH_SIZE = int(os.environ.get('FANOUT_BATCH_SIZE', '1000'))  # notifications per INSERT
+    FANOUT_PUSH_LIMIT = int(os.environ.get('FANOUT_PUSH_LIMIT', '100'))  # larger fan-outs skip per-user live events
+    
+    # Outbound email: queued in outbound_emails and delivered by SMTP_POOL_SIZE background senders per worker,
+    # each keeping one authenticated connection open (port 465 uses implicit TLS, others STARTTLS)
+    SMTP_SERVER = os.environ.get('SMTP_SERVER', 'smtp.gmail.com')
+    SMTP_PORT = int(os.environ.get('SMTP_PORT', '587'))
+    SMTP_USERNAME = os.environ.get('SMTP_USERNAME') or os.environ.get('EMAIL_USER')
+    SMTP_PASSWORD = os.environ.get('SMTP_PASSWORD') or os.environ.get('EMAIL_PASSWORD')
+    MAIL_FROM = os.environ.get('FROM_EMAIL')  # defaults to SMTP_USERNAME
+    MAIL_FROM_NAME = os.environ.get('MAIL_FROM_NAME', 'CivicFix Rwanda')
+    SMTP_TIMEOUT = int(os.environ.get('SMTP_TIMEOUT', '20'))
+    SMTP_POOL_SIZE = int(os.environ.get('SMTP_POOL_SIZE', '2'))
+    SMTP_BATCH_SIZE = int(os.environ.get('SMTP_BATCH_SIZE', '20'))  # messages claimed per sender at a time
+    SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.environ.get('SMTP_MAX_MESSAGES_PER_CONNECTION', '100'))
+    SMTP_IDLE_SECONDS = int(os.environ.get('SMTP_IDLE_SECONDS', '60'))  # close connections unused this long
+    SMTP_NOOP_AFTER_SECONDS = int(os.environ.get('SMTP_NOOP_AFTER_SECONDS', '15'))  # check a connection before reusing it
+    SMTP_POLL_SECONDS = int(os.environ.get('SMTP_POLL_SECONDS', '5'))  # for retries and other workers' messages
+    SMTP_MAX_ATTEMPTS = int(os.environ.get('SMTP_MAX_ATTEMPTS', '6'))
+    SMTP_RETRY_BACKOFF = int(os.environ.get('SMTP_RETRY_BACKOFF', '30'))  # seconds, doubled per attempt
+    SMTP_CLAIM_TIMEOUT = int(os.environ.get('SMTP_CLAIM_TIMEOUT', '300'))  # requeue messages of a dead sender
+    
+    # Pagination
+    MAX_PER_PAGE = int(os.environ.get('MAX_PER_PAGE', '100'))
+    COUNT_CACHE_TTL = int(os.environ.get('COUNT_CACHE_TTL', '30'))  # seconds a cached total stays valid
+    
+    # Notification retention (`flask compact-notifications`): read notifications older than this are
+    # deleted in batches and rolled up into per-user notification_summaries rows
+    NOTIFICATION_RETENTION_DAYS = int(os.environ.get('NOTIFICATION_RETENTION_DAYS', '90'))
+    NOTIFICATION_COMPACT_BATCH_SIZE = int(os.environ.get('NOTIFICATION_COMPACT_BATCH_SIZE', '1000'))  # rows per transaction
+    NOTIFICATION_COMPACT_PAUSE_MS = int(os.environ.get('NOTIFICATION_COMPACT_PAUSE_MS', '50'))  # between batches
+    
+    # Delta sync (/api/issues/changes)
+    SYNC_MAX_CHANGES = int(os.environ.get('SYNC_MAX_CHANGES', '500'))
+    SYNC_SETTLE_SECONDS = int(os.environ.get('SYNC_SETTLE_SECONDS', '2'))  # hold back changes younger than this
+    
+    # Server-Sent Events (/api/events/stream)
+    SSE_HEARTBEAT_SECONDS = int(os.environ.get('SSE_HEARTBEAT_SECONDS', '15'))
+    SSE_MAX_STREAM_SECONDS = int(os.environ.get('SSE_MAX_STREAM_SECONDS', '300'))  # client reconnects with Last-Event-ID
+    SSE_MAX_CONNECTIONS = int(os.environ.get('SSE_MAX_CONNECTIONS', '48'))  # per worker; keep below gunicorn --threads
+    
+    # Event bus for cross-worker real-time delivery: memory://, postgresql://..., redis://...
+    EVENT_BUS_URL = os.environ.get('EVENT_BUS_URL', 'memory://')
+    
+    # Verified-token cache: entries live until the token's exp, capped so changes on other workers show up
+    AUTH_CACHE_MAX_ENTRIES = int(os.environ.get('AUTH_CACHE_MAX_ENTRIES', '1024'))
+    AUTH_CACHE_MAX_TTL = int(os.environ.get('AUTH_CACHE_MAX_TTL', '300'))  # seconds
+    AUTH_METADATA_SYNC_INTERVAL = int(os.environ.get('AUTH_METADATA_SYNC_INTERVAL', '3600'))  # per user
+    
+    # Response cache for /api/issues pages: memory:// (per worker) or redis://... (shared)
+    FEED_CACHE_URL = os.environ.get('FEED_CACHE_URL', 'memory://')
+    FEED_CACHE_TTL = int(os.environ.get('FEED_CACHE_TTL', '30'))  # bounds staleness across workers with memory://
+    FEED_CACHE_MAX_ENTRIES = int(os.environ.get('FEED_CACHE_MAX_ENTRIES', '512'))
+    FEED_CACHE_MAX_BYTES = int(os.environ.get('FEED_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
     
-    # Rate limiting
-    RATELIMIT_STORAGE_URL = "memory://"
+    # Rate limiting: memory:// is per worker, so with several workers use a shared store -
+    # sqlite:////tmp/civicfix-ratelimit.db (one host, see rate_limit_storage.py) or redis://...
+    RATELIMIT_STORAGE_URI = os.environ.get('RATELIMIT_STORAGE_URI', 'memory://')
+    RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', 'true').lower() == 'true'  # false only for benchmarks
     
     @staticmethod
     def init_app(app):
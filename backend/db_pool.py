@@ -0,0 +1,170 @@
+"""
+Database connection pool settings and instrumentation for CivicFix
+
+Engine options (pool size, overflow, checkout timeout, recycle, pre-ping) come from the DB_*
+settings in config.py. The pool records checkouts, waits for a free connection and checkout
+timeouts; /api/metrics/db reports them with the pool's current state (per worker process).
+
+Routes decorated with @statement_timeout() run every SQL statement under a per-request
+budget. It is applied with SET LOCAL when the request's transaction begins, so it never
+outlives the transaction and works through PgBouncer in transaction mode. A request whose
+statement hits the budget answers 503 instead of holding a connection.
+"""
+
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, g, has_request_context, jsonify
+from sqlalchemy import event, exc, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import QueuePool
+
+from db_routing import REPLICA_BIND_PREFIX
+from models import db
+
+# SQLSTATE of a statement cancelled by statement_timeout
+QUERY_CANCELED = '57014'
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that reports checkout waits and timeouts to pool_monitor"""
+
+    def _do_get(self):
+        # Every pooled connection is in use and no overflow is left: this checkout waits
+        exhausted = self._max_overflow > -1 and self.checkedout() >= self.size() + self._max_overflow
+        started = time.monotonic()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            pool_monitor.record_checkout(exhausted, time.monotonic() - started, timed_out=True)
+            raise
+        pool_monitor.record_checkout(exhausted, time.monotonic() - started)
+        return connection
+
+
+def engine_options(config, url=None):
+    """SQLALCHEMY_ENGINE_OPTIONS for the configured database (or for url, e.g. a replica)"""
+    url = url or config['SQLALCHEMY_DATABASE_URI']
+    options = {
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+        'pool_recycle': config['DB_POOL_RECYCLE']
+    }
+    if url in ('sqlite://', 'sqlite:///:memory:'):
+        return options  # One shared in-memory connection, nothing to pool
+
+    options.update(
+        poolclass=InstrumentedQueuePool,
+        pool_size=config['DB_POOL_SIZE'],
+        max_overflow=config['DB_MAX_OVERFLOW'],
+        pool_timeout=config['DB_POOL_TIMEOUT']
+    )
+    # PgBouncer in transaction mode rejects startup parameters such as options; the
+    # per-request budgets still apply since they are SET LOCAL. psycopg2 never uses
+    # server-side prepared statements, so there is nothing else to turn off.
+    if url.startswith('postgres') and config['DB_STATEMENT_TIMEOUT_MS'] and not config['DB_PGBOUNCER']:
+        options['connect_args'] = {'options': f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT_MS']}"}
+    return options
+
+
+def replica_binds(config):
+    """SQLALCHEMY_BINDS entries for DATABASE_REPLICA_URLS, with the same pool settings as the primary"""
+    return {
+        f"{REPLICA_BIND_PREFIX}{index}": dict(engine_options(config, url), url=url)
+        for index, url in enumerate(config['DATABASE_REPLICA_URLS'])
+    }
+
+
+def statement_timeout(milliseconds=None):
+    """Route decorator: cap each SQL statement of the request (default DB_POLL_STATEMENT_TIMEOUT_MS)"""
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            g.statement_timeout_ms = milliseconds or current_app.config['DB_POLL_STATEMENT_TIMEOUT_MS']
+            response = f(*args, **kwargs)
+            if g.pop('statement_timed_out', False):
+                # The route caught the error; report it as the temporary overload it is
+                db.session.rollback()
+                response = jsonify({'error': 'The database is busy, please retry shortly'})
+                response.status_code = 503
+                response.headers['Retry-After'] = '2'
+            return response
+        return decorated
+    return decorator
+
+
+class PoolMonitor:
+    """Pool counters for this worker process, and the statement budget hooks"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._installed = False
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.timeouts = 0
+        self.statement_timeouts = 0
+        self.invalidated = 0
+
+    def init_app(self, app):
+        if app.config['DB_PGBOUNCER'] and app.config['EVENT_BUS_URL'].startswith('postgres'):
+            print("[DB] EVENT_BUS_URL uses LISTEN/NOTIFY, which needs a direct or session-mode connection, not PgBouncer in transaction mode")
+        if self._installed:
+            return
+        event.listen(Session, 'after_begin', self._apply_budget)
+        event.listen(Engine, 'handle_error', self._record_error)
+        event.listen(QueuePool, 'invalidate', self._record_invalidate)
+        self._installed = True
+
+    def _apply_budget(self, session, transaction, connection):
+        if not has_request_context():
+            return
+        milliseconds = g.get('statement_timeout_ms')
+        if milliseconds and connection.dialect.name == 'postgresql':
+            connection.execute(text("SELECT set_config('statement_timeout', :value, true)"),
+                               {'value': f"{int(milliseconds)}ms"})
+
+    def _record_error(self, context):
+        if getattr(context.original_exception, 'pgcode', None) == QUERY_CANCELED:
+            with self._lock:
+                self.statement_timeouts += 1
+            if has_request_context():
+                g.statement_timed_out = True
+
+    def _record_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidated += 1
+
+    def record_checkout(self, waited, seconds, timed_out=False):
+        with self._lock:
+            self.checkouts += 1
+            if waited:
+                self.waits += 1
+                self.wait_seconds += seconds
+                self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def stats(self):
+        pool = db.engine.pool
+        with self._lock:
+            counters = {
+                'checkouts': self.checkouts,
+                'waits': self.waits,
+                'avg_wait_seconds': round(self.wait_seconds / self.waits, 4) if self.waits else 0.0,
+                'max_wait_seconds': round(self.max_wait_seconds, 4),
+                'timeouts': self.timeouts,
+                'statement_timeouts': self.statement_timeouts,
+                'invalidated': self.invalidated
+            }
+        if isinstance(pool, QueuePool):
+            counters.update(pool_size=pool.size(), checked_out=pool.checkedout(),
+                            checked_in=pool.checkedin(), overflow=pool.overflow())
+        counters['pool'] = type(pool).__name__
+        return counters
+
+
+# Global pool monitor (initialized in create_app)
+pool_monitor = PoolMonitor()
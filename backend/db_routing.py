@@ -0,0 +1,160 @@
+"""
+Read-replica routing for CivicFix
+With DATABASE_REPLICA_URLS set, the SELECTs of routes decorated with @read_replica go to a
+replica engine; every write, SELECT ... FOR UPDATE and everything outside those routes stays
+on the primary. A request sticks to one replica.
+
+    Read-your-writes  a request that writes sets a short-lived cookie; that client's reads
+                      go to the primary for REPLICA_STICKY_SECONDS
+    Lag               each replica's lag is checked at most every REPLICA_LAG_CHECK_SECONDS;
+                      replicas behind by more than REPLICA_MAX_LAG_SECONDS, or unreachable,
+                      are skipped until the next check (all skipped: primary)
+
+Lag is read from the replication functions on PostgreSQL; other databases (e.g. two SQLite
+files for local testing) report no lag.
+"""
+
+import random
+import threading
+import time
+from functools import wraps
+
+from flask import g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import text
+from sqlalchemy.sql import Select
+
+REPLICA_BIND_PREFIX = 'replica_'
+STICKY_COOKIE = 'civicfix_read_primary'
+
+# Zero when the replica has replayed everything it received (an idle primary is not lag)
+PG_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+class RoutingSession(Session):
+    """db.session class: sends the reads of @read_replica requests to a replica engine"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and replica_router.replica_keys:
+            if self._flushing or (clause is not None and (
+                    not isinstance(clause, Select) or clause._for_update_arg is not None)):
+                replica_router.record_write()
+            elif clause is not None:
+                key = replica_router.replica_for_request(self._db.engines)
+                if key is not None:
+                    return self._db.engines[key]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def read_replica(f):
+    """Route decorator: this endpoint's reads may be served by a replica"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        g.db_read_only = True
+        return f(*args, **kwargs)
+    return decorated
+
+
+class ReplicaRouter:
+    """Chooses a replica per request and tracks replica lag (per worker process)"""
+
+    def __init__(self):
+        self.replica_keys = []
+        self.max_lag_seconds = 5
+        self.check_seconds = 5
+        self.sticky_seconds = 10
+        self._lag = {}  # bind key -> (checked_at, lag seconds or None when unreachable)
+        self._lock = threading.Lock()
+        self.replica_reads = 0
+        self.primary_sticky = 0
+        self.primary_lagging = 0
+
+    def init_app(self, app):
+        """Call after SQLALCHEMY_BINDS holds the replica binds"""
+        self.replica_keys = sorted(key for key in app.config.get('SQLALCHEMY_BINDS', {})
+                                   if key.startswith(REPLICA_BIND_PREFIX))
+        self.max_lag_seconds = app.config['REPLICA_MAX_LAG_SECONDS']
+        self.check_seconds = app.config['REPLICA_LAG_CHECK_SECONDS']
+        self.sticky_seconds = app.config['REPLICA_STICKY_SECONDS']
+        self._lag = {}
+        if self.replica_keys:
+            app.after_request(self._remember_writes)
+            print(f"[DB] Routing read-only requests to {len(self.replica_keys)} replica(s)")
+
+    def reads_primary(self):
+        """True when this client is inside its read-your-writes window"""
+        return bool(self.replica_keys) and has_request_context() and bool(request.cookies.get(STICKY_COOKIE))
+
+    def served_by_replica(self):
+        """True when this request's reads went to a replica (the data may lag the primary)"""
+        return has_request_context() and g.get('db_replica') is not None
+
+    def record_write(self):
+        if has_request_context():
+            g.db_wrote = True
+
+    def replica_for_request(self, engines):
+        """Bind key of the replica serving this request's reads, or None for the primary"""
+        if not has_request_context() or not g.get('db_read_only') or g.get('db_wrote'):
+            return None
+        if 'db_replica' not in g:
+            g.db_replica = self._choose(engines)
+        return g.db_replica
+
+    def _choose(self, engines):
+        if request.cookies.get(STICKY_COOKIE):
+            with self._lock:
+                self.primary_sticky += 1
+            return None
+
+        healthy = [key for key in self.replica_keys if self._within_lag(key, engines[key])]
+        with self._lock:
+            if not healthy:
+                self.primary_lagging += 1
+                return None
+            self.replica_reads += 1
+        return random.choice(healthy)
+
+    def _within_lag(self, key, engine):
+        now = time.monotonic()
+        checked_at, lag = self._lag.get(key, (None, None))
+        if checked_at is None or now - checked_at >= self.check_seconds:
+            # Record the check first so concurrent requests keep using the previous value
+            self._lag[key] = (now, lag)
+            lag = self._measure_lag(key, engine)
+            self._lag[key] = (now, lag)
+        return lag is not None and lag <= self.max_lag_seconds
+
+    def _measure_lag(self, key, engine):
+        try:
+            with engine.connect() as connection:
+                if connection.dialect.name != 'postgresql':
+                    return 0.0
+                return float(connection.execute(text(PG_LAG_SQL)).scalar() or 0)
+        except Exception as e:
+            print(f"[DB] Replica {key} unavailable, reading from the primary: {e}")
+            return None
+
+    def _remember_writes(self, response):
+        if g.get('db_wrote'):
+            response.set_cookie(STICKY_COOKIE, '1', max_age=self.sticky_seconds, httponly=True, samesite='Lax')
+        return response
+
+    def stats(self):
+        with self._lock:
+            return {
+                'replicas': {key: (round(lag, 3) if lag is not None else None)
+                             for key, (_, lag) in sorted(self._lag.items())},
+                'replica_reads': self.replica_reads,
+                'primary_sticky': self.primary_sticky,
+                'primary_lagging': self.primary_lagging
+            }
+
+
+# Global replica router (initialized in create_app)
+replica_router = ReplicaRouter()
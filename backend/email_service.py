@@ -1,49 +1,296 @@
 """
 Email service for CivicFix admin authorization codes
 Handles sending authorization codes and password reset emails
+Messages are queued in the database and delivered by background senders over pooled SMTP connections
 """
 
-import smtplib
 import os
+import smtplib
+import socket
+import threading
+import time
+import uuid
+from collections import deque
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime, timedelta
 
+from sqlalchemy import func
+
+from models import db, OutboundEmail
+
+# SMTP replies that are worth retrying (4xx) versus permanent rejections (5xx)
+TRANSIENT_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, socket.error, TimeoutError)
+
+
+def is_transient(error):
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return isinstance(error, TRANSIENT_ERRORS)
+
+
+class SMTPSession:
+    """One authenticated SMTP connection reused for many messages"""
+
+    def __init__(self, config):
+        self.config = config
+        self.server = None
+        self.messages = 0
+        self.last_used = 0.0
+
+    def _connect(self):
+        host, port, timeout = self.config['SMTP_SERVER'], self.config['SMTP_PORT'], self.config['SMTP_TIMEOUT']
+        if port == 465:
+            server = smtplib.SMTP_SSL(host, port, timeout=timeout)
+        else:
+            server = smtplib.SMTP(host, port, timeout=timeout)
+            server.starttls()
+        server.login(self.config['SMTP_USERNAME'], self.config['SMTP_PASSWORD'])
+        self.server = server
+        self.messages = 0
+        return True
+
+    def send(self, msg):
+        """Send over the open connection, reconnecting if it was dropped or has been used enough.
+        Returns True if a new connection had to be opened."""
+        connected = False
+        if self.server is not None:
+            if self.messages >= self.config['SMTP_MAX_MESSAGES_PER_CONNECTION']:
+                self.close()
+            elif time.monotonic() - self.last_used > self.config['SMTP_NOOP_AFTER_SECONDS']:
+                # Servers drop idle sessions; check before sending rather than fail mid-message
+                try:
+                    if self.server.noop()[0] != 250:
+                        self.close()
+                except smtplib.SMTPException:
+                    self.close()
+        if self.server is None:
+            connected = self._connect()
+        try:
+            self.server.send_message(msg)
+        except (smtplib.SMTPServerDisconnected, smtplib.SMTPSenderRefused, smtplib.SMTPDataError):
+            self.close()
+            raise
+        self.messages += 1
+        self.last_used = time.monotonic()
+        return connected
+
+    def close_if_idle(self):
+        if self.server is not None and time.monotonic() - self.last_used > self.config['SMTP_IDLE_SECONDS']:
+            self.close()
+
+    def close(self):
+        if self.server is None:
+            return
+        try:
+            self.server.quit()
+        except Exception:
+            pass
+        self.server = None
+
+
+class MailQueue:
+    """Durable outbound email queue with background SMTP senders.
+
+    enqueue() only inserts an outbound_emails row and returns. Each sender thread owns one
+    authenticated SMTP connection that it keeps open across batches, claims due messages
+    (status queued -> sending, so several workers never send the same row) and retries
+    transient failures with exponential backoff. Messages left in sending by a dead
+    worker are queued again after SMTP_CLAIM_TIMEOUT seconds.
+    """
+
+    def __init__(self):
+        self.app = None
+        self._threads = []
+        self._threads_pid = None
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=200)
+        self.enqueued = 0
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.connections = 0
+
+    def init_app(self, app):
+        self.app = app
+        self._threads = []
+        self._threads_pid = None
+        app.before_request(self.ensure_senders)
+
+    @property
+    def configured(self):
+        return bool(self.app and self.app.config['SMTP_USERNAME'] and self.app.config['SMTP_PASSWORD'])
+
+    def ensure_senders(self):
+        # Started lazily and per process, so forked workers get their own threads
+        if not self.configured or self._threads_pid == os.getpid():
+            return
+        with self._lock:
+            if self._threads_pid == os.getpid():
+                return
+            self._threads = [
+                threading.Thread(target=self._sender_loop, name=f'mail-sender-{index}', daemon=True)
+                for index in range(self.app.config['SMTP_POOL_SIZE'])
+            ]
+            self._threads_pid = os.getpid()
+            for thread in self._threads:
+                thread.start()
+
+    def enqueue(self, to_email, subject, text_body=None, html_body=None):
+        """Queue a message for delivery; returns False if SMTP is not configured"""
+        if not self.configured:
+            print(f"SMTP credentials not configured. Email to {to_email} not queued.")
+            return False
+        db.session.add(OutboundEmail(to_email=to_email, subject=subject, text_body=text_body, html_body=html_body))
+        db.session.commit()
+        with self._lock:
+            self.enqueued += 1
+        self.ensure_senders()
+        self._wake.set()
+        return True
+
+    def build_message(self, email):
+        config = self.app.config
+        msg = MIMEMultipart('alternative')
+        msg['Subject'] = email.subject
+        msg['From'] = f"{config['MAIL_FROM_NAME']} <{config['MAIL_FROM'] or config['SMTP_USERNAME']}>"
+        msg['To'] = email.to_email
+        if email.text_body:
+            msg.attach(MIMEText(email.text_body, 'plain'))
+        if email.html_body:
+            msg.attach(MIMEText(email.html_body, 'html'))
+        return msg
+
+    def _claim(self, sender_id, limit):
+        now = datetime.utcnow()
+        OutboundEmail.query.filter(
+            OutboundEmail.status == 'sending',
+            OutboundEmail.claimed_at < now - timedelta(seconds=self.app.config['SMTP_CLAIM_TIMEOUT'])
+        ).update({OutboundEmail.status: 'queued', OutboundEmail.claimed_by: None}, synchronize_session=False)
+        due = [row[0] for row in db.session.query(OutboundEmail.id).filter(
+            OutboundEmail.status == 'queued',
+            OutboundEmail.next_attempt_at <= now
+        ).order_by(OutboundEmail.id).limit(limit).all()]
+        if due:
+            # Only rows still queued are taken, so a concurrent sender's claim wins cleanly
+            OutboundEmail.query.filter(
+                OutboundEmail.id.in_(due), OutboundEmail.status == 'queued'
+            ).update({OutboundEmail.status: 'sending', OutboundEmail.claimed_by: sender_id,
+                      OutboundEmail.claimed_at: now}, synchronize_session=False)
+        db.session.commit()
+        if not due:
+            return []
+        return OutboundEmail.query.filter_by(status='sending', claimed_by=sender_id).order_by(OutboundEmail.id).all()
+
+    def _deliver(self, session, email):
+        started = time.monotonic()
+        try:
+            if session.send(self.build_message(email)):
+                with self._lock:
+                    self.connections += 1
+        except Exception as e:
+            email.attempts += 1
+            email.last_error = str(e)[:500]
+            email.claimed_by = None
+            if is_transient(e) and email.attempts < self.app.config['SMTP_MAX_ATTEMPTS']:
+                delay = min(self.app.config['SMTP_RETRY_BACKOFF'] * (2 ** (email.attempts - 1)), 3600)
+                email.status = 'queued'
+                email.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+                with self._lock:
+                    self.retried += 1
+                print(f"[MAIL] Delivery to {email.to_email} failed (attempt {email.attempts}), retrying in {delay}s: {e}")
+            else:
+                email.status = 'failed'
+                with self._lock:
+                    self.failed += 1
+                print(f"[MAIL] Giving up on email #{email.id} to {email.to_email}: {e}")
+            return
+        email.attempts += 1
+        email.status = 'sent'
+        email.sent_at = datetime.utcnow()
+        email.claimed_by = None
+        email.last_error = None
+        with self._lock:
+            self.sent += 1
+            self._latencies.append((time.monotonic() - started, (email.sent_at - email.created_at).total_seconds()))
+
+    def process_batch(self, session, sender_id):
+        """Claim and send one batch over session; returns the number of messages handled"""
+        with self.app.app_context():
+            batch = self._claim(sender_id, self.app.config['SMTP_BATCH_SIZE'])
+            for email in batch:
+                self._deliver(session, email)
+                db.session.commit()
+            return len(batch)
+
+    def _sender_loop(self):
+        session = SMTPSession(self.app.config)
+        sender_id = f"{os.getpid()}-{uuid.uuid4().hex[:12]}"
+        while True:
+            try:
+                if self.process_batch(session, sender_id):
+                    continue
+            except Exception as e:
+                print(f"[MAIL] Sender error: {e}")
+                session.close()
+            session.close_if_idle()
+            self._wake.wait(self.app.config['SMTP_POLL_SECONDS'])
+            self._wake.clear()
+
+    def flush(self):
+        """Send everything that is due from the calling thread (for `flask send-queued-emails`)"""
+        session = SMTPSession(self.app.config)
+        sender_id = f"{os.getpid()}-{uuid.uuid4().hex[:12]}"
+        handled = 0
+        try:
+            while True:
+                count = self.process_batch(session, sender_id)
+                if not count:
+                    return handled
+                handled += count
+        finally:
+            session.close()
+
+    def stats(self):
+        depth = dict(db.session.query(OutboundEmail.status, func.count(OutboundEmail.id))
+                     .filter(OutboundEmail.status.in_(('queued', 'sending', 'failed')))
+                     .group_by(OutboundEmail.status).all())
+        with self._lock:
+            latencies = list(self._latencies)
+            return {
+                'configured': self.configured,
+                'senders': len(self._threads) if self._threads_pid == os.getpid() else 0,
+                'queued': depth.get('queued', 0),
+                'sending': depth.get('sending', 0),
+                'failed_total': depth.get('failed', 0),
+                'enqueued': self.enqueued,
+                'sent': self.sent,
+                'retried': self.retried,
+                'failed': self.failed,
+                'connections_opened': self.connections,
+                'avg_send_seconds': round(sum(l[0] for l in latencies) / len(latencies), 3) if latencies else 0.0,
+                'avg_delivery_seconds': round(sum(l[1] for l in latencies) / len(latencies), 3) if latencies else 0.0
+            }
+
+
+# Global mail queue (initialized in create_app)
+mail_queue = MailQueue()
+
+
 class EmailService:
     def __init__(self):
-        # Email configuration (you can use Gmail, SendGrid, or any SMTP service)
-        self.smtp_server = os.environ.get('SMTP_SERVER', 'smtp.gmail.com')
-        self.smtp_port = int(os.environ.get('SMTP_PORT', '587'))
-        self.email_user = os.environ.get('EMAIL_USER', 'your-app-email@gmail.com')
-        self.email_password = os.environ.get('EMAIL_PASSWORD', 'your-app-password')
         self.from_name = "CivicFix Rwanda"
     
     def send_email(self, to_email, subject, html_content, text_content=None):
-        """Send an email with HTML content"""
+        """Queue an email with HTML content; returns False if it could not be queued"""
         try:
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = subject
-            msg['From'] = f"{self.from_name} <{self.email_user}>"
-            msg['To'] = to_email
-            
-            # Add text version if provided
-            if text_content:
-                text_part = MIMEText(text_content, 'plain')
-                msg.attach(text_part)
-            
-            # Add HTML version
-            html_part = MIMEText(html_content, 'html')
-            msg.attach(html_part)
-            
-            # Send email
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.email_user, self.email_password)
-                server.send_message(msg)
-            
-            return True
+            return mail_queue.enqueue(to_email, subject, text_body=text_content, html_body=html_content)
         except Exception as e:
-            print(f"Email sending failed: {e}")
+            db.session.rollback()
+            print(f"Email queueing failed: {e}")
             return False
     
     def send_admin_authorization_code(self, personal_email, auth_code, district, province, official_email):
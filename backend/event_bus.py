@@ -0,0 +1,172 @@
+"""
+Pluggable publish/subscribe bus for CivicFix real-time events
+Lets every worker process (and node) deliver events published by any other one
+
+    memory://                   single process (default)
+    postgresql://user:pw@host/db  PostgreSQL LISTEN/NOTIFY
+    redis://localhost:6379/0    Redis (or any Redis-compatible server) pub/sub
+"""
+
+import json
+import select
+import threading
+import time
+
+CHANNEL = 'civicfix_events'
+
+# PostgreSQL rejects NOTIFY payloads of 8000 bytes or more
+PG_MAX_PAYLOAD = 7900
+
+
+class InProcessBus:
+    """Delivers straight to the local handler; only correct with a single worker"""
+
+    name = 'memory'
+
+    def __init__(self):
+        self._handler = None
+
+    def start(self, handler):
+        self._handler = handler
+
+    def publish(self, message):
+        if self._handler:
+            self._handler(message)
+
+    def stop(self):
+        self._handler = None
+
+
+class _ListenerBus:
+    """Shared plumbing for buses that need a background listener thread"""
+
+    def __init__(self):
+        self._handler = None
+        self._thread = None
+        self._running = False
+        self._publish_lock = threading.Lock()
+
+    def start(self, handler):
+        self._handler = handler
+        self._running = True
+        self._thread = threading.Thread(target=self._listen_forever, name=f'{self.name}-event-bus', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+
+    def _dispatch(self, payload):
+        try:
+            self._handler(json.loads(payload))
+        except Exception as e:
+            print(f"[EVENT BUS] Dropped malformed message: {e}")
+
+    def _listen_forever(self):
+        delay = 1
+        while self._running:
+            try:
+                self._listen()
+                delay = 1
+            except Exception as e:
+                print(f"[EVENT BUS] {self.name} listener error, reconnecting in {delay}s: {e}")
+                time.sleep(delay)
+                delay = min(delay * 2, 30)
+
+    def _listen(self):
+        raise NotImplementedError
+
+
+class PostgresBus(_ListenerBus):
+    """LISTEN/NOTIFY on the application database; no extra infrastructure needed"""
+
+    name = 'postgresql'
+
+    def __init__(self, url):
+        super().__init__()
+        # libpq understands postgresql:// URIs but not SQLAlchemy's +driver suffix
+        self.dsn = url.replace('postgresql+psycopg2://', 'postgresql://', 1)
+        self._publish_connection = None
+
+    def start(self, handler):
+        # Never reuse a connection inherited from the parent across fork
+        self._publish_connection = None
+        super().start(handler)
+
+    def _connect(self):
+        import psycopg2
+        connection = psycopg2.connect(self.dsn)
+        connection.autocommit = True
+        return connection
+
+    def publish(self, message):
+        payload = json.dumps(message)
+        if len(payload.encode('utf-8')) > PG_MAX_PAYLOAD:
+            # Too large for NOTIFY: drop the embedded issue, clients refetch it
+            data = dict(message.get('data') or {})
+            issue = data.pop('issue', None)
+            if issue:
+                data['issue_id'] = issue.get('id')
+            payload = json.dumps(dict(message, data=data))
+
+        with self._publish_lock:
+            for attempt in range(2):
+                try:
+                    if self._publish_connection is None or self._publish_connection.closed:
+                        self._publish_connection = self._connect()
+                    with self._publish_connection.cursor() as cursor:
+                        cursor.execute("SELECT pg_notify(%s, %s)", (CHANNEL, payload))
+                    return
+                except Exception:
+                    self._publish_connection = None
+                    if attempt:
+                        raise
+
+    def _listen(self):
+        connection = self._connect()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {CHANNEL}")
+            while self._running:
+                if select.select([connection], [], [], 5) == ([], [], []):
+                    continue
+                connection.poll()
+                while connection.notifies:
+                    self._dispatch(connection.notifies.pop(0).payload)
+        finally:
+            connection.close()
+
+
+class RedisBus(_ListenerBus):
+    """Redis pub/sub; works with any Redis-compatible server"""
+
+    name = 'redis'
+
+    def __init__(self, url):
+        super().__init__()
+        import redis  # Optional dependency, only needed for redis:// bus URLs
+        self._client = redis.Redis.from_url(url)
+
+    def publish(self, message):
+        self._client.publish(CHANNEL, json.dumps(message))
+
+    def _listen(self):
+        pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        try:
+            pubsub.subscribe(CHANNEL)
+            while self._running:
+                item = pubsub.get_message(timeout=5)
+                if item and item.get('type') == 'message':
+                    self._dispatch(item['data'])
+        finally:
+            pubsub.close()
+
+
+def create_bus(url):
+    """Build the bus for a URL (see module docstring)"""
+    if not url or url.startswith('memory://'):
+        return InProcessBus()
+    if url.startswith('postgres'):
+        return PostgresBus(url.replace('postgres://', 'postgresql://', 1))
+    if url.startswith('redis://') or url.startswith('rediss://'):
+        return RedisBus(url)
+    raise ValueError(f"Unsupported EVENT_BUS_URL: {url}")
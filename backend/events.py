@@ -0,0 +1,230 @@
+"""
+Real-time event broker for CivicFix
+Replaces the disabled Socket.IO rooms with Server-Sent Events: each browser holds one
+stream and receives new_issue, vote_update, status_update, admin_update and notification events.
+Events travel through a pluggable bus (event_bus.py) so any worker can deliver them.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from event_bus import InProcessBus
+
+
+class Event:
+    """A published event and who may see it"""
+
+    def __init__(self, event_id, event_type, data, audience='all', user_id=None, district=None):
+        self.id = event_id
+        self.type = event_type
+        self.data = data
+        self.audience = audience  # all, user, admins
+        self.user_id = user_id
+        self.district = district
+
+    def visible_to(self, subscription):
+        """Apply the old Socket.IO room rules: broadcast, user_<id> and admins (per district)"""
+        if self.audience == 'all':
+            return True
+        if self.audience == 'user':
+            return subscription.user_id is not None and str(subscription.user_id) == str(self.user_id)
+        if self.audience == 'admins':
+            return subscription.is_admin and (self.district is None or subscription.district == self.district)
+        return False
+
+    def to_sse(self):
+        return f"id: {self.id}\nevent: {self.type}\ndata: {json.dumps(self.data)}\n\n"
+
+
+class Subscription:
+    """One connected stream with a bounded buffer of pending events"""
+
+    def __init__(self, user_id=None, is_admin=False, district=None, max_buffer=100):
+        self.user_id = user_id
+        self.is_admin = is_admin
+        self.district = district
+        self.max_buffer = max_buffer
+        self.overflowed = False
+        self._events = deque()
+        self._condition = threading.Condition()
+
+    def push(self, event):
+        with self._condition:
+            if len(self._events) >= self.max_buffer:
+                # Slow consumer: drop the oldest event and ask the client to resync
+                self._events.popleft()
+                self.overflowed = True
+            self._events.append(event)
+            self._condition.notify()
+
+    def wait(self, timeout):
+        """Block until events arrive or timeout; returns (events, overflowed)"""
+        with self._condition:
+            if not self._events:
+                self._condition.wait(timeout)
+            events = list(self._events)
+            self._events.clear()
+            overflowed = self.overflowed
+            self.overflowed = False
+            return events, overflowed
+
+
+class EventBroker:
+    """Publishes through the event bus and fans received events out to local streams.
+
+    Keeps a replay history for Last-Event-ID resume. Every worker receives every
+    event from the bus, so a client can resume on any worker.
+    """
+
+    def __init__(self, history_size=1000, buffer_size=100, bus=None):
+        self.buffer_size = buffer_size
+        self.bus = bus or InProcessBus()
+        self._bus_pid = None
+        self._history = deque(maxlen=history_size)
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+        self._last_id = 0
+        self._listening_since = None  # First event id this worker can have received
+        self.published = 0
+        self.delivered = 0
+        self.bus_errors = 0
+
+    def configure(self, bus):
+        """Switch to another bus (called from create_app)"""
+        with self._lock:
+            if self._bus_pid is not None:
+                self.bus.stop()
+            self.bus = bus
+            self._bus_pid = None
+
+    def _ensure_bus(self):
+        # Started lazily and per process, so forked workers get their own listener
+        pid = os.getpid()
+        if self._bus_pid != pid:
+            with self._lock:
+                if self._bus_pid != pid:
+                    self._listening_since = int(time.time() * 1000000)
+                    self.bus.start(self._receive)
+                    self._bus_pid = pid
+
+    def _new_id(self):
+        # Microsecond timestamps keep ids increasing across workers and restarts
+        with self._lock:
+            self._last_id = max(self._last_id + 1, int(time.time() * 1000000))
+            return self._last_id
+
+    def publish(self, event_type, data, audience='all', user_id=None, district=None):
+        self._ensure_bus()
+        message = {
+            'id': self._new_id(),
+            'type': event_type,
+            'data': data,
+            'audience': audience,
+            'user_id': str(user_id) if user_id is not None else None,
+            'district': district
+        }
+        self.published += 1
+        try:
+            self.bus.publish(message)
+        except Exception as e:
+            # Bus unavailable: at least deliver to this worker's streams
+            self.bus_errors += 1
+            print(f"[EVENTS] Bus publish failed, delivering locally: {e}")
+            self._receive(message)
+        return message['id']
+
+    def _receive(self, message):
+        event = Event(
+            message['id'], message['type'], message['data'],
+            message.get('audience', 'all'), message.get('user_id'), message.get('district')
+        )
+        with self._lock:
+            self._history.append(event)
+            self._last_id = max(self._last_id, event.id)
+            subscriptions = list(self._subscriptions)
+            self.delivered += 1
+
+        for subscription in subscriptions:
+            if event.visible_to(subscription):
+                subscription.push(event)
+
+    def subscribe(self, user_id=None, is_admin=False, district=None, last_event_id=None):
+        """Register a stream. Returns (subscription, replay, resync).
+
+        replay holds the missed events after last_event_id; resync is True when this
+        worker's history cannot show what the client missed (the id is older than the
+        retained history or than this worker's listener, or newer than anything it
+        received) and the client must reload.
+        """
+        self._ensure_bus()
+        subscription = Subscription(user_id, is_admin, district, self.buffer_size)
+        with self._lock:
+            self._subscriptions.add(subscription)
+            history = list(self._history)
+            # A full history has dropped events older than its first one
+            covered_from = history[0].id if len(history) == self._history.maxlen else self._listening_since
+            last_id = self._last_id
+
+        replay = []
+        resync = False
+        if last_event_id is not None:
+            if last_event_id < covered_from or last_event_id > last_id:
+                resync = True
+            replay = [event for event in history
+                      if event.id > last_event_id and event.visible_to(subscription)]
+            replay = replay[-self.buffer_size:]
+        return subscription, replay, resync
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def connection_count(self):
+        with self._lock:
+            return len(self._subscriptions)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'bus': self.bus.name,
+                'connections': len(self._subscriptions),
+                'published': self.published,
+                'delivered': self.delivered,
+                'bus_errors': self.bus_errors,
+                'history': len(self._history),
+                'last_event_id': self._last_id
+            }
+
+
+# Global broker instance
+broker = EventBroker()
+
+
+def stream_events(subscription, replay, resync, heartbeat_seconds=15, max_seconds=300):
+    """Generate the SSE byte stream for one subscription.
+
+    Sends a comment heartbeat when idle so proxies keep the connection open and
+    closes after max_seconds; EventSource reconnects with Last-Event-ID.
+    """
+    try:
+        yield "retry: 3000\n\n"
+        if resync:
+            yield "event: resync\ndata: {}\n\n"
+        for event in replay:
+            yield event.to_sse()
+
+        deadline = time.monotonic() + max_seconds
+        while time.monotonic() < deadline:
+            events, overflowed = subscription.wait(heartbeat_seconds)
+            if overflowed:
+                yield "event: resync\ndata: {}\n\n"
+            if not events:
+                yield ": heartbeat\n\n"
+                continue
+            for event in events:
+                yield event.to_sse()
+    finally:
+        broker.unsubscribe(subscription)
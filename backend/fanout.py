@@ -0,0 +1,215 @@
+"""
+Issue following and notification fan-out for CivicFix
+Users follow issues (implicitly when they vote), sectors and districts. When an issue changes
+status its followers are resolved through the subscriptions table and notified off the request
+thread, one multi-row INSERT per batch of recipients.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import and_, insert, or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from events import broker
+from models import db, Notification, Subscription
+
+
+class InvalidSubscription(ValueError):
+    """The subscription target is missing or unknown"""
+
+
+def sector_key(district, sector):
+    return f"{district}/{sector}"
+
+
+def subscription_target(data):
+    """(target_type, target_key) from a request body like {"type": "sector", "district": ..., "sector": ...}"""
+    target_type = data.get('type')
+    if target_type == 'issue':
+        try:
+            return 'issue', str(int(data.get('issue_id')))
+        except (TypeError, ValueError):
+            raise InvalidSubscription('issue_id is required')
+    if target_type == 'district':
+        if not data.get('district'):
+            raise InvalidSubscription('district is required')
+        return 'district', data['district']
+    if target_type == 'sector':
+        if not data.get('district') or not data.get('sector'):
+            raise InvalidSubscription('district and sector are required')
+        return 'sector', sector_key(data['district'], data['sector'])
+    raise InvalidSubscription(f"type must be one of {', '.join(Subscription.TARGET_TYPES)}")
+
+
+def issue_targets(issue_id, district, sector):
+    """Every subscription target that hears about changes to an issue"""
+    targets = [('issue', str(issue_id))]
+    if district:
+        targets.append(('district', district))
+        if sector:
+            targets.append(('sector', sector_key(district, sector)))
+    return targets
+
+
+def follow(user_id, target_type, target_key, source='manual'):
+    """Subscribe user_id to a target; already following is not an error. The caller commits.
+
+    An explicit follow turns an existing vote follow into a manual one, so unvoting keeps it.
+    """
+    values = {'user_id': user_id, 'target_type': target_type, 'target_key': target_key,
+              'source': source, 'created_at': datetime.utcnow()}
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        statement = (pg_insert if dialect == 'postgresql' else sqlite_insert)(Subscription).values(**values)
+        if source == 'manual':
+            statement = statement.on_conflict_do_update(
+                index_elements=['target_type', 'target_key', 'user_id'], set_={'source': 'manual'}
+            )
+        else:
+            statement = statement.on_conflict_do_nothing()
+        db.session.execute(statement)
+        return
+
+    existing = Subscription.query.filter_by(user_id=user_id, target_type=target_type, target_key=target_key).first()
+    if existing is None:
+        db.session.add(Subscription(**values))
+    elif source == 'manual':
+        existing.source = 'manual'
+
+
+def unfollow_voted_issue(user_id, issue_id):
+    """Drop the follow a vote created; explicit follows stay. The caller commits."""
+    Subscription.query.filter_by(
+        user_id=user_id, target_type='issue', target_key=str(issue_id), source='vote'
+    ).delete(synchronize_session=False)
+
+
+def recipients_query(targets, exclude_user_ids=()):
+    """Distinct user ids subscribed to any of targets"""
+    query = db.session.query(Subscription.user_id).filter(or_(*[
+        and_(Subscription.target_type == target_type, Subscription.target_key == target_key)
+        for target_type, target_key in targets
+    ]))
+    exclude = [str(user_id) for user_id in exclude_user_ids if user_id is not None]
+    if exclude:
+        query = query.filter(Subscription.user_id.notin_(exclude))
+    return query.distinct()
+
+
+class NotificationFanout:
+    """Writes one notification per follower in the background.
+
+    Recipients are paged through by user id (keyset, so each page is an index range scan)
+    and every page is written with a single multi-row INSERT and committed on its own;
+    the unread counter triggers then update once per statement.
+    """
+
+    def __init__(self, max_workers=2, batch_size=1000, push_limit=100):
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.push_limit = push_limit
+        self.app = None
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+        self.fanouts = 0
+        self.notifications = 0
+        self.failed = 0
+        self.total_seconds = 0.0
+
+    def init_app(self, app):
+        self.app = app
+        self.max_workers = app.config['FANOUT_WORKERS']
+        self.batch_size = app.config['FANOUT_BATCH_SIZE']
+        self.push_limit = app.config['FANOUT_PUSH_LIMIT']
+        self._executor = None
+        self._executor_pid = None
+
+    def _ensure_executor(self):
+        # Created lazily and per process, so forked workers get their own threads
+        pid = os.getpid()
+        if self._executor_pid != pid:
+            with self._lock:
+                if self._executor_pid != pid:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='notification-fanout')
+                    self._executor_pid = pid
+        return self._executor
+
+    def submit(self, issue, title, message, notification_type='status_update', exclude_user_ids=()):
+        """Notify everyone following issue, its sector or its district (call after commit)"""
+        targets = issue_targets(issue.id, issue.district, issue.sector)
+        self._ensure_executor().submit(
+            self._run_in_context, issue.id, targets, title, message, notification_type, tuple(exclude_user_ids)
+        )
+
+    def _run_in_context(self, *args):
+        with self.app.app_context():
+            try:
+                self.run(*args)
+            except Exception as e:
+                db.session.rollback()
+                with self._lock:
+                    self.failed += 1
+                print(f"[FANOUT] ERROR notifying followers of issue #{args[0]}: {e}")
+
+    def run(self, issue_id, targets, title, message, notification_type, exclude_user_ids=()):
+        """Write the notifications; returns how many were created"""
+        started = time.monotonic()
+        query = recipients_query(targets, exclude_user_ids)
+        created = 0
+        pushed = []
+        last_user_id = None
+        while True:
+            page = query
+            if last_user_id is not None:
+                page = page.filter(Subscription.user_id > last_user_id)
+            user_ids = [row[0] for row in page.order_by(Subscription.user_id).limit(self.batch_size).all()]
+            if not user_ids:
+                break
+
+            now = datetime.utcnow()
+            db.session.execute(insert(Notification), [
+                {'user_id': user_id, 'issue_id': issue_id, 'title': title, 'message': message,
+                 'type': notification_type, 'read': False, 'created_at': now}
+                for user_id in user_ids
+            ])
+            db.session.commit()
+            created += len(user_ids)
+            if len(pushed) <= self.push_limit:
+                pushed.extend(user_ids[:self.push_limit + 1 - len(pushed)])
+            last_user_id = user_ids[-1]
+
+        # Live badge refresh for small fan-outs; large ones are picked up by the unread counter
+        if created <= self.push_limit:
+            for user_id in pushed:
+                try:
+                    broker.publish('notification', {'issue_id': issue_id, 'title': title},
+                                   audience='user', user_id=user_id)
+                except Exception as event_error:
+                    print(f"Event publish error (non-critical): {event_error}")
+
+        with self._lock:
+            self.fanouts += 1
+            self.notifications += created
+            self.total_seconds += time.monotonic() - started
+        return created
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.max_workers,
+                'batch_size': self.batch_size,
+                'fanouts': self.fanouts,
+                'notifications': self.notifications,
+                'failed': self.failed,
+                'avg_seconds': round(self.total_seconds / self.fanouts, 3) if self.fanouts else 0.0
+            }
+
+
+# Global fan-out engine (initialized in create_app)
+notification_fanout = NotificationFanout()
@@ -0,0 +1,70 @@
+"""
+Gunicorn settings for CivicFix:  gunicorn -c gunicorn.conf.py
+
+Several worker processes, each with a pool of threads (gthread). The app is loaded once in
+the master (preload_app) and forked, so every worker starts from the built static assets and
+compiled code; state that must not cross fork is reset in post_fork. Thread pools, HTTP and
+SMTP clients and the event bus listener are already created lazily per process.
+
+With more than one worker the following must be shared between processes:
+    RATELIMIT_STORAGE_URI  defaults to a SQLite file in the temp directory (this host only)
+    EVENT_BUS_URL          postgresql://... or redis://..., or live events only reach one worker
+    FEED_CACHE_URL         optional; memory:// is per worker and bounded by FEED_CACHE_TTL
+Socket.IO stays disabled (socketio is None); live updates go through /api/events/stream.
+"""
+
+import multiprocessing
+import os
+import random
+import tempfile
+
+wsgi_app = 'app:create_app()'
+bind = f"0.0.0.0:{os.environ.get('PORT', '10000')}"
+
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', '64'))  # SSE streams hold a thread each (SSE_MAX_CONNECTIONS)
+timeout = 120
+keepalive = 5
+preload_app = True
+
+# Recycle workers after a number of requests (staggered by the jitter) to bound memory growth;
+# in-flight requests get graceful_timeout seconds, SSE clients reconnect with Last-Event-ID
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '5000'))
+max_requests_jitter = max_requests // 10
+graceful_timeout = 30
+
+# Heartbeat files on tmpfs, so a slow disk cannot get workers killed
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+if workers > 1:
+    # Must be set before the app (and config.py) is loaded
+    os.environ.setdefault('RATELIMIT_STORAGE_URI',
+                          f"sqlite:///{os.path.join(tempfile.gettempdir(), 'civicfix-ratelimit.db')}")
+
+
+def _dispose_engines(application, close):
+    from models import db
+    with application.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=close)
+
+
+def when_ready(server):
+    """Close anything the master opened while loading the app, before the first fork"""
+    application = server.app.wsgi()
+    _dispose_engines(application, close=True)
+
+    if server.cfg.workers > 1:
+        for key in ('EVENT_BUS_URL', 'RATELIMIT_STORAGE_URI'):
+            if application.config[key].startswith('memory://'):
+                server.log.warning("%s is memory:// with %d workers; it is not shared between them",
+                                   key, server.cfg.workers)
+
+
+def post_fork(server, worker):
+    """Per-worker state that must not be inherited from the master"""
+    # Forked workers would otherwise share the master's PRNG state (verification codes)
+    random.seed()
+    # Drop pooled connections without closing the sockets the master might still own
+    _dispose_engines(server.app.wsgi(), close=False)
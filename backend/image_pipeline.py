@@ -0,0 +1,261 @@
+"""
+Background image pipeline for issue uploads
+The request only spools the upload to disk; a bounded pool of worker threads validates,
+downscales and re-encodes it (dropping EXIF) and streams the result to content-addressed storage (image_store.py).
+Issues carry image_status: pending -> ready | failed
+"""
+
+import os
+import threading
+import time
+import uuid
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from PIL import Image, ImageOps
+from werkzeug.utils import secure_filename
+
+from image_store import acquire_blob, delete_orphaned_blobs, dhash, find_similar_issue, release_blob
+from models import db, Issue
+from response_cache import feed_cache
+from storage import HashingWriter
+
+# Formats Pillow must detect from the file content, whatever the extension says
+ACCEPTED_FORMATS = {'JPEG', 'PNG', 'GIF', 'WEBP'}
+
+# Refuse decompression bombs instead of only warning about them
+MAX_IMAGE_PIXELS = 40 * 1000 * 1000
+
+
+class InvalidImage(Exception):
+    """The upload is not an image we accept"""
+
+
+# A processed image written to the spool, hashed while it was encoded
+ProcessedImage = namedtuple('ProcessedImage', 'path sha256 size extension content_type dhash')
+
+
+def process_image(path, output_path, max_dimension=1600, quality=85):
+    """Validate, orient and downscale the image at path, writing the result to output_path.
+
+    Re-encoding without the original metadata strips EXIF (including GPS).
+    Returns a ProcessedImage.
+    """
+    try:
+        with Image.open(path) as img:
+            img.verify()
+        with Image.open(path) as img:
+            if img.format not in ACCEPTED_FORMATS:
+                raise InvalidImage(f"Unsupported image format: {img.format}")
+            if img.width * img.height > MAX_IMAGE_PIXELS:
+                raise InvalidImage("Image dimensions are too large")
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+
+            try:
+                perceptual = dhash(img)
+            except Exception as e:
+                print(f"[IMAGE PIPELINE] Could not compute dHash: {e}")
+                perceptual = None
+
+            with open(output_path, 'wb') as f:
+                output = HashingWriter(f)
+                if img.mode in ('RGBA', 'LA', 'P'):
+                    # Keep transparency (screenshots, logos)
+                    img.save(output, format='PNG', optimize=True)
+                    extension, content_type = 'png', 'image/png'
+                else:
+                    img.convert('RGB').save(output, format='JPEG', quality=quality, optimize=True, progressive=True)
+                    extension, content_type = 'jpg', 'image/jpeg'
+            return ProcessedImage(output_path, output.sha256, output.size, extension, content_type, perceptual)
+    except InvalidImage:
+        raise
+    except (Image.DecompressionBombError, Image.DecompressionBombWarning):
+        raise InvalidImage("Image dimensions are too large")
+    except Exception as e:
+        raise InvalidImage(f"Could not read image: {e}")
+
+
+class ImagePipeline:
+    """Bounded worker pool for issue images.
+
+    At most max_workers images are processed at once and at most queue_size wait;
+    when the queue is full the request thread processes the image itself, which
+    slows that request down instead of letting memory and disk use grow unbounded.
+    """
+
+    def __init__(self, max_workers=2, queue_size=32):
+        self.max_workers = max_workers
+        self.queue_size = queue_size
+        self.app = None
+        self.store = None
+        self._executor = None
+        self._executor_pid = None
+        self._slots = threading.BoundedSemaphore(max_workers + queue_size)
+        self._lock = threading.Lock()
+        self.processed = 0
+        self.failed = 0
+        self.inline = 0
+        self.deduplicated = 0
+        self.total_seconds = 0.0
+
+    def init_app(self, app, store):
+        """store is the storage backend (storage.py) processed images are uploaded to"""
+        self.app = app
+        self.store = store
+        self.max_workers = app.config['IMAGE_WORKERS']
+        self.queue_size = app.config['IMAGE_QUEUE_SIZE']
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.queue_size)
+        self._executor = None
+        self._executor_pid = None
+
+    @property
+    def spool_dir(self):
+        return os.path.join(self.app.root_path, self.app.config['IMAGE_SPOOL_FOLDER'])
+
+    def _ensure_executor(self):
+        # Created lazily and per process, so forked workers get their own threads
+        pid = os.getpid()
+        if self._executor_pid != pid:
+            with self._lock:
+                if self._executor_pid != pid:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='image-pipeline')
+                    self._executor_pid = pid
+        return self._executor
+
+    def spool(self, file):
+        """Stream an uploaded FileStorage to the spool directory; returns (path, original filename)"""
+        os.makedirs(self.spool_dir, exist_ok=True)
+        filename = secure_filename(file.filename) or 'image'
+        path = os.path.join(self.spool_dir, f"{uuid.uuid4().hex}.upload")
+        file.save(path)  # Copies in chunks, the upload is never held in memory whole
+        return path, filename
+
+    def submit(self, issue_id, path, filename):
+        """Queue a spooled upload for the issue (call after the issue is committed)"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.inline += 1
+            print(f"[IMAGE PIPELINE] Queue full, processing issue #{issue_id} image in the request")
+            self._run(issue_id, path, filename)
+            return False
+        try:
+            self._ensure_executor().submit(self._run_queued, issue_id, path, filename)
+        except Exception:
+            self._slots.release()
+            raise
+        return True
+
+    def _run_queued(self, issue_id, path, filename):
+        try:
+            with self.app.app_context():
+                self._run(issue_id, path, filename)
+        finally:
+            self._slots.release()
+
+    def _run(self, issue_id, path, filename):
+        started = time.monotonic()
+        blob = None
+        output_path = f"{path}.out"
+        try:
+            image = process_image(path, output_path, self.app.config['IMAGE_MAX_DIMENSION'])
+            # Stored under its content hash; identical images are uploaded only once
+            blob, reused = acquire_blob(image, self.store)
+            if blob is None:
+                print(f"[IMAGE PIPELINE] Upload failed for issue #{issue_id} ({filename})")
+            elif reused:
+                with self._lock:
+                    self.deduplicated += 1
+        except InvalidImage as e:
+            print(f"[IMAGE PIPELINE] Rejected image for issue #{issue_id}: {e}")
+        except Exception as e:
+            print(f"[IMAGE PIPELINE] ERROR processing image for issue #{issue_id}: {e}")
+        finally:
+            for spooled in (path, output_path):
+                try:
+                    os.remove(spooled)
+                except OSError:
+                    pass
+
+        try:
+            self._finish(issue_id, blob)
+        except Exception as e:
+            db.session.rollback()
+            print(f"[IMAGE PIPELINE] ERROR saving image result for issue #{issue_id}: {e}")
+
+        with self._lock:
+            if blob is not None:
+                self.processed += 1
+            else:
+                self.failed += 1
+            self.total_seconds += time.monotonic() - started
+
+    def _finish(self, issue_id, blob):
+        orphaned = []
+        issue = db.session.get(Issue, issue_id)
+        if issue is None:
+            # Deleted while its image was being processed
+            if blob is not None:
+                if release_blob(blob.sha256):
+                    orphaned.append(blob.sha256)
+                db.session.commit()
+                delete_orphaned_blobs(self.store, orphaned)
+            return
+        if blob is not None:
+            previous_sha256 = issue.image_sha256
+            issue.image_url = blob.url
+            issue.image_sha256 = blob.sha256
+            issue.image_status = 'ready'
+            if previous_sha256 and release_blob(previous_sha256):
+                orphaned.append(previous_sha256)
+            if self.app.config['IMAGE_DUPLICATE_DETECTION']:
+                similar = find_similar_issue(issue, blob, self.app.config['IMAGE_DUPLICATE_DISTANCE'])
+                issue.possible_duplicate_of = similar.id if similar else None
+        else:
+            # An edit keeps its previous image if the new one could not be processed
+            issue.image_status = 'ready' if issue.image_url else 'failed'
+        db.session.commit()
+        feed_cache.invalidate_issues(issue)
+        delete_orphaned_blobs(self.store, orphaned)
+
+    def expire_stale(self, max_age_seconds=3600):
+        """Fail issues stuck in pending (e.g. the worker died), remove orphaned spool files and image blobs"""
+        cutoff = time.time() - max_age_seconds
+        removed = 0
+        if os.path.isdir(self.spool_dir):
+            for name in os.listdir(self.spool_dir):
+                path = os.path.join(self.spool_dir, name)
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+
+        stale = Issue.query.filter(
+            Issue.image_status == 'pending',
+            Issue.updated_at < datetime.utcnow() - timedelta(seconds=max_age_seconds)
+        )
+        failed = 0
+        for issue in stale.all():
+            issue.image_status = 'ready' if issue.image_url else 'failed'
+            feed_cache.invalidate_issues(issue)
+            failed += 1
+        db.session.commit()
+        blobs_deleted = delete_orphaned_blobs(self.store)
+        return {'spool_files_removed': removed, 'issues_failed': failed, 'blobs_deleted': blobs_deleted}
+
+    def stats(self):
+        with self._lock:
+            done = self.processed + self.failed
+            return {
+                'workers': self.max_workers,
+                'queue_size': self.queue_size,
+                'processed': self.processed,
+                'failed': self.failed,
+                'processed_inline': self.inline,
+                'deduplicated': self.deduplicated,
+                'avg_seconds': round(self.total_seconds / done, 3) if done else 0.0
+            }
+
+
+# Global pipeline instance (initialized in create_app)
+image_pipeline = ImagePipeline()
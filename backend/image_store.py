@@ -0,0 +1,165 @@
+"""
+Content-addressed image storage for CivicFix
+Processed images are stored once under their SHA-256 and reference-counted by the issues
+using them; a 64-bit difference hash (dHash) flags near-duplicate photos
+"""
+
+from PIL import Image
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+
+from models import db, ImageBlob, Issue
+from storage import StorageError, StorageNotFound
+
+# The dHash is indexed as four 16-bit bands: two hashes within 3 bits of each other
+# always share at least one band, so lookups only touch a handful of rows
+DHASH_BANDS = 4
+DHASH_BAND_BITS = 16
+
+
+def dhash(img, size=8):
+    """64-bit difference hash of a PIL image: robust to resizing and recompression"""
+    pixels = list(img.convert('L').resize((size + 1, size), Image.Resampling.LANCZOS).getdata())
+    value = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            right = pixels[row * (size + 1) + col + 1]
+            value = (value << 1) | (1 if left > right else 0)
+    return value
+
+
+def dhash_bands(value):
+    mask = (1 << DHASH_BAND_BITS) - 1
+    return [(value >> (band * DHASH_BAND_BITS)) & mask for band in range(DHASH_BANDS)]
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count('1')
+
+
+def acquire_blob(image, store):
+    """Store a processed image once and take a reference to it.
+
+    image is a ProcessedImage (image_pipeline.py) whose file is streamed to store;
+    byte-identical content reuses the existing blob without uploading again.
+    Returns (blob, reused) or (None, False) if the upload failed.
+    """
+    blob = ImageBlob.query.filter_by(sha256=image.sha256).with_for_update().first()
+    if blob is not None:
+        blob.ref_count += 1
+        db.session.commit()
+        return blob, True
+
+    storage_key = f"{image.sha256}.{image.extension}"
+    try:
+        with open(image.path, 'rb') as f:
+            url, sha256, _ = store.put(storage_key, f, image.content_type)
+    except StorageError as e:
+        print(f"[IMAGE STORE] Upload of {storage_key} failed: {e}")
+        return None, False
+    if sha256 != image.sha256:
+        print(f"[IMAGE STORE] {storage_key} changed on disk before it was uploaded")
+        return None, False
+
+    blob = ImageBlob(
+        sha256=image.sha256,
+        storage_key=storage_key,
+        url=url,
+        content_type=image.content_type,
+        size=image.size,
+        ref_count=1,
+        dhash=f"{image.dhash:016x}" if image.dhash is not None else None
+    )
+    if image.dhash is not None:
+        blob.set_dhash_bands(dhash_bands(image.dhash))
+    try:
+        db.session.add(blob)
+        db.session.commit()
+        return blob, False
+    except IntegrityError:
+        # A concurrent upload of the same bytes created the row first
+        db.session.rollback()
+        blob = ImageBlob.query.filter_by(sha256=image.sha256).with_for_update().first()
+        blob.ref_count += 1
+        db.session.commit()
+        return blob, True
+
+
+def release_blob(sha256):
+    """Drop one reference; the last one leaves the blob orphaned (ref_count 0).
+
+    Runs in the caller's transaction and never touches storage, so no lock is held across
+    storage calls. Returns True if the blob was orphaned: after committing, pass it to
+    delete_orphaned_blobs (expire_stale also sweeps any that were left behind).
+    """
+    if not sha256:
+        return False
+    blob = ImageBlob.query.filter_by(sha256=sha256).with_for_update().first()
+    if blob is None:
+        return False
+    blob.ref_count -= 1
+    return blob.ref_count <= 0
+
+
+def delete_orphaned_blobs(store, sha256s=None, limit=500):
+    """Delete orphaned blobs and their stored objects, one short transaction each.
+
+    sha256s limits the sweep to those blobs (e.g. the ones a request just released).
+    The row is re-checked under lock, so a blob acquired again since it was orphaned
+    is kept, and a concurrent acquire_blob waits and then uploads afresh instead of
+    pointing at a deleted object. Returns the number of blobs deleted.
+    """
+    query = db.session.query(ImageBlob.sha256).filter(ImageBlob.ref_count <= 0)
+    if sha256s is not None:
+        if not sha256s:
+            return 0
+        query = query.filter(ImageBlob.sha256.in_(sha256s))
+    candidates = [row[0] for row in query.limit(limit).all()]
+    db.session.commit()
+
+    deleted = 0
+    for sha256 in candidates:
+        blob = ImageBlob.query.filter_by(sha256=sha256).with_for_update().first()
+        if blob is None or blob.ref_count > 0:
+            db.session.commit()
+            continue
+        try:
+            store.delete(blob.storage_key)
+        except StorageNotFound:
+            pass
+        except StorageError as e:
+            # Keep the row so the next sweep retries
+            print(f"[IMAGE STORE] Could not delete {blob.storage_key} from storage: {e}")
+            db.session.rollback()
+            continue
+        db.session.delete(blob)
+        db.session.commit()
+        deleted += 1
+    return deleted
+
+
+def find_similar_issue(issue, blob, max_distance=3):
+    """Most recent other issue whose photo is identical or within max_distance bits of blob's dHash"""
+    query = Issue.query.filter(Issue.id != issue.id, Issue.image_sha256.isnot(None))
+    if issue.district:
+        query = query.filter(Issue.district == issue.district)
+
+    # Byte-identical photo reused from another issue
+    same = query.filter(Issue.image_sha256 == blob.sha256).order_by(Issue.id.desc()).first()
+    if same is not None:
+        return same
+    if not blob.dhash:
+        return None
+
+    target = int(blob.dhash, 16)
+    bands = dhash_bands(target)
+    candidates = ImageBlob.query.filter(
+        ImageBlob.sha256 != blob.sha256,
+        or_(*[getattr(ImageBlob, f'dhash_band{band}') == value for band, value in enumerate(bands)])
+    ).limit(200).all()
+    similar = [candidate.sha256 for candidate in candidates
+               if candidate.dhash and hamming_distance(target, int(candidate.dhash, 16)) <= max_distance]
+    if not similar:
+        return None
+    return query.filter(Issue.image_sha256.in_(similar)).order_by(Issue.id.desc()).first()
@@ -0,0 +1,184 @@
+"""
+On-demand image variants for CivicFix
+Resized/re-encoded copies of uploaded and stored images are generated on first request and
+kept in a size-capped disk cache (least recently used files are evicted first)
+"""
+
+import hashlib
+import io
+import os
+import threading
+
+from PIL import Image, ImageOps
+
+# Widths are snapped up to one of these so URLs cannot create unbounded variants
+VARIANT_WIDTHS = (160, 320, 480, 640, 960, 1280)
+
+VARIANT_FORMATS = {
+    'webp': ('WEBP', 'image/webp'),
+    'jpeg': ('JPEG', 'image/jpeg'),
+    'jpg': ('JPEG', 'image/jpeg'),
+    'png': ('PNG', 'image/png'),
+}
+
+# Stored originals are fetched at most this large
+MAX_SOURCE_BYTES = 16 * 1024 * 1024
+
+
+class InvalidVariant(Exception):
+    """The requested width or format is not supported"""
+
+
+def variant_spec(width, fmt):
+    """Validate ?w= and ?fmt=; returns (snapped width or None, format name)"""
+    fmt = (fmt or 'webp').lower()
+    if fmt not in VARIANT_FORMATS:
+        raise InvalidVariant(f"Unsupported format: {fmt}")
+    if width is None:
+        return None, fmt
+    if width <= 0:
+        raise InvalidVariant("Width must be positive")
+    for allowed in VARIANT_WIDTHS:
+        if width <= allowed:
+            return allowed, fmt
+    return VARIANT_WIDTHS[-1], fmt
+
+
+def render_variant(source, width, fmt, quality=80):
+    """Resize the image at source (a path or file object) and encode it as fmt"""
+    pil_format, _ = VARIANT_FORMATS[fmt]
+    with Image.open(source) as img:
+        img = ImageOps.exif_transpose(img)
+        if width and img.width > width:
+            img.thumbnail((width, width * 4), Image.Resampling.LANCZOS)
+        if pil_format == 'JPEG' and img.mode != 'RGB':
+            img = img.convert('RGB')
+        elif img.mode == 'P':
+            img = img.convert('RGBA')
+        output = io.BytesIO()
+        if pil_format == 'PNG':
+            img.save(output, format='PNG', optimize=True)
+        else:
+            img.save(output, format=pil_format, quality=quality, optimize=True)
+        return output.getvalue()
+
+
+class VariantCache:
+    """Disk cache of rendered variants capped at max_bytes.
+
+    File mtimes record the last use; when the cap is exceeded the least recently used
+    files are deleted. Concurrent requests for a missing variant wait for the first one
+    to render it instead of rendering it again.
+    """
+
+    def __init__(self, directory=None, max_bytes=256 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._size = None
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def configure(self, directory, max_bytes):
+        with self._lock:
+            self.directory = directory
+            self.max_bytes = max_bytes
+            self._size = None
+
+    def _path(self, key, fmt):
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        extension = 'jpg' if VARIANT_FORMATS[fmt][0] == 'JPEG' else fmt
+        return os.path.join(self.directory, digest[:2], f"{digest}.{extension}")
+
+    def get_or_render(self, key, fmt, render):
+        """Return the path of the cached variant for key, calling render() -> bytes on a miss"""
+        path = self._path(key, fmt)
+        while True:
+            with self._lock:
+                if os.path.exists(path):
+                    self.hits += 1
+                    self._touch(path)
+                    return path
+                pending = self._inflight.get(path)
+                if pending is None:
+                    pending = self._inflight[path] = threading.Event()
+                    self.misses += 1
+                    break
+                self.coalesced += 1
+            # Another request is rendering this variant; wait and re-check
+            pending.wait(30)
+
+        try:
+            content = render()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(content)
+            os.replace(temp_path, path)  # Readers never see a partial file
+            self._add(len(content))
+            return path
+        finally:
+            with self._lock:
+                self._inflight.pop(path, None)
+            pending.set()
+
+    def _touch(self, path):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _scan(self):
+        files = []
+        if self.directory and os.path.isdir(self.directory):
+            for root, _, names in os.walk(self.directory):
+                for name in names:
+                    if name.endswith('.tmp'):
+                        continue
+                    full_path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(full_path)
+                    except OSError:
+                        continue
+                    files.append((stat.st_mtime, stat.st_size, full_path))
+        return files
+
+    def _add(self, size):
+        with self._lock:
+            if self._size is None:
+                self._size = sum(entry[1] for entry in self._scan())
+            else:
+                self._size += size
+            if self._size <= self.max_bytes:
+                return
+            # Evict least recently used variants down to 90% of the cap
+            target = self.max_bytes * 0.9
+            files = sorted(self._scan())
+            self._size = sum(entry[1] for entry in files)
+            for _, file_size, file_path in files:
+                if self._size <= target:
+                    break
+                try:
+                    os.remove(file_path)
+                    self._size -= file_size
+                    self.evictions += 1
+                except OSError:
+                    pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                'disk_bytes': self._size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'evictions': self.evictions
+            }
+
+
+# Global variant cache (configured in create_app)
+variant_cache = VariantCache()
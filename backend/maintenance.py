@@ -0,0 +1,266 @@
+"""
+Maintenance jobs for CivicFix
+Batch repair tasks that are safe to run against a live database
+"""
+
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import db, Issue, IssueStat, Notification, NotificationCounter, NotificationSummary, User, Vote
+
+
+def repair_vote_counts(batch_size=500):
+    """Recount issues.vote_count from the votes table, one batch of issues at a time.
+
+    Each batch is committed separately so row locks are only held briefly.
+    Returns a dict with the number of issues scanned and counters repaired.
+    """
+    started = time.monotonic()
+    scanned = 0
+    repaired = 0
+    last_id = 0
+
+    while True:
+        ids = [row[0] for row in db.session.query(Issue.id)
+               .filter(Issue.id > last_id)
+               .order_by(Issue.id)
+               .limit(batch_size)
+               .all()]
+        if not ids:
+            break
+
+        actual_count = db.session.query(func.count(Vote.id))\
+                                 .filter(Vote.issue_id == Issue.id)\
+                                 .scalar_subquery()
+
+        repaired += Issue.query.filter(
+            Issue.id.in_(ids),
+            Issue.vote_count != actual_count
+        ).update({Issue.vote_count: actual_count, Issue.revision: Issue.revision + 1},
+                 synchronize_session=False)
+        db.session.commit()
+
+        scanned += len(ids)
+        last_id = ids[-1]
+
+    return {
+        'scanned': scanned,
+        'repaired': repaired,
+        'seconds': round(time.monotonic() - started, 3)
+    }
+
+
+def _dialect_insert(model):
+    """INSERT construct with ON CONFLICT support for the session's dialect, or None"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        return pg_insert(model)
+    if dialect == 'sqlite':
+        return sqlite_insert(model)
+    return None
+
+
+def _insert_counter(model, values):
+    """Insert a missing counter row, unless a trigger created it concurrently (the caller commits).
+
+    A row created since the recount started may already hold changes the recount did not
+    see, so it is left alone; the next run checks it.
+    """
+    statement = _dialect_insert(model)
+    if statement is not None:
+        db.session.execute(statement.values(**values).on_conflict_do_nothing())
+    else:
+        db.session.add(model(**values))
+
+
+def _add_to_summary(user_id, count, oldest_at, newest_at, now):
+    """Add archived notifications to a user's summary in one atomic upsert (the caller commits)"""
+    statement = _dialect_insert(NotificationSummary)
+    if statement is None:
+        summary = db.session.get(NotificationSummary, user_id, with_for_update=True)
+        if summary is None:
+            db.session.add(NotificationSummary(user_id=user_id, archived_count=count, oldest_at=oldest_at,
+                                               newest_at=newest_at, updated_at=now))
+        else:
+            summary.archived_count += count
+            summary.oldest_at = min(filter(None, (summary.oldest_at, oldest_at)), default=None)
+            summary.newest_at = max(filter(None, (summary.newest_at, newest_at)), default=None)
+            summary.updated_at = now
+        return
+
+    statement = statement.values(user_id=user_id, archived_count=count, oldest_at=oldest_at,
+                                 newest_at=newest_at, updated_at=now)
+    excluded = statement.excluded
+    # Two-argument min/max are LEAST/GREATEST on PostgreSQL
+    least, greatest = (func.least, func.greatest) if db.session.get_bind().dialect.name == 'postgresql' \
+        else (func.min, func.max)
+    db.session.execute(statement.on_conflict_do_update(
+        index_elements=['user_id'],
+        set_={
+            'archived_count': NotificationSummary.archived_count + excluded.archived_count,
+            'oldest_at': least(func.coalesce(NotificationSummary.oldest_at, excluded.oldest_at), excluded.oldest_at),
+            'newest_at': greatest(func.coalesce(NotificationSummary.newest_at, excluded.newest_at), excluded.newest_at),
+            'updated_at': excluded.updated_at
+        }
+    ))
+
+
+def reconcile_issue_stats():
+    """Recount issue_stats one district at a time and fix counters that drifted.
+
+    Each district is its own short transaction: its counter rows are locked with
+    SELECT ... FOR UPDATE, so no trigger can change them between the recount and the
+    fix, while issues in other districts keep being written. Returns a dict with the
+    counters checked and repaired.
+    """
+    started = time.monotonic()
+    district = func.coalesce(Issue.district, '')
+    districts = {row[0] for row in db.session.query(district).distinct().all()}
+    districts |= {row[0] for row in db.session.query(IssueStat.district).distinct().all()}
+    db.session.commit()
+
+    checked = 0
+    repaired = 0
+    for name in sorted(districts):
+        stored = {(stat.province, stat.category, stat.status): stat
+                  for stat in IssueStat.query.filter(IssueStat.district == name).with_for_update().all()}
+
+        # Compare the column itself (not COALESCE) so the district index is used
+        in_district = Issue.district == name if name else db.or_(Issue.district.is_(None), Issue.district == '')
+        province = func.coalesce(Issue.province, '')
+        actual = {
+            (row[0], row[1], row[2]): row[3]
+            for row in db.session.query(province, Issue.category, Issue.status, func.count(Issue.id))
+                                 .filter(in_district)
+                                 .group_by(province, Issue.category, Issue.status)
+                                 .all()
+        }
+
+        for key in set(actual) | set(stored):
+            count = actual.get(key, 0)
+            stat = stored.get(key)
+            if stat is None:
+                _insert_counter(IssueStat, {'district': name, 'province': key[0], 'category': key[1],
+                                            'status': key[2], 'issue_count': count})
+                repaired += 1
+            elif stat.issue_count != count:
+                stat.issue_count = count
+                repaired += 1
+        db.session.commit()
+        checked += len(set(actual) | set(stored))
+
+    return {
+        'checked': checked,
+        'repaired': repaired,
+        'seconds': round(time.monotonic() - started, 3)
+    }
+
+
+def reconcile_notification_counters(batch_size=500):
+    """Recount unread notifications batch_size users at a time and fix counters that drifted.
+
+    Each batch is its own short transaction: the batch's counter rows are locked with
+    SELECT ... FOR UPDATE, so no trigger can change them between the recount and the
+    fix, while other users keep receiving notifications. Returns a dict with the
+    counters checked and repaired.
+    """
+    started = time.monotonic()
+    checked = 0
+    repaired = 0
+    last_id = ''
+
+    while True:
+        user_ids = [row[0] for row in db.session.query(User.id)
+                    .filter(User.id > last_id)
+                    .order_by(User.id)
+                    .limit(batch_size)
+                    .all()]
+        if not user_ids:
+            break
+
+        stored = {counter.user_id: counter for counter in NotificationCounter.query
+                  .filter(NotificationCounter.user_id.in_(user_ids))
+                  .with_for_update()
+                  .all()}
+        actual = dict(db.session.query(Notification.user_id, func.count(Notification.id))
+                      .filter(Notification.user_id.in_(user_ids), Notification.read == False)
+                      .group_by(Notification.user_id)
+                      .all())
+
+        for user_id in set(actual) | set(stored):
+            count = actual.get(user_id, 0)
+            counter = stored.get(user_id)
+            if counter is None:
+                _insert_counter(NotificationCounter, {'user_id': user_id, 'unread_count': count})
+                repaired += 1
+            elif counter.unread_count != count:
+                counter.unread_count = count
+                repaired += 1
+        db.session.commit()
+
+        checked += len(set(actual) | set(stored))
+        last_id = user_ids[-1]
+
+    return {
+        'checked': checked,
+        'repaired': repaired,
+        'seconds': round(time.monotonic() - started, 3)
+    }
+
+
+def compact_notifications(retention_days=90, batch_size=1000, pause_seconds=0.0):
+    """Delete read notifications older than retention_days, rolling them into notification_summaries.
+
+    Rows are taken in id order, batch_size at a time, and each batch (summary update plus
+    DELETE) is its own short transaction. On PostgreSQL the batch is claimed with
+    FOR UPDATE SKIP LOCKED, so an overlapping run never counts the same rows twice.
+    Unread notifications are never removed. Returns a dict with the rows deleted, the
+    users summarized, the batches run and the time spent.
+    """
+    started = time.monotonic()
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    deleted = 0
+    batches = 0
+    users = set()
+    last_id = 0
+
+    while True:
+        ids = [row[0] for row in db.session.query(Notification.id)
+               .filter(Notification.id > last_id,
+                       Notification.read == True,
+                       Notification.created_at < cutoff)
+               .order_by(Notification.id)
+               .limit(batch_size)
+               .with_for_update(skip_locked=True)
+               .all()]
+        if not ids:
+            db.session.rollback()
+            break
+
+        rollup = db.session.query(Notification.user_id, func.count(Notification.id),
+                                  func.min(Notification.created_at), func.max(Notification.created_at))\
+                           .filter(Notification.id.in_(ids))\
+                           .group_by(Notification.user_id)\
+                           .all()
+        now = datetime.utcnow()
+        for user_id, count, oldest_at, newest_at in rollup:
+            # An upsert, so overlapping runs cannot both insert a user's first summary
+            _add_to_summary(user_id, count, oldest_at, newest_at, now)
+            users.add(user_id)
+
+        deleted += Notification.query.filter(Notification.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        batches += 1
+        last_id = ids[-1]
+        if pause_seconds:
+            time.sleep(pause_seconds)  # Let replication and other writers catch up between batches
+
+    return {
+        'deleted': deleted,
+        'users': len(users),
+        'batches': batches,
+        'seconds': round(time.monotonic() - started, 3)
+    }
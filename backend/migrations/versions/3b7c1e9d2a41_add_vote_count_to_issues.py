@@ -0,0 +1,32 @@
+"""Add denormalized vote_count to issues
+
+Revision ID: 3b7c1e9d2a41
+Revises: 088607a8450f
+Create Date: 2026-10-18 09:12:04.418210
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b7c1e9d2a41'
+down_revision = '088607a8450f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('issues', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('vote_count', sa.Integer(), server_default='0', nullable=False))
+
+    # Backfill counters from the existing votes
+    op.execute("""
+        UPDATE issues
+        SET vote_count = (SELECT COUNT(*) FROM votes WHERE votes.issue_id = issues.id)
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('issues', schema=None) as batch_op:
+        batch_op.drop_column('vote_count')
@@ -0,0 +1,28 @@
+"""Add (created_at, id) keyset pagination indexes to issues
+
+Revision ID: 5d2e8f4a9c13
+Revises: 3b7c1e9d2a41
+Create Date: 2026-10-18 10:03:51.774023
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d2e8f4a9c13'
+down_revision = '3b7c1e9d2a41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('issues', schema=None) as batch_op:
+        batch_op.create_index('idx_issues_created_at_id', ['created_at', 'id'], unique=False)
+        batch_op.create_index('idx_issues_district_created_at_id', ['district', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('issues', schema=None) as batch_op:
+        batch_op.drop_index('idx_issues_district_created_at_id')
+        batch_op.drop_index('idx_issues_created_at_id')
@@ -0,0 +1,37 @@
+"""Add full-text search index for issues
+
+Revision ID: 7a4f0b6c3e25
+Revises: 5d2e8f4a9c13
+Create Date: 2026-10-18 11:26:40.905137
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from search import ensure_search_index
+
+
+# revision identifiers, used by Alembic.
+revision = '7a4f0b6c3e25'
+down_revision = '5d2e8f4a9c13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # PostgreSQL: tsvector column + trigger + GIN index; SQLite: FTS5 table + triggers
+    ensure_search_index(op.get_bind())
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS idx_issues_search_vector")
+        op.execute("DROP TRIGGER IF EXISTS issues_search_vector_trigger ON issues")
+        op.execute("DROP FUNCTION IF EXISTS issues_search_vector_update()")
+        op.execute("ALTER TABLE issues DROP COLUMN IF EXISTS search_vector")
+    elif bind.dialect.name == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS issues_fts_insert")
+        op.execute("DROP TRIGGER IF EXISTS issues_fts_delete")
+        op.execute("DROP TRIGGER IF EXISTS issues_fts_update")
+        op.execute("DROP TABLE IF EXISTS issues_fts")
@@ -0,0 +1,26 @@
+"""Add revision counter to issues
+
+Revision ID: 8c6d2f1e4b07
+Revises: 7a4f0b6c3e25
+Create Date: 2026-10-18 12:41:17.260394
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c6d2f1e4b07'
+down_revision = '7a4f0b6c3e25'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('issues', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('revision', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('issues', schema=None) as batch_op:
+        batch_op.drop_column('revision')
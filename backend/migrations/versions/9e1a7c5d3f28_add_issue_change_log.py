@@ -0,0 +1,52 @@
+"""Add issue change log for delta sync
+
+Revision ID: 9e1a7c5d3f28
+Revises: 8c6d2f1e4b07
+Create Date: 2026-10-18 14:05:32.118764
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from changes import ensure_change_log
+
+
+# revision identifiers, used by Alembic.
+revision = '9e1a7c5d3f28'
+down_revision = '8c6d2f1e4b07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('issue_changes',
+        sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), nullable=False),
+        sa.Column('issue_id', sa.Integer(), nullable=False),
+        sa.Column('change_type', sa.String(length=10), nullable=False),
+        sa.Column('province', sa.String(length=50), nullable=True),
+        sa.Column('district', sa.String(length=50), nullable=True),
+        sa.Column('changed_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('issue_changes', schema=None) as batch_op:
+        batch_op.create_index('idx_issue_changes_district_id', ['district', 'id'], unique=False)
+        batch_op.create_index('idx_issue_changes_changed_at', ['changed_at'], unique=False)
+
+    ensure_change_log(op.get_bind())
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.execute("DROP TRIGGER IF EXISTS issues_change_log_trigger ON issues")
+        op.execute("DROP FUNCTION IF EXISTS issues_log_change()")
+    elif bind.dialect.name == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS issues_change_log_insert")
+        op.execute("DROP TRIGGER IF EXISTS issues_change_log_update")
+        op.execute("DROP TRIGGER IF EXISTS issues_change_log_delete")
+
+    with op.batch_alter_table('issue_changes', schema=None) as batch_op:
+        batch_op.drop_index('idx_issue_changes_changed_at')
+        batch_op.drop_index('idx_issue_changes_district_id')
+
+    op.drop_table('issue_changes')
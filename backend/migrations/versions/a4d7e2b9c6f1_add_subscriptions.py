@@ -0,0 +1,45 @@
+"""Add subscriptions for following issues, sectors and districts
+
+Revision ID: a4d7e2b9c6f1
+Revises: f3a8c2d6e417
+Create Date: 2026-10-18 20:31:05.214876
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4d7e2b9c6f1'
+down_revision = 'f3a8c2d6e417'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('subscriptions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.String(length=36), nullable=False),
+        sa.Column('target_type', sa.String(length=20), nullable=False),
+        sa.Column('target_key', sa.String(length=120), nullable=False),
+        sa.Column('source', sa.String(length=20), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('target_type', 'target_key', 'user_id', name='uq_subscriptions_target_user')
+    )
+    with op.batch_alter_table('subscriptions', schema=None) as batch_op:
+        batch_op.create_index('idx_subscriptions_user_id', ['user_id'], unique=False)
+
+    # Existing voters follow the issues they voted for
+    op.execute("""
+        INSERT INTO subscriptions (user_id, target_type, target_key, source, created_at)
+        SELECT user_id, 'issue', CAST(issue_id AS VARCHAR(120)), 'vote', created_at FROM votes
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('subscriptions', schema=None) as batch_op:
+        batch_op.drop_index('idx_subscriptions_user_id')
+
+    op.drop_table('subscriptions')
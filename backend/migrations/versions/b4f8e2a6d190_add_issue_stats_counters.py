@@ -0,0 +1,52 @@
+"""Add per-district issue counters for the admin dashboard
+
+Revision ID: b4f8e2a6d190
+Revises: 9e1a7c5d3f28
+Create Date: 2026-10-18 15:12:47.302915
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from stats import ensure_issue_stats
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4f8e2a6d190'
+down_revision = '9e1a7c5d3f28'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('issue_stats',
+        sa.Column('district', sa.String(length=50), nullable=False),
+        sa.Column('province', sa.String(length=50), nullable=False),
+        sa.Column('category', sa.String(length=50), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('issue_count', sa.Integer(), server_default='0', nullable=False),
+        sa.PrimaryKeyConstraint('district', 'province', 'category', 'status')
+    )
+
+    # Backfill before the triggers start counting new writes
+    op.execute("""
+        INSERT INTO issue_stats (district, province, category, status, issue_count)
+        SELECT COALESCE(district, ''), COALESCE(province, ''), category, status, COUNT(*)
+        FROM issues
+        GROUP BY COALESCE(district, ''), COALESCE(province, ''), category, status
+    """)
+    ensure_issue_stats(op.get_bind())
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.execute("DROP TRIGGER IF EXISTS issues_stats_update_trigger ON issues")
+        op.execute("DROP TRIGGER IF EXISTS issues_stats_trigger ON issues")
+        op.execute("DROP FUNCTION IF EXISTS issues_count_stats()")
+    elif bind.dialect.name == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS issues_stats_insert")
+        op.execute("DROP TRIGGER IF EXISTS issues_stats_update")
+        op.execute("DROP TRIGGER IF EXISTS issues_stats_delete")
+
+    op.drop_table('issue_stats')
@@ -0,0 +1,31 @@
+"""Add notification summaries for the notification retention job
+
+Revision ID: b8e3f1c5d702
+Revises: a4d7e2b9c6f1
+Create Date: 2026-10-18 21:12:40.583119
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8e3f1c5d702'
+down_revision = 'a4d7e2b9c6f1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('notification_summaries',
+        sa.Column('user_id', sa.String(length=36), nullable=False),
+        sa.Column('archived_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('oldest_at', sa.DateTime(), nullable=True),
+        sa.Column('newest_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade():
+    op.drop_table('notification_summaries')
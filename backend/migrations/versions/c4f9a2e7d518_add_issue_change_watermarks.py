@@ -0,0 +1,35 @@
+"""Add a prune watermark for the issue change log
+
+Revision ID: c4f9a2e7d518
+Revises: b8e3f1c5d702
+Create Date: 2026-10-18 23:04:11.271845
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4f9a2e7d518'
+down_revision = 'b8e3f1c5d702'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('issue_change_watermarks',
+        sa.Column('name', sa.String(length=20), nullable=False),
+        sa.Column('change_id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+    # Rows below the oldest retained change were pruned before the watermark existed
+    op.execute("""
+        INSERT INTO issue_change_watermarks (name, change_id, updated_at)
+        SELECT 'pruned', MIN(id) - 1, CURRENT_TIMESTAMP FROM issue_changes
+        HAVING MIN(id) > 1
+    """)
+
+
+def downgrade():
+    op.drop_table('issue_change_watermarks')
@@ -0,0 +1,29 @@
+"""Add image_status to issues for background image processing
+
+Revision ID: c7a3d9e1f5b2
+Revises: b4f8e2a6d190
+Create Date: 2026-10-18 16:02:19.584310
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7a3d9e1f5b2'
+down_revision = 'b4f8e2a6d190'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('issues', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('image_status', sa.String(length=20), nullable=True))
+
+    # Images uploaded before the pipeline existed are already stored
+    op.execute("UPDATE issues SET image_status = 'ready' WHERE image_url IS NOT NULL")
+
+
+def downgrade():
+    with op.batch_alter_table('issues', schema=None) as batch_op:
+        batch_op.drop_column('image_status')
@@ -0,0 +1,59 @@
+"""Add content-addressed image blobs and duplicate photo flag
+
+Revision ID: d2b6f4a8c913
+Revises: c7a3d9e1f5b2
+Create Date: 2026-10-18 17:21:05.937162
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2b6f4a8c913'
+down_revision = 'c7a3d9e1f5b2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('image_blobs',
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('storage_key', sa.String(length=200), nullable=False),
+        sa.Column('url', sa.String(length=500), nullable=False),
+        sa.Column('content_type', sa.String(length=50), nullable=True),
+        sa.Column('size', sa.Integer(), nullable=True),
+        sa.Column('ref_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('dhash', sa.String(length=16), nullable=True),
+        sa.Column('dhash_band0', sa.Integer(), nullable=True),
+        sa.Column('dhash_band1', sa.Integer(), nullable=True),
+        sa.Column('dhash_band2', sa.Integer(), nullable=True),
+        sa.Column('dhash_band3', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('sha256')
+    )
+    with op.batch_alter_table('image_blobs', schema=None) as batch_op:
+        batch_op.create_index('idx_image_blobs_dhash_band0', ['dhash_band0'], unique=False)
+        batch_op.create_index('idx_image_blobs_dhash_band1', ['dhash_band1'], unique=False)
+        batch_op.create_index('idx_image_blobs_dhash_band2', ['dhash_band2'], unique=False)
+        batch_op.create_index('idx_image_blobs_dhash_band3', ['dhash_band3'], unique=False)
+
+    with op.batch_alter_table('issues', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('image_sha256', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('possible_duplicate_of', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_issues_image_sha256'), ['image_sha256'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('issues', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_issues_image_sha256'))
+        batch_op.drop_column('possible_duplicate_of')
+        batch_op.drop_column('image_sha256')
+
+    with op.batch_alter_table('image_blobs', schema=None) as batch_op:
+        batch_op.drop_index('idx_image_blobs_dhash_band3')
+        batch_op.drop_index('idx_image_blobs_dhash_band2')
+        batch_op.drop_index('idx_image_blobs_dhash_band1')
+        batch_op.drop_index('idx_image_blobs_dhash_band0')
+
+    op.drop_table('image_blobs')
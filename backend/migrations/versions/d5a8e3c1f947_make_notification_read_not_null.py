@@ -0,0 +1,36 @@
+"""Make notifications.read NOT NULL and add id to the unread feed index
+
+Revision ID: d5a8e3c1f947
+Revises: c4f9a2e7d518
+Create Date: 2026-10-18 23:41:27.904316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from notifications import ensure_notification_counters
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5a8e3c1f947'
+down_revision = 'c4f9a2e7d518'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # NULL already counted as unread, so the unread counters do not change
+    op.execute("UPDATE notifications SET read = false WHERE read IS NULL")
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.alter_column('read', existing_type=sa.Boolean(), nullable=False, server_default=sa.false())
+        batch_op.drop_index('idx_notifications_user_read_created')
+        batch_op.create_index('idx_notifications_user_read_created', ['user_id', 'read', 'created_at', 'id'], unique=False)
+    # SQLite rebuilds the table in batch mode, which drops its triggers
+    ensure_notification_counters(op.get_bind())
+
+
+def downgrade():
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.drop_index('idx_notifications_user_read_created')
+        batch_op.create_index('idx_notifications_user_read_created', ['user_id', 'read', 'created_at'], unique=False)
+        batch_op.alter_column('read', existing_type=sa.Boolean(), nullable=True, server_default=None)
+    ensure_notification_counters(op.get_bind())
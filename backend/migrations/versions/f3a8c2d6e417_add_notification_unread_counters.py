@@ -0,0 +1,56 @@
+"""Add unread notification counters and notification feed indexes
+
+Revision ID: f3a8c2d6e417
+Revises: e5c1a7b3d924
+Create Date: 2026-10-18 19:48:12.730415
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from notifications import ensure_notification_counters
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a8c2d6e417'
+down_revision = 'e5c1a7b3d924'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('notification_counters',
+        sa.Column('user_id', sa.String(length=36), nullable=False),
+        sa.Column('unread_count', sa.Integer(), server_default='0', nullable=False),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.create_index('idx_notifications_user_read_created', ['user_id', 'read', 'created_at'], unique=False)
+        batch_op.create_index('idx_notifications_user_created_id', ['user_id', 'created_at', 'id'], unique=False)
+
+    # Backfill before the triggers start counting new writes
+    op.execute("""
+        INSERT INTO notification_counters (user_id, unread_count)
+        SELECT user_id, COUNT(*) FROM notifications
+        WHERE read IS NOT TRUE
+        GROUP BY user_id
+    """)
+    ensure_notification_counters(op.get_bind())
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.execute("DROP TRIGGER IF EXISTS notifications_unread_update ON notifications")
+        op.execute("DROP TRIGGER IF EXISTS notifications_unread_delete ON notifications")
+        op.execute("DROP TRIGGER IF EXISTS notifications_unread_insert ON notifications")
+        op.execute("DROP FUNCTION IF EXISTS notifications_count_unread()")
+    elif bind.dialect.name == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS notifications_unread_update")
+        op.execute("DROP TRIGGER IF EXISTS notifications_unread_delete")
+        op.execute("DROP TRIGGER IF EXISTS notifications_unread_insert")
+
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.drop_index('idx_notifications_user_created_id')
+        batch_op.drop_index('idx_notifications_user_read_created')
+
+    op.drop_table('notification_counters')
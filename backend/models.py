@@ -1,7 +1,11 @@
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, text
 
-db = SQLAlchemy()
+from db_routing import RoutingSession
+
+# RoutingSession sends the reads of @read_replica routes to DATABASE_REPLICA_URLS
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class User(db.Model):
     """Extended user model that links to Supabase Auth users"""
@@ -72,6 +76,16 @@ class Issue(db.Model):
     
     # Image and metadata
     image_url = db.Column(db.String(200))
+    image_status = db.Column(db.String(20))  # None (no image), pending, ready, failed (see image_pipeline.py)
+    image_sha256 = db.Column(db.String(64), index=True)  # ImageBlob holding image_url (None for legacy uploads)
+    possible_duplicate_of = db.Column(db.Integer)  # Earlier issue with the same or a near-identical photo
+    
+    # Denormalized vote counter, kept current by Vote.toggle (see maintenance.repair_vote_counts)
+    vote_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    
+    # Bumped on every change (edits, status, votes); feeds the conditional GET watermark
+    revision = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -89,15 +103,13 @@ class Issue(db.Model):
         db.Index('idx_status', 'status'),
         db.Index('idx_category', 'category'),
         db.Index('idx_created_at', 'created_at'),
+        db.Index('idx_issues_created_at_id', 'created_at', 'id'),
+        db.Index('idx_issues_district_created_at_id', 'district', 'created_at', 'id'),
     )
     
     def __repr__(self):
         return f'<Issue {self.title}>'
     
-    @property
-    def vote_count(self):
-        return len(self.votes)
-    
     def to_dict(self, include_votes=True):
         data = {
             'id': self.id,
@@ -112,6 +124,8 @@ class Issue(db.Model):
             'district': self.district,
             'sector': self.sector,
             'image_url': self.image_url,
+            'image_status': self.image_status,
+            'possible_duplicate_of': self.possible_duplicate_of,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat(),
             'user_id': self.user_id,
@@ -121,6 +135,99 @@ class Issue(db.Model):
             data['vote_count'] = self.vote_count
         return data
 
+@event.listens_for(Issue, 'before_update')
+def bump_issue_revision(mapper, connection, target):
+    """Increment Issue.revision in the same UPDATE as any ORM change"""
+    if db.session.is_modified(target, include_collections=False):
+        target.revision = Issue.revision + 1
+
+class IssueChange(db.Model):
+    """Append-only change log of issues, written by database triggers (see changes.py)"""
+    __tablename__ = 'issue_changes'
+    
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)  # Sync token
+    issue_id = db.Column(db.Integer, nullable=False)  # No FK: tombstones outlive the issue
+    change_type = db.Column(db.String(10), nullable=False)  # upsert, delete
+    province = db.Column(db.String(50))
+    district = db.Column(db.String(50))
+    changed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    __table_args__ = (
+        db.Index('idx_issue_changes_district_id', 'district', 'id'),
+        db.Index('idx_issue_changes_changed_at', 'changed_at'),
+    )
+
+class IssueChangeWatermark(db.Model):
+    """Highest change id removed from issue_changes by prune_changes (single row, see changes.py)"""
+    __tablename__ = 'issue_change_watermarks'
+
+    name = db.Column(db.String(20), primary_key=True)  # 'pruned'
+    change_id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+class IssueStat(db.Model):
+    """Issue counts per district, category and status, maintained by database triggers (see stats.py)"""
+    __tablename__ = 'issue_stats'
+    
+    # Empty string instead of NULL so every combination maps to exactly one row
+    district = db.Column(db.String(50), primary_key=True, default='')
+    province = db.Column(db.String(50), primary_key=True, default='')
+    category = db.Column(db.String(50), primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)
+    issue_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+class ImageBlob(db.Model):
+    """A stored image, addressed by the SHA-256 of its bytes and shared by every issue using it (see image_store.py)"""
+    __tablename__ = 'image_blobs'
+    
+    sha256 = db.Column(db.String(64), primary_key=True)
+    storage_key = db.Column(db.String(200), nullable=False)  # Object name in storage
+    url = db.Column(db.String(500), nullable=False)
+    content_type = db.Column(db.String(50))
+    size = db.Column(db.Integer)
+    ref_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    
+    # 64-bit dHash (hex) plus its four 16-bit bands for near-duplicate lookups
+    dhash = db.Column(db.String(16))
+    dhash_band0 = db.Column(db.Integer)
+    dhash_band1 = db.Column(db.Integer)
+    dhash_band2 = db.Column(db.Integer)
+    dhash_band3 = db.Column(db.Integer)
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('idx_image_blobs_dhash_band0', 'dhash_band0'),
+        db.Index('idx_image_blobs_dhash_band1', 'dhash_band1'),
+        db.Index('idx_image_blobs_dhash_band2', 'dhash_band2'),
+        db.Index('idx_image_blobs_dhash_band3', 'dhash_band3'),
+    )
+    
+    def set_dhash_bands(self, bands):
+        self.dhash_band0, self.dhash_band1, self.dhash_band2, self.dhash_band3 = bands
+
+class OutboundEmail(db.Model):
+    """An email waiting for (or done with) background SMTP delivery (see email_service.py)"""
+    __tablename__ = 'outbound_emails'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    to_email = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(300), nullable=False)
+    text_body = db.Column(db.Text)
+    html_body = db.Column(db.Text)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, sending, sent, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    claimed_by = db.Column(db.String(64))  # Sender that is delivering it while status is sending
+    claimed_at = db.Column(db.DateTime)
+    last_error = db.Column(db.String(500))
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+    
+    __table_args__ = (
+        db.Index('idx_outbound_emails_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+
 class Vote(db.Model):
     """Citizen votes on issues"""
     __tablename__ = 'votes'
@@ -137,6 +244,63 @@ class Vote(db.Model):
     
     def __repr__(self):
         return f'<Vote {self.user_id} -> {self.issue_id}>'
+    
+    @staticmethod
+    def toggle(user_id, issue_id):
+        """Vote/unvote atomically and keep issues.vote_count in step.
+        
+        Returns a tuple of (action, vote_count) where action is 'voted' or 'unvoted'.
+        The caller is responsible for committing the session.
+        """
+        params = {'user_id': user_id, 'issue_id': issue_id, 'created_at': datetime.utcnow()}
+        
+        if db.session.get_bind().dialect.name == 'postgresql':
+            # Delete-or-insert plus the counter update in a single statement. Concurrent
+            # double-clicks serialize on the vote row / unique constraint, so the counter
+            # always moves by exactly the number of rows actually inserted or deleted.
+            row = db.session.execute(text("""
+                WITH removed AS (
+                    DELETE FROM votes
+                    WHERE user_id = :user_id AND issue_id = :issue_id
+                    RETURNING issue_id
+                ), added AS (
+                    INSERT INTO votes (user_id, issue_id, created_at)
+                    SELECT :user_id, :issue_id, :created_at
+                    WHERE NOT EXISTS (SELECT 1 FROM removed)
+                    ON CONFLICT (user_id, issue_id) DO NOTHING
+                    RETURNING issue_id
+                )
+                UPDATE issues
+                SET vote_count = vote_count
+                    + (SELECT COUNT(*) FROM added)
+                    - (SELECT COUNT(*) FROM removed),
+                    revision = revision + 1
+                WHERE id = :issue_id
+                RETURNING vote_count, (SELECT COUNT(*) FROM removed) AS removed_count
+            """), params).first()
+            if row is None:
+                return None, 0
+            return ('unvoted' if row.removed_count else 'voted'), row.vote_count
+        
+        # SQLite and other backends: same effect as above, but as separate statements
+        # inside the current transaction (SQLite serializes writers anyway).
+        removed = db.session.execute(text(
+            "DELETE FROM votes WHERE user_id = :user_id AND issue_id = :issue_id"
+        ), params).rowcount
+        added = 0
+        if not removed:
+            added = db.session.execute(text(
+                "INSERT INTO votes (user_id, issue_id, created_at) "
+                "VALUES (:user_id, :issue_id, :created_at) "
+                "ON CONFLICT (user_id, issue_id) DO NOTHING"
+            ), params).rowcount
+        db.session.execute(text(
+            "UPDATE issues SET vote_count = vote_count + :delta, revision = revision + 1 WHERE id = :issue_id"
+        ), {'delta': added - removed, 'issue_id': issue_id})
+        vote_count = db.session.execute(text(
+            "SELECT vote_count FROM issues WHERE id = :issue_id"
+        ), {'issue_id': issue_id}).scalar()
+        return ('unvoted' if removed else 'voted'), (vote_count or 0)
 
 class Notification(db.Model):
     """User notifications"""
@@ -148,9 +312,15 @@ class Notification(db.Model):
     title = db.Column(db.String(200), nullable=False)
     message = db.Column(db.Text, nullable=False)
     type = db.Column(db.String(50), default='info')  # info, success, warning, error
-    read = db.Column(db.Boolean, default=False)
+    read = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        # Unread filter and newest-first (created_at, id) pages per user
+        db.Index('idx_notifications_user_read_created', 'user_id', 'read', 'created_at', 'id'),
+        db.Index('idx_notifications_user_created_id', 'user_id', 'created_at', 'id'),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -162,6 +332,58 @@ class Notification(db.Model):
             'created_at': self.created_at.isoformat()
         }
 
+class Subscription(db.Model):
+    """A user following an issue, a sector or a district (see fanout.py)"""
+    __tablename__ = 'subscriptions'
+    
+    TARGET_TYPES = ('issue', 'sector', 'district')
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
+    target_type = db.Column(db.String(20), nullable=False)  # issue, sector, district
+    target_key = db.Column(db.String(120), nullable=False)  # issue id, "district/sector" or district
+    source = db.Column(db.String(20), nullable=False, default='manual')  # manual, vote
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        # Recipient lookup for a target, and one subscription per user and target
+        db.UniqueConstraint('target_type', 'target_key', 'user_id', name='uq_subscriptions_target_user'),
+        db.Index('idx_subscriptions_user_id', 'user_id'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'target_type': self.target_type,
+            'target_key': self.target_key,
+            'source': self.source,
+            'created_at': self.created_at.isoformat()
+        }
+
+class NotificationCounter(db.Model):
+    """Unread notifications per user, maintained by database triggers (see notifications.py)"""
+    __tablename__ = 'notification_counters'
+    
+    user_id = db.Column(db.String(36), primary_key=True)
+    unread_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+class NotificationSummary(db.Model):
+    """Read notifications removed by the retention job, rolled up per user (see maintenance.py)"""
+    __tablename__ = 'notification_summaries'
+    
+    user_id = db.Column(db.String(36), primary_key=True)
+    archived_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    oldest_at = db.Column(db.DateTime)  # created_at of the oldest archived notification
+    newest_at = db.Column(db.DateTime)  # created_at of the newest archived notification
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'archived_count': self.archived_count,
+            'oldest_at': self.oldest_at.isoformat() if self.oldest_at else None,
+            'newest_at': self.newest_at.isoformat() if self.newest_at else None
+        }
+
 class AdminAuthCode(db.Model):
     """Admin authorization codes for district-based access"""
     __tablename__ = 'admin_auth_codes'
@@ -0,0 +1,130 @@
+"""
+Unread notification counters for CivicFix
+notification_counters holds one row per user; database triggers keep it in step with the
+notifications table inside the writing transaction, so the unread badge never counts rows
+"""
+
+from sqlalchemy import text
+
+from models import db, Notification, NotificationCounter
+
+
+def _pg_statements():
+    return [
+        # Statement-level with transition tables: a bulk insert or mark-all-read
+        # touches each user's counter once, not once per notification
+        """
+        CREATE OR REPLACE FUNCTION notifications_count_unread() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO notification_counters (user_id, unread_count)
+                SELECT user_id, COUNT(*) FROM new_rows WHERE NOT COALESCE(read, false) GROUP BY user_id
+                ON CONFLICT (user_id) DO UPDATE
+                SET unread_count = notification_counters.unread_count + EXCLUDED.unread_count;
+            ELSIF TG_OP = 'DELETE' THEN
+                UPDATE notification_counters AS c SET unread_count = c.unread_count - d.removed
+                FROM (SELECT user_id, COUNT(*) AS removed FROM old_rows
+                      WHERE NOT COALESCE(read, false) GROUP BY user_id) AS d
+                WHERE c.user_id = d.user_id;
+            ELSE
+                INSERT INTO notification_counters (user_id, unread_count)
+                SELECT user_id, SUM(delta) FROM (
+                    SELECT n.user_id, 1 AS delta FROM new_rows n JOIN old_rows o ON o.id = n.id
+                    WHERE NOT COALESCE(n.read, false) AND (COALESCE(o.read, false) OR o.user_id <> n.user_id)
+                    UNION ALL
+                    SELECT o.user_id, -1 AS delta FROM new_rows n JOIN old_rows o ON o.id = n.id
+                    WHERE NOT COALESCE(o.read, false) AND (COALESCE(n.read, false) OR o.user_id <> n.user_id)
+                ) AS changes
+                GROUP BY user_id
+                ON CONFLICT (user_id) DO UPDATE
+                SET unread_count = notification_counters.unread_count + EXCLUDED.unread_count;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        "DROP TRIGGER IF EXISTS notifications_unread_insert ON notifications",
+        """
+        CREATE TRIGGER notifications_unread_insert AFTER INSERT ON notifications
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION notifications_count_unread()
+        """,
+        "DROP TRIGGER IF EXISTS notifications_unread_delete ON notifications",
+        """
+        CREATE TRIGGER notifications_unread_delete AFTER DELETE ON notifications
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION notifications_count_unread()
+        """,
+        "DROP TRIGGER IF EXISTS notifications_unread_update ON notifications",
+        """
+        CREATE TRIGGER notifications_unread_update AFTER UPDATE ON notifications
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION notifications_count_unread()
+        """,
+    ]
+
+
+def _sqlite_statements():
+    def increment(row):
+        return (f"INSERT OR IGNORE INTO notification_counters (user_id, unread_count) VALUES ({row}.user_id, 0);\n"
+                f"UPDATE notification_counters SET unread_count = unread_count + 1 "
+                f"WHERE user_id = {row}.user_id AND NOT COALESCE({row}.read, 0);")
+
+    def decrement(row):
+        return (f"UPDATE notification_counters SET unread_count = unread_count - 1 "
+                f"WHERE user_id = {row}.user_id AND NOT COALESCE({row}.read, 0);")
+
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS notifications_unread_insert AFTER INSERT ON notifications BEGIN
+            {increment('new')}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS notifications_unread_delete AFTER DELETE ON notifications BEGIN
+            {decrement('old')}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS notifications_unread_update AFTER UPDATE OF read, user_id ON notifications
+        WHEN COALESCE(old.read, 0) IS NOT COALESCE(new.read, 0) OR old.user_id IS NOT new.user_id BEGIN
+            {decrement('old')}
+            {increment('new')}
+        END
+        """,
+    ]
+
+
+def ensure_notification_counters(connection):
+    """Install the unread counter triggers for the connection's dialect (idempotent)"""
+    dialect = connection.dialect.name
+    if dialect == 'postgresql':
+        statements = _pg_statements()
+    elif dialect == 'sqlite':
+        statements = _sqlite_statements()
+    else:
+        print(f"[NOTIFICATIONS] No unread counter triggers for dialect {dialect}")
+        return False
+
+    for statement in statements:
+        connection.execute(text(statement))
+    return True
+
+
+def unread_count(user_id):
+    """Unread notifications of a user: one primary-key read"""
+    count = db.session.query(NotificationCounter.unread_count).filter_by(user_id=user_id).scalar()
+    return max(count or 0, 0)
+
+
+def mark_read(user_id, ids=None):
+    """Mark the user's notifications (all, or only ids) as read in a single UPDATE.
+
+    Returns the number of notifications that changed; the caller commits.
+    """
+    query = Notification.query.filter(Notification.user_id == user_id, Notification.read == False)
+    if ids is not None:
+        if not ids:
+            return 0
+        query = query.filter(Notification.id.in_(ids))
+    return query.update({Notification.read: True}, synchronize_session=False)
@@ -0,0 +1,94 @@
+"""
+Keyset (cursor) pagination helpers for CivicFix issue and notification feeds
+Pages are ordered by (created_at, id) descending and addressed by an opaque cursor
+"""
+
+import base64
+import json
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import tuple_
+
+from models import Issue
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client sends a cursor we did not issue"""
+
+
+def encode_cursor(row):
+    """Build the opaque cursor pointing just after the given row"""
+    payload = {'c': row.created_at.isoformat(), 'i': row.id}
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (created_at, id) from a cursor produced by encode_cursor"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(payload['c']), int(payload['i'])
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor(f'Invalid cursor: {e}')
+
+
+def clamp_per_page(per_page, max_per_page, default=10):
+    """Keep client supplied page sizes within the server-side cap"""
+    if not per_page or per_page < 1:
+        return default
+    return min(per_page, max_per_page)
+
+
+def keyset_paginate(query, cursor, per_page, model=Issue):
+    """Fetch one page of rows (issues by default) after the cursor (or the first page if cursor is empty).
+
+    Returns (items, next_cursor); next_cursor is None on the last page.
+    The cost is the same for every page since no OFFSET is involved.
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(tuple_(model.created_at, model.id) < tuple_(created_at, row_id))
+
+    rows = query.order_by(model.created_at.desc(), model.id.desc()).limit(per_page + 1).all()
+
+    items = rows[:per_page]
+    next_cursor = encode_cursor(items[-1]) if len(rows) > per_page else None
+    return items, next_cursor
+
+
+class CountCache:
+    """Small TTL cache for COUNT(*) results keyed by filter set"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get_or_count(self, key, query, ttl):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                return entry[1]
+
+        total = query.order_by(None).count()
+
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                # Drop expired entries first, then the oldest ones
+                for stale_key in [k for k, v in self._entries.items() if v[0] <= now]:
+                    del self._entries[stale_key]
+                while len(self._entries) >= self.max_entries:
+                    del self._entries[next(iter(self._entries))]
+            self._entries[key] = (now + ttl, total)
+        return total
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Global count cache instance
+count_cache = CountCache()
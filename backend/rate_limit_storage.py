@@ -0,0 +1,96 @@
+"""
+SQLite storage for Flask-Limiter
+Lets every worker process on one host share rate-limit counters through a local file,
+without running Redis:
+
+    RATELIMIT_STORAGE_URI=sqlite:////tmp/civicfix-ratelimit.db
+
+Importing this module registers the sqlite:// scheme with the limits package. Each
+counter update is a single UPSERT statement, so it is atomic across processes.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+from limits.storage import Storage
+
+# Expired counters are deleted once every this many hits (per process)
+PURGE_EVERY = 1000
+
+
+class SQLiteStorage(Storage):
+    """Fixed-window counters in a SQLite file (one connection per thread and process)"""
+
+    STORAGE_SCHEME = ['sqlite']
+
+    def __init__(self, uri, wrap_exceptions=False, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self.path = uri[len('sqlite:///'):] or ':memory:'
+        self.busy_timeout = int(options.get('busy_timeout', 5000))
+        self._local = threading.local()
+        self._hits = 0
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    @property
+    def connection(self):
+        # Connections are never shared across threads or inherited across fork
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.busy_timeout / 1000,
+                                         isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=OFF')  # Counters are disposable
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS rate_limits (
+                    key TEXT PRIMARY KEY,
+                    count INTEGER NOT NULL,
+                    expires_at REAL NOT NULL
+                ) WITHOUT ROWID
+            """)
+            local.connection = connection
+            local.pid = os.getpid()
+        return local.connection
+
+    def incr(self, key, expiry, elastic_expiry=False, amount=1):
+        now = time.time()
+        count = self.connection.execute("""
+            INSERT INTO rate_limits (key, count, expires_at) VALUES (:key, :amount, :expires_at)
+            ON CONFLICT (key) DO UPDATE SET
+                count = CASE WHEN expires_at <= :now THEN excluded.count ELSE count + excluded.count END,
+                expires_at = CASE WHEN expires_at <= :now OR :elastic THEN excluded.expires_at ELSE expires_at END
+            RETURNING count
+        """, {'key': key, 'amount': amount, 'expires_at': now + expiry, 'now': now,
+              'elastic': bool(elastic_expiry)}).fetchone()[0]
+
+        self._hits += 1
+        if self._hits % PURGE_EVERY == 0:
+            self.connection.execute('DELETE FROM rate_limits WHERE expires_at <= ?', (now,))
+        return count
+
+    def get(self, key):
+        row = self.connection.execute(
+            'SELECT count FROM rate_limits WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key):
+        row = self.connection.execute('SELECT expires_at FROM rate_limits WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else time.time()
+
+    def check(self):
+        try:
+            self.connection.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        return self.connection.execute('DELETE FROM rate_limits').rowcount
+
+    def clear(self, key):
+        self.connection.execute('DELETE FROM rate_limits WHERE key = ?', (key,))
@@ -0,0 +1,265 @@
+"""
+Response cache for the public issue feed
+Serialized pages are cached per normalized filter/page parameters and invalidated by
+scope (all / province / district) whenever an issue in that scope changes
+
+    memory://                 per-process LRU + TTL (default)
+    redis://localhost:6379/1  shared between workers (needs the redis package)
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+ALL_SCOPE = 'all'
+
+
+def feed_scope(province=None, district=None):
+    """The narrowest scope a feed query depends on"""
+    if district:
+        return f'district:{district}'
+    if province:
+        return f'province:{province}'
+    return ALL_SCOPE
+
+
+def issue_scopes(*issues):
+    """Every scope whose cached pages may include one of these issues.
+
+    Accepts Issue objects or (province, district) tuples.
+    """
+    scopes = {ALL_SCOPE}
+    for issue in issues:
+        if isinstance(issue, tuple):
+            province, district = issue
+        else:
+            province, district = issue.province, issue.district
+        if province:
+            scopes.add(f'province:{province}')
+        if district:
+            scopes.add(f'district:{district}')
+    return scopes
+
+
+class MemoryCacheBackend:
+    """LRU + TTL cache bounded by entry count and payload bytes"""
+
+    name = 'memory'
+
+    def __init__(self, max_entries=512, max_bytes=32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # (scope, key) -> (expires_at, generation, etag, body)
+        self._scope_keys = {}
+        self._generations = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def generation(self, scope):
+        with self._lock:
+            return self._generations.get(scope, 0)
+
+    def get(self, scope, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get((scope, key))
+            if entry is None or entry[0] <= now or entry[1] != self._generations.get(scope, 0):
+                if entry is not None:
+                    self._remove((scope, key))
+                self.misses += 1
+                return None
+            self._entries.move_to_end((scope, key))
+            self.hits += 1
+            return entry[2], entry[3]
+
+    def set(self, scope, key, generation, etag, body, ttl):
+        with self._lock:
+            # A write landed while this page was being built: do not cache stale data
+            if generation != self._generations.get(scope, 0):
+                return
+            if (scope, key) in self._entries:
+                self._remove((scope, key))
+            self._entries[(scope, key)] = (time.monotonic() + ttl, generation, etag, body)
+            self._scope_keys.setdefault(scope, set()).add(key)
+            self._bytes += len(body)
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, scopes):
+        with self._lock:
+            for scope in scopes:
+                self._generations[scope] = self._generations.get(scope, 0) + 1
+                for key in list(self._scope_keys.get(scope, ())):
+                    self._remove((scope, key))
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            for scope in list(self._scope_keys):
+                self._generations[scope] = self._generations.get(scope, 0) + 1
+            self._entries.clear()
+            self._scope_keys.clear()
+            self._bytes = 0
+
+    def _remove(self, entry_key):
+        entry = self._entries.pop(entry_key, None)
+        if entry is None:
+            return
+        self._bytes -= len(entry[3])
+        keys = self._scope_keys.get(entry_key[0])
+        if keys is not None:
+            keys.discard(entry_key[1])
+            if not keys:
+                del self._scope_keys[entry_key[0]]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': self.name,
+                'entries': len(self._entries),
+                'memory_bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
+
+
+class RedisCacheBackend:
+    """Shared cache: entries live under a per-scope generation that writes bump"""
+
+    name = 'redis'
+    prefix = 'civicfix:feed'
+
+    def __init__(self, url):
+        import redis  # Optional dependency, only needed for redis:// cache URLs
+        self._client = redis.Redis.from_url(url)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def generation(self, scope):
+        value = self._client.get(f'{self.prefix}:gen:{scope}')
+        return int(value) if value else 0
+
+    def _entry_key(self, scope, key, generation):
+        return f'{self.prefix}:entry:{scope}:{generation}:{key}'
+
+    def get(self, scope, key):
+        generation = self.generation(scope)
+        value = self._client.hmget(self._entry_key(scope, key, generation), 'etag', 'body')
+        with self._lock:
+            if value[0] is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return value[0].decode('utf-8'), value[1]
+
+    def set(self, scope, key, generation, etag, body, ttl):
+        entry_key = self._entry_key(scope, key, generation)
+        pipeline = self._client.pipeline()
+        pipeline.hset(entry_key, mapping={'etag': etag, 'body': body})
+        pipeline.expire(entry_key, ttl)
+        pipeline.execute()
+
+    def invalidate(self, scopes):
+        # Old generations become unreachable and expire on their own TTL
+        pipeline = self._client.pipeline()
+        for scope in scopes:
+            pipeline.incr(f'{self.prefix}:gen:{scope}')
+        pipeline.execute()
+        with self._lock:
+            self.invalidations += len(scopes)
+
+    def clear(self):
+        for key in self._client.scan_iter(f'{self.prefix}:gen:*'):
+            self._client.incr(key)
+
+    def stats(self):
+        info = self._client.info('memory')
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': self.name,
+                'memory_bytes': info.get('used_memory'),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self._client.info('stats').get('evicted_keys'),
+                'invalidations': self.invalidations
+            }
+
+
+# Returned by FeedCache.generation when the backend is unreachable; set() ignores it
+UNKNOWN_GENERATION = None
+
+
+class FeedCache:
+    """Facade used by the routes; the backend is chosen in create_app"""
+
+    def __init__(self, backend=None):
+        self.backend = backend or MemoryCacheBackend()
+
+    def configure(self, backend):
+        self.backend = backend
+
+    def generation(self, scope):
+        """The scope's current generation, or UNKNOWN_GENERATION when the backend is unreachable"""
+        try:
+            return self.backend.generation(scope)
+        except Exception as e:
+            print(f"[FEED CACHE] generation failed: {e}")
+            return UNKNOWN_GENERATION
+
+    def get(self, scope, key):
+        try:
+            return self.backend.get(scope, key)
+        except Exception as e:
+            print(f"[FEED CACHE] get failed: {e}")
+            return None
+
+    def set(self, scope, key, generation, etag, body, ttl):
+        # Without a known generation the page could outlive the next invalidation
+        if generation is UNKNOWN_GENERATION:
+            return
+        try:
+            self.backend.set(scope, key, generation, etag, body, ttl)
+        except Exception as e:
+            print(f"[FEED CACHE] set failed: {e}")
+
+    def invalidate_issues(self, *issues):
+        """Drop cached pages that could contain any of these issues"""
+        try:
+            self.backend.invalidate(issue_scopes(*issues))
+        except Exception as e:
+            print(f"[FEED CACHE] invalidate failed: {e}")
+
+    def clear(self):
+        try:
+            self.backend.clear()
+        except Exception as e:
+            print(f"[FEED CACHE] clear failed: {e}")
+
+    def stats(self):
+        return self.backend.stats()
+
+
+def create_cache_backend(url, max_entries=512, max_bytes=32 * 1024 * 1024):
+    if not url or url.startswith('memory://'):
+        return MemoryCacheBackend(max_entries=max_entries, max_bytes=max_bytes)
+    if url.startswith('redis://') or url.startswith('rediss://'):
+        return RedisCacheBackend(url)
+    raise ValueError(f"Unsupported FEED_CACHE_URL: {url}")
+
+
+# Global feed cache instance
+feed_cache = FeedCache()
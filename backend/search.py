@@ -0,0 +1,196 @@
+"""
+Full-text search backend for CivicFix issues
+PostgreSQL: weighted tsvector column maintained by a trigger, with a GIN index
+SQLite: FTS5 external-content shadow table maintained by triggers
+"""
+
+import re
+from sqlalchemy import column, false, func, literal_column, select, table, text
+
+from models import db, Issue
+
+# Weights: title (A) > description (B) > location text (C) > detailed description (D)
+PG_SEARCH_VECTOR_SQL = """
+    setweight(to_tsvector('simple', coalesce({p}title, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce({p}description, '')), 'B') ||
+    setweight(to_tsvector('simple', coalesce({p}street_address, '') || ' ' ||
+                                    coalesce({p}landmark_reference, '') || ' ' ||
+                                    coalesce({p}province, '') || ' ' ||
+                                    coalesce({p}district, '') || ' ' ||
+                                    coalesce({p}sector, '')), 'C') ||
+    setweight(to_tsvector('simple', coalesce({p}detailed_description, '')), 'D')
+"""
+
+SEARCH_COLUMNS = [
+    'title', 'description', 'street_address', 'landmark_reference',
+    'detailed_description', 'province', 'district', 'sector'
+]
+
+# bm25 weights for the FTS5 columns, in SEARCH_COLUMNS order
+SQLITE_BM25_WEIGHTS = '10.0, 5.0, 2.0, 2.0, 1.0, 2.0, 2.0, 2.0'
+
+issues_fts = table('issues_fts', column('rowid'), column('rank'))
+
+_backend_cache = {}
+
+
+def _pg_statements():
+    columns = ', '.join(SEARCH_COLUMNS)
+    return [
+        "ALTER TABLE issues ADD COLUMN IF NOT EXISTS search_vector tsvector",
+        f"""
+        CREATE OR REPLACE FUNCTION issues_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector := {PG_SEARCH_VECTOR_SQL.format(p='NEW.')};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        "DROP TRIGGER IF EXISTS issues_search_vector_trigger ON issues",
+        f"""
+        CREATE TRIGGER issues_search_vector_trigger
+        BEFORE INSERT OR UPDATE OF {columns} ON issues
+        FOR EACH ROW EXECUTE FUNCTION issues_search_vector_update()
+        """,
+        f"UPDATE issues SET search_vector = {PG_SEARCH_VECTOR_SQL.format(p='')} WHERE search_vector IS NULL",
+        "CREATE INDEX IF NOT EXISTS idx_issues_search_vector ON issues USING GIN (search_vector)",
+    ]
+
+
+def _sqlite_statements():
+    columns = ', '.join(SEARCH_COLUMNS)
+    new_values = ', '.join(f'new.{c}' for c in SEARCH_COLUMNS)
+    old_values = ', '.join(f'old.{c}' for c in SEARCH_COLUMNS)
+    return [
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS issues_fts USING fts5(
+            {columns},
+            content='issues', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS issues_fts_insert AFTER INSERT ON issues BEGIN
+            INSERT INTO issues_fts(rowid, {columns}) VALUES (new.id, {new_values});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS issues_fts_delete AFTER DELETE ON issues BEGIN
+            INSERT INTO issues_fts(issues_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+        END
+        """,
+        # Only searchable columns: vote counter updates must not churn the index
+        f"""
+        CREATE TRIGGER IF NOT EXISTS issues_fts_update AFTER UPDATE OF {columns} ON issues BEGIN
+            INSERT INTO issues_fts(issues_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+            INSERT INTO issues_fts(rowid, {columns}) VALUES (new.id, {new_values});
+        END
+        """,
+        "INSERT INTO issues_fts(issues_fts) VALUES ('rebuild')",
+        f"INSERT INTO issues_fts(issues_fts, rank) VALUES ('rank', 'bm25({SQLITE_BM25_WEIGHTS})')",
+    ]
+
+
+def ensure_search_index(connection):
+    """Create (or refresh) the full-text search objects for the connection's dialect.
+
+    Idempotent; safe to call from migrations, CLI commands and dev startup.
+    """
+    dialect = connection.dialect.name
+    if dialect == 'postgresql':
+        statements = _pg_statements()
+    elif dialect == 'sqlite':
+        statements = _sqlite_statements()
+    else:
+        print(f"[SEARCH] No full-text backend for dialect {dialect}, using ILIKE search")
+        return False
+
+    for statement in statements:
+        connection.execute(text(statement))
+    _backend_cache.clear()
+    return True
+
+
+def search_backend():
+    """Return 'postgresql' or 'sqlite' if the search index is installed, else None"""
+    engine = db.engine
+    key = str(engine.url)
+    if key not in _backend_cache:
+        backend = None
+        try:
+            with engine.connect() as connection:
+                if engine.dialect.name == 'postgresql':
+                    found = connection.execute(text(
+                        "SELECT 1 FROM information_schema.columns "
+                        "WHERE table_name = 'issues' AND column_name = 'search_vector'"
+                    )).first()
+                    backend = 'postgresql' if found else None
+                elif engine.dialect.name == 'sqlite':
+                    found = connection.execute(text(
+                        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'issues_fts'"
+                    )).first()
+                    backend = 'sqlite' if found else None
+        except Exception as e:
+            print(f"[SEARCH] Could not detect search backend: {e}")
+        _backend_cache[key] = backend
+    return _backend_cache[key]
+
+
+def tokenize(term, max_tokens=8):
+    """Split user input into safe lowercase word tokens"""
+    return re.findall(r'\w+', term.lower(), flags=re.UNICODE)[:max_tokens]
+
+
+def _vote_boost():
+    # Saturating boost: an issue with many votes ranks up to 2x higher, never more
+    return 1.0 + Issue.vote_count / (Issue.vote_count + 10.0)
+
+
+def _legacy_filter(query, term):
+    search_term = f"%{term}%"
+    return query.filter(
+        db.or_(*[getattr(Issue, name).ilike(search_term) for name in SEARCH_COLUMNS])
+    )
+
+
+def apply_search(query, term, ranked=True, blend_votes=False):
+    """Restrict an Issue query to matches for term.
+
+    With ranked=True the query is ordered by relevance (optionally blended with
+    votes) where the backend can rank; callers append their own order after it (e.g.
+    newest first), which is the only order when nothing was ranked. Callers that need
+    a stable order, such as keyset pagination, pass ranked=False.
+    """
+    tokens = tokenize(term)
+    if not tokens:
+        # Nothing searchable (e.g. only punctuation): match nothing rather than the whole feed
+        return query.filter(false())
+
+    backend = search_backend()
+
+    if backend == 'postgresql':
+        ts_query = func.to_tsquery('simple', ' & '.join(f'{token}:*' for token in tokens))
+        search_vector = literal_column('issues.search_vector')
+        query = query.filter(search_vector.op('@@')(ts_query))
+        if ranked:
+            score = func.ts_rank_cd(search_vector, ts_query)
+            if blend_votes:
+                score = score * _vote_boost()
+            query = query.order_by(score.desc())
+        return query
+
+    if backend == 'sqlite':
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        matches = select(issues_fts.c.rowid, issues_fts.c.rank)\
+            .where(text('issues_fts MATCH :search_match').bindparams(search_match=match))\
+            .subquery('search_matches')
+        query = query.join(matches, matches.c.rowid == Issue.id)
+        if ranked:
+            # bm25 scores are negative, lower is better
+            score = matches.c.rank
+            if blend_votes:
+                score = score * _vote_boost()
+            query = query.order_by(score.asc())
+        return query
+
+    return _legacy_filter(query, term)
@@ -0,0 +1,47 @@
+"""
+Bulk serializers for CivicFix list endpoints
+Serialize a page of rows with a fixed number of queries instead of one per row
+"""
+
+from sqlalchemy import inspect
+from sqlalchemy.orm.attributes import set_committed_value
+
+from models import User
+
+
+def load_reporters(issues):
+    """Attach reporters to a list of issues using at most one query"""
+    missing = {}
+    for issue in issues:
+        if 'reporter' in inspect(issue).unloaded:
+            missing.setdefault(issue.user_id, []).append(issue)
+
+    if missing:
+        users = User.query.filter(User.id.in_(list(missing.keys()))).all()
+        found = {user.id: user for user in users}
+        for user_id, pending in missing.items():
+            for issue in pending:
+                set_committed_value(issue, 'reporter', found.get(user_id))
+
+    return issues
+
+
+def serialize_issues(issues, include_reporter_contact=False):
+    """Serialize a page of issues.
+
+    Reporters are hydrated in one batch and vote counts come from the
+    denormalized column, so the cost is constant regardless of page size.
+    With include_reporter_contact the admin-only reporter fields are added.
+    """
+    issues = load_reporters(list(issues))
+
+    results = []
+    for issue in issues:
+        issue_dict = issue.to_dict()
+        if include_reporter_contact and issue.reporter:
+            issue_dict['reporter_name'] = issue.reporter.username
+            issue_dict['reporter_phone'] = issue.reporter.phone
+            issue_dict['reporter_email'] = issue.reporter.email
+        results.append(issue_dict)
+
+    return results
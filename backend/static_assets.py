@@ -0,0 +1,196 @@
+"""
+Pre-built static assets for frontend-web
+At startup (or with `flask build-static`) every asset is copied to a build directory under a
+content-hashed name (styles.css -> styles.3f2a9c1d0b7e.css), HTML pages are rewritten to
+reference the hashed names, and gzip/brotli variants are written next to each text file.
+
+Hashed names never change content, so they are served with `immutable` caching; HTML pages
+keep their names and are revalidated with strong ETags. The compressed variant matching
+Accept-Encoding is sent as-is, so nothing is compressed per request.
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import threading
+
+from flask import request, send_file
+
+try:
+    import brotli  # Optional: without it only gzip variants are generated
+except ImportError:
+    brotli = None
+
+MANIFEST_NAME = 'manifest.json'
+
+# Pages are linked to by name, so they keep it; everything else gets a fingerprinted name
+UNHASHED_EXTENSIONS = {'.html'}
+COMPRESSIBLE_EXTENSIONS = {'.html', '.css', '.js', '.json', '.svg', '.txt'}
+
+# Variants are only kept when they save at least this fraction of the original
+MIN_COMPRESSION_SAVING = 0.1
+
+# src="...", href="..." and url(...) references to local files
+REFERENCE_PATTERN = re.compile(r'''((?:src|href)=["']|url\(["']?)([^"')\s]+)''')
+
+
+def fingerprint(content):
+    return hashlib.sha256(content).hexdigest()[:12]
+
+
+def hashed_name(name, digest):
+    root, extension = os.path.splitext(name)
+    return f"{root}.{digest}{extension}"
+
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(content)
+    os.replace(temp_path, path)  # Workers building at the same time never see partial files
+
+
+def _compressed_variants(content):
+    variants = {'gzip': gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['br'] = brotli.compress(content, quality=11)
+    limit = len(content) * (1 - MIN_COMPRESSION_SAVING)
+    return {encoding: data for encoding, data in variants.items() if len(data) <= limit}
+
+
+def build_assets(source_dir, output_dir):
+    """Fingerprint and pre-compress every file in source_dir; returns the manifest"""
+    sources = {}
+    for root, _, names in os.walk(source_dir):
+        for name in names:
+            if name.startswith('.'):
+                continue
+            full_path = os.path.join(root, name)
+            sources[os.path.relpath(full_path, source_dir).replace(os.sep, '/')] = full_path
+
+    # Assets first, so pages can be rewritten with their final names
+    renamed = {}
+    contents = {}
+    for name, full_path in sorted(sources.items()):
+        with open(full_path, 'rb') as f:
+            contents[name] = f.read()
+        if os.path.splitext(name)[1].lower() not in UNHASHED_EXTENSIONS:
+            renamed[name] = hashed_name(name, fingerprint(contents[name]))
+
+    def rewrite(match):
+        prefix, target = match.groups()
+        path = target.split('?', 1)[0].split('#', 1)[0]
+        path = path[2:] if path.startswith('./') else path
+        return prefix + renamed[path] if path in renamed else match.group(0)
+
+    files = {}
+    for name, content in contents.items():
+        extension = os.path.splitext(name)[1].lower()
+        if extension in ('.html', '.css'):
+            content = REFERENCE_PATTERN.sub(rewrite, content.decode('utf-8')).encode('utf-8')
+        served_name = renamed.get(name, name)
+        entry = {
+            'file': served_name,
+            'etag': fingerprint(content),
+            'size': len(content),
+            'immutable': name in renamed,
+            'encodings': {}
+        }
+        _write(os.path.join(output_dir, served_name), content)
+        if extension in COMPRESSIBLE_EXTENSIONS:
+            for encoding, data in _compressed_variants(content).items():
+                suffix = '.br' if encoding == 'br' else '.gz'
+                _write(os.path.join(output_dir, served_name + suffix), data)
+                entry['encodings'][encoding] = served_name + suffix
+        files[served_name] = entry
+        if served_name != name:
+            # Old pages and bookmarks may still ask for the original name
+            files[name] = dict(entry, immutable=False)
+
+    manifest = {'assets': renamed, 'files': files}
+    _write(os.path.join(output_dir, MANIFEST_NAME), json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    return manifest
+
+
+def accepted_encodings(header):
+    """Encodings the client accepts (q > 0), from an Accept-Encoding header"""
+    accepted = set()
+    for part in (header or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = params.strip()
+        if quality.startswith('q='):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class StaticAssets:
+    """Serves the build directory produced by build_assets"""
+
+    def __init__(self):
+        self.output_dir = None
+        self.max_age = 365 * 24 * 3600
+        self.files = {}
+        self._lock = threading.Lock()
+        self.responses = {}
+
+    def init_app(self, app, build=True):
+        self.output_dir = os.path.join(app.root_path, app.config['STATIC_BUILD_FOLDER'])
+        self.max_age = app.config['STATIC_MAX_AGE']
+        manifest_path = os.path.join(self.output_dir, MANIFEST_NAME)
+        if build or not os.path.exists(manifest_path):
+            manifest = build_assets(app.static_folder, self.output_dir)
+        else:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+        self.files = manifest['files']
+
+    def response(self, filename):
+        """Response for a built asset, or None if filename is not one"""
+        entry = self.files.get(filename)
+        if entry is None:
+            return None
+
+        accepted = accepted_encodings(request.headers.get('Accept-Encoding'))
+        encoding = next((coding for coding in ('br', 'gzip') if coding in entry['encodings'] and coding in accepted), None)
+        served_file = entry['encodings'][encoding] if encoding else entry['file']
+        # Each encoding is a different representation, so it needs its own strong ETag
+        etag = f"{entry['etag']}-{encoding}" if encoding else entry['etag']
+
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        response = send_file(os.path.join(self.output_dir, served_file), mimetype=mimetype,
+                             conditional=True, etag=etag, last_modified=None)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if entry['encodings']:
+            response.vary.add('Accept-Encoding')
+        if entry['immutable']:
+            response.headers['Cache-Control'] = f"public, max-age={self.max_age}, immutable"
+        else:
+            response.headers['Cache-Control'] = 'no-cache'
+
+        with self._lock:
+            key = f"{response.status_code} {encoding or 'identity'}"
+            self.responses[key] = self.responses.get(key, 0) + 1
+        return response
+
+    def stats(self):
+        with self._lock:
+            return {
+                'files': len(self.files),
+                'brotli': brotli is not None,
+                'responses': dict(self.responses)
+            }
+
+
+# Global static asset server (initialized in create_app)
+static_assets = StaticAssets()
@@ -0,0 +1,152 @@
+"""
+Issue counters for the admin dashboard
+issue_stats holds one row per (district, province, category, status); database triggers keep it
+in step with issues inside the writing transaction, so the dashboard never counts the issues table
+"""
+
+from sqlalchemy import text
+
+from models import db, IssueStat
+
+STAT_KEY = "district, province, category, status"
+
+# The citizen API and the admin dashboard spell statuses differently
+STATUS_GROUPS = {
+    'open': ('Open', 'open'),
+    'in_progress': ('In Progress', 'in-progress'),
+    'resolved': ('Resolved', 'resolved'),
+}
+
+
+def _key_values(row):
+    return f"COALESCE({row}.district, ''), COALESCE({row}.province, ''), {row}.category, {row}.status"
+
+
+def _key_match(row):
+    return (f"district = COALESCE({row}.district, '') AND province = COALESCE({row}.province, '') "
+            f"AND category = {row}.category AND status = {row}.status")
+
+
+def _key_changed(old='OLD', new='NEW', distinct='IS DISTINCT FROM'):
+    return " OR ".join(f"{old}.{column} {distinct} {new}.{column}"
+                       for column in ('district', 'province', 'category', 'status'))
+
+
+def _pg_statements():
+    return [
+        f"""
+        CREATE OR REPLACE FUNCTION issues_count_stats() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                UPDATE issue_stats SET issue_count = issue_count - 1 WHERE {_key_match('OLD')};
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO issue_stats ({STAT_KEY}, issue_count)
+                VALUES ({_key_values('NEW')}, 1)
+                ON CONFLICT ({STAT_KEY}) DO UPDATE SET issue_count = issue_stats.issue_count + 1;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        "DROP TRIGGER IF EXISTS issues_stats_trigger ON issues",
+        """
+        CREATE TRIGGER issues_stats_trigger
+        AFTER INSERT OR DELETE ON issues
+        FOR EACH ROW EXECUTE FUNCTION issues_count_stats()
+        """,
+        "DROP TRIGGER IF EXISTS issues_stats_update_trigger ON issues",
+        # Votes and text edits also update issues; only moves between counters matter here
+        f"""
+        CREATE TRIGGER issues_stats_update_trigger
+        AFTER UPDATE OF district, province, category, status ON issues
+        FOR EACH ROW WHEN ({_key_changed()})
+        EXECUTE FUNCTION issues_count_stats()
+        """,
+    ]
+
+
+def _sqlite_statements():
+    def increment(row):
+        return (f"INSERT OR IGNORE INTO issue_stats ({STAT_KEY}, issue_count) VALUES ({_key_values(row)}, 0);\n"
+                f"UPDATE issue_stats SET issue_count = issue_count + 1 WHERE {_key_match(row)};")
+
+    def decrement(row):
+        return f"UPDATE issue_stats SET issue_count = issue_count - 1 WHERE {_key_match(row)};"
+
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS issues_stats_insert AFTER INSERT ON issues BEGIN
+            {increment('new')}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS issues_stats_update
+        AFTER UPDATE OF district, province, category, status ON issues
+        WHEN {_key_changed('old', 'new', 'IS NOT')} BEGIN
+            {decrement('old')}
+            {increment('new')}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS issues_stats_delete AFTER DELETE ON issues BEGIN
+            {decrement('old')}
+        END
+        """,
+    ]
+
+
+def ensure_issue_stats(connection):
+    """Install the issue counter triggers for the connection's dialect (idempotent)"""
+    dialect = connection.dialect.name
+    if dialect == 'postgresql':
+        statements = _pg_statements()
+    elif dialect == 'sqlite':
+        statements = _sqlite_statements()
+    else:
+        print(f"[STATS] No issue counter triggers for dialect {dialect}")
+        return False
+
+    for statement in statements:
+        connection.execute(text(statement))
+    return True
+
+
+def dashboard_stats(district=None):
+    """All dashboard numbers from one primary-key read of issue_stats.
+
+    Cost depends on the number of district/category/status combinations,
+    not on how many issues exist.
+    """
+    query = db.session.query(
+        IssueStat.district, IssueStat.category, IssueStat.status, IssueStat.issue_count
+    ).filter(IssueStat.issue_count > 0)
+    if district:
+        query = query.filter(IssueStat.district == district)
+
+    group_of = {status: group for group, statuses in STATUS_GROUPS.items() for status in statuses}
+    stats = {f'{group}_issues': 0 for group in STATUS_GROUPS}
+    stats['total_issues'] = 0
+    by_status = {}
+    by_category = {}
+    by_district = {}
+
+    for row_district, category, status, count in query.all():
+        stats['total_issues'] += count
+        if status in group_of:
+            stats[f'{group_of[status]}_issues'] += count
+        by_status[status] = by_status.get(status, 0) + count
+
+        category_counts = by_category.setdefault(category, {'total': 0, 'by_status': {}})
+        category_counts['total'] += count
+        category_counts['by_status'][status] = category_counts['by_status'].get(status, 0) + count
+
+        district_counts = by_district.setdefault(row_district or 'Unassigned', {'total': 0, 'by_status': {}, 'by_category': {}})
+        district_counts['total'] += count
+        district_counts['by_status'][status] = district_counts['by_status'].get(status, 0) + count
+        district_counts['by_category'][category] = district_counts['by_category'].get(category, 0) + count
+
+    stats['by_status'] = by_status
+    stats['by_category'] = by_category
+    stats['by_district'] = by_district
+    return stats
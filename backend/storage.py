@@ -0,0 +1,463 @@
+"""
+Object storage backends for CivicFix images
+
+    local     files under backend/uploads, served by /uploads/<key> (default without Supabase)
+    supabase  Supabase Storage over one pooled HTTP client per process
+    s3        any S3-compatible server (MinIO, LocalStack, ...); needs the boto3 package
+
+Uploads are streamed from a file object in fixed-size chunks and hashed in the same pass.
+Every remote call goes through retries with exponential backoff and a circuit breaker; only
+transient errors (connection problems, timeouts, 5xx, 429) are retried and count against the
+breaker. A missing object raises StorageNotFound, other permanent errors StorageError.
+"""
+
+import hashlib
+import os
+import shutil
+import threading
+import time
+import uuid
+
+CHUNK_SIZE = 256 * 1024
+
+
+class StorageError(Exception):
+    """A storage operation failed after its retries"""
+
+
+class StorageNotFound(StorageError):
+    """The object does not exist"""
+
+
+class CircuitOpenError(StorageError):
+    """Storage has been failing; calls are refused until the breaker resets"""
+
+
+# Outcome of a failed storage call (see StorageBackend._classify)
+NOT_FOUND = 'not_found'
+TRANSIENT = 'transient'
+PERMANENT = 'permanent'
+
+
+class HashingReader:
+    """File-like wrapper that hashes and counts bytes as they are read"""
+
+    def __init__(self, fileobj):
+        self._fileobj = fileobj
+        self._hash = hashlib.sha256()
+        self.size = 0
+
+    def read(self, size=-1):
+        chunk = self._fileobj.read(size)
+        self._hash.update(chunk)
+        self.size += len(chunk)
+        return chunk
+
+    def chunks(self, chunk_size=CHUNK_SIZE):
+        while True:
+            chunk = self.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    @property
+    def sha256(self):
+        return self._hash.hexdigest()
+
+
+class HashingWriter:
+    """Write-only file wrapper that hashes and counts bytes as they are written"""
+
+    def __init__(self, fileobj):
+        self._fileobj = fileobj
+        self._hash = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self._hash.update(data)
+        self.size += len(data)
+        return self._fileobj.write(data)
+
+    def flush(self):
+        self._fileobj.flush()
+
+    @property
+    def sha256(self):
+        return self._hash.hexdigest()
+
+
+class CircuitBreaker:
+    """Opens after failure_threshold consecutive failures; lets one trial call through after reset_seconds"""
+
+    def __init__(self, failure_threshold=5, reset_seconds=30):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if time.monotonic() - self._opened_at >= self.reset_seconds:
+                return 'half-open'
+            return 'open'
+
+    def before_call(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if time.monotonic() - self._opened_at >= self.reset_seconds and not self._trial_in_flight:
+                # Half-open: this caller is the single trial, everyone else is still refused
+                self._trial_in_flight = True
+                return
+            self.rejected += 1
+            raise CircuitOpenError("Storage circuit breaker is open")
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                # A failed trial reopens the breaker for another reset period
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+
+class StorageBackend:
+    """Base class: subclasses implement _put, _delete and _open"""
+
+    name = 'base'
+
+    def __init__(self, retries=3, backoff_seconds=0.5, breaker=None):
+        self.retries = retries
+        self.backoff_seconds = backoff_seconds
+        self.breaker = breaker or CircuitBreaker()
+        self._lock = threading.Lock()
+        self.uploads = 0
+        self.uploaded_bytes = 0
+        self.retried = 0
+        self.failures = 0
+
+    def _classify(self, error):
+        """NOT_FOUND, TRANSIENT or PERMANENT; subclasses add their client's errors"""
+        if isinstance(error, FileNotFoundError):
+            return NOT_FOUND
+        if isinstance(error, (ValueError, PermissionError, IsADirectoryError, NotADirectoryError)):
+            return PERMANENT
+        if isinstance(error, (ConnectionError, TimeoutError, OSError)):
+            return TRANSIENT
+        return PERMANENT
+
+    def _call(self, operation, *args, rewind=None):
+        self.breaker.before_call()
+        for attempt in range(self.retries):
+            try:
+                result = operation(*args)
+                self.breaker.record_success()
+                return result
+            except Exception as e:
+                kind = self._classify(e)
+                if kind != TRANSIENT:
+                    # Storage answered, so it is healthy; retrying would not help
+                    self.breaker.record_success()
+                    if kind == NOT_FOUND:
+                        raise StorageNotFound(f"{self.name} storage {operation.__name__}: object not found") from e
+                    raise StorageError(f"{self.name} storage {operation.__name__} failed: {e}") from e
+
+                self.breaker.record_failure()
+                if attempt == self.retries - 1:
+                    with self._lock:
+                        self.failures += 1
+                    raise StorageError(f"{self.name} storage {operation.__name__} failed: {e}") from e
+                with self._lock:
+                    self.retried += 1
+                print(f"[STORAGE] {self.name} {operation.__name__} failed (attempt {attempt + 1}), retrying: {e}")
+                time.sleep(self.backoff_seconds * (2 ** attempt))
+                self.breaker.before_call()
+                if rewind:
+                    rewind()
+
+    def put(self, key, fileobj, content_type):
+        """Stream fileobj to key; returns (public URL, sha256, size)"""
+        start = fileobj.tell() if hasattr(fileobj, 'tell') else None
+        rewind = (lambda: fileobj.seek(start)) if start is not None else None
+        reader_holder = {}
+
+        def upload():
+            reader_holder['reader'] = HashingReader(fileobj)
+            return self._put(key, reader_holder['reader'], content_type)
+
+        upload.__name__ = 'put'
+        url = self._call(upload, rewind=rewind)
+        reader = reader_holder['reader']
+        with self._lock:
+            self.uploads += 1
+            self.uploaded_bytes += reader.size
+        return url, reader.sha256, reader.size
+
+    def delete(self, key):
+        return self._call(self._delete, key)
+
+    def read(self, key, max_bytes):
+        """Read an object, refusing anything larger than max_bytes"""
+        content = self._call(self._open, key, max_bytes)
+        if len(content) > max_bytes:
+            raise StorageError(f"{key} is larger than {max_bytes} bytes")
+        return content
+
+    def url_for(self, key):
+        raise NotImplementedError
+
+    def _put(self, key, reader, content_type):
+        raise NotImplementedError
+
+    def _delete(self, key):
+        raise NotImplementedError
+
+    def _open(self, key, max_bytes):
+        raise NotImplementedError
+
+    def stats(self):
+        with self._lock:
+            return {
+                'backend': self.name,
+                'uploads': self.uploads,
+                'uploaded_bytes': self.uploaded_bytes,
+                'retried': self.retried,
+                'failures': self.failures,
+                'breaker': self.breaker.state,
+                'breaker_rejected': self.breaker.rejected
+            }
+
+
+class LocalStorage(StorageBackend):
+    """Files in a local directory, served by the /uploads route"""
+
+    name = 'local'
+
+    def __init__(self, root, base_url='/uploads/', **kwargs):
+        super().__init__(**kwargs)
+        self.root = root
+        self.base_url = base_url
+
+    def _path(self, key):
+        if '/' in key or '\\' in key or key.startswith('.'):
+            raise ValueError(f"Invalid storage key: {key}")
+        return os.path.join(self.root, key)
+
+    def url_for(self, key):
+        return f"{self.base_url}{key}"
+
+    def _put(self, key, reader, content_type):
+        os.makedirs(self.root, exist_ok=True)
+        path = self._path(key)
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                shutil.copyfileobj(reader, f, CHUNK_SIZE)
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return self.url_for(key)
+
+    def _delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _open(self, key, max_bytes):
+        with open(self._path(key), 'rb') as f:
+            return f.read(max_bytes + 1)
+
+
+class SupabaseStorage(StorageBackend):
+    """Supabase Storage REST API over a pooled httpx client (one per process)"""
+
+    name = 'supabase'
+
+    def __init__(self, url, service_key, bucket='issue-images', timeout=30, **kwargs):
+        super().__init__(**kwargs)
+        self.url = url.rstrip('/')
+        self.service_key = service_key.strip()
+        self.bucket = bucket
+        self.timeout = timeout
+        self._client = None
+        self._client_pid = None
+
+    @property
+    def client(self):
+        # Never share a connection pool across fork
+        pid = os.getpid()
+        if self._client_pid != pid:
+            with self._lock:
+                if self._client_pid != pid:
+                    import httpx
+                    self._client = httpx.Client(
+                        timeout=self.timeout,
+                        limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+                        headers={'Authorization': f'Bearer {self.service_key}', 'apikey': self.service_key}
+                    )
+                    self._client_pid = pid
+        return self._client
+
+    def url_for(self, key):
+        return f"{self.url}/storage/v1/object/public/{self.bucket}/{key}"
+
+    def _classify(self, error):
+        import httpx
+        if isinstance(error, httpx.TransportError):
+            return TRANSIENT
+        if isinstance(error, httpx.HTTPStatusError):
+            status = error.response.status_code
+            if status >= 500 or status == 429:
+                return TRANSIENT
+            # Supabase reports missing objects as 404, or as 400 with a not-found body
+            if status == 404 or (status == 400 and 'not found' in error.response.text.lower()):
+                return NOT_FOUND
+            return PERMANENT
+        return super()._classify(error)
+
+    def _put(self, key, reader, content_type):
+        response = self.client.post(
+            f"{self.url}/storage/v1/object/{self.bucket}/{key}",
+            content=reader.chunks(),
+            headers={'Content-Type': content_type, 'x-upsert': 'true', 'Cache-Control': 'max-age=31536000'}
+        )
+        response.raise_for_status()
+        return self.url_for(key)
+
+    def _delete(self, key):
+        response = self.client.request(
+            'DELETE', f"{self.url}/storage/v1/object/{self.bucket}", json={'prefixes': [key]}
+        )
+        response.raise_for_status()
+
+    def _open(self, key, max_bytes):
+        content = bytearray()
+        with self.client.stream('GET', self.url_for(key)) as response:
+            response.raise_for_status()
+            for chunk in response.iter_bytes(CHUNK_SIZE):
+                content.extend(chunk)
+                if len(content) > max_bytes:
+                    break
+        return bytes(content)
+
+
+class S3Storage(StorageBackend):
+    """S3-compatible object storage (e.g. a local MinIO); one boto3 client per process"""
+
+    name = 's3'
+
+    def __init__(self, endpoint_url, bucket, access_key, secret_key, public_url=None, region='us-east-1', **kwargs):
+        super().__init__(**kwargs)
+        import boto3  # Optional dependency, only needed for the s3 backend
+        self._boto3 = boto3
+        self.endpoint_url = endpoint_url
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.public_url = (public_url or f"{endpoint_url.rstrip('/')}/{bucket}").rstrip('/')
+        self._client = None
+        self._client_pid = None
+
+    @property
+    def client(self):
+        pid = os.getpid()
+        if self._client_pid != pid:
+            with self._lock:
+                if self._client_pid != pid:
+                    from botocore.config import Config as BotoConfig
+                    self._client = self._boto3.client(
+                        's3',
+                        endpoint_url=self.endpoint_url,
+                        aws_access_key_id=self.access_key,
+                        aws_secret_access_key=self.secret_key,
+                        region_name=self.region,
+                        # Retries are ours (with the circuit breaker), not botocore's
+                        config=BotoConfig(max_pool_connections=20, retries={'max_attempts': 1})
+                    )
+                    self._client_pid = pid
+        return self._client
+
+    def url_for(self, key):
+        return f"{self.public_url}/{key}"
+
+    def _classify(self, error):
+        from botocore.exceptions import ClientError, ConnectionError as BotoConnectionError, HTTPClientError
+        if isinstance(error, (BotoConnectionError, HTTPClientError)):
+            return TRANSIENT
+        if isinstance(error, ClientError):
+            code = error.response.get('Error', {}).get('Code', '')
+            status = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode', 0)
+            if code in ('NoSuchKey', 'NotFound', '404'):
+                return NOT_FOUND
+            if status >= 500 or status == 429 or code in ('SlowDown', 'Throttling', 'RequestTimeout'):
+                return TRANSIENT
+            return PERMANENT
+        return super()._classify(error)
+
+    def _put(self, key, reader, content_type):
+        # upload_fileobj streams in parts, never holding the whole object in memory
+        self.client.upload_fileobj(reader, self.bucket, key, ExtraArgs={'ContentType': content_type})
+        return self.url_for(key)
+
+    def _delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def _open(self, key, max_bytes):
+        body = self.client.get_object(Bucket=self.bucket, Key=key)['Body']
+        try:
+            return body.read(max_bytes + 1)
+        finally:
+            body.close()
+
+
+def create_storage(config, root_path):
+    """Build the storage backend selected by STORAGE_BACKEND"""
+    options = {
+        'retries': config['STORAGE_RETRIES'],
+        'breaker': CircuitBreaker(config['STORAGE_BREAKER_THRESHOLD'], config['STORAGE_BREAKER_RESET_SECONDS'])
+    }
+    backend = config['STORAGE_BACKEND']
+    if backend == 'local':
+        return LocalStorage(os.path.join(root_path, config['UPLOAD_FOLDER']), **options)
+    if backend == 'supabase':
+        return SupabaseStorage(config['SUPABASE_URL'], config['SUPABASE_SERVICE_ROLE_KEY'],
+                               bucket=config['STORAGE_BUCKET'], timeout=config['STORAGE_TIMEOUT'], **options)
+    if backend == 's3':
+        return S3Storage(config['S3_ENDPOINT_URL'], config['STORAGE_BUCKET'], config['S3_ACCESS_KEY'],
+                         config['S3_SECRET_KEY'], public_url=config['S3_PUBLIC_URL'], **options)
+    raise ValueError(f"Unsupported STORAGE_BACKEND: {backend}")
+
+
+class Storage:
+    """Process-wide handle on the configured backend (initialized in create_app)"""
+
+    def __init__(self):
+        self.backend = None
+
+    def init_app(self, app):
+        self.backend = create_storage(app.config, app.root_path)
+        print(f"[STORAGE] Using {self.backend.name} storage")
+
+    def __getattr__(self, name):
+        if self.backend is None:
+            raise StorageError("Storage is not configured")
+        return getattr(self.backend, name)
+
+
+# Global storage instance
+storage = Storage()
@@ -0,0 +1,70 @@
+"""
+serialize_issues must cost the same number of queries whatever the page size
+Run from backend/:  python -m pytest tests
+"""
+
+import os
+import sys
+
+import pytest
+from flask import Flask
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import db, Issue, User
+from serializers import serialize_issues
+
+PAGE_SIZES = (5, 20, 50)
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI='sqlite://', TESTING=True)
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        for i in range(10):
+            db.session.add(User(id=f'u{i}', username=f'user{i}', email=f'u{i}@example.rw'))
+        for j in range(max(PAGE_SIZES)):
+            db.session.add(Issue(title=f'Pothole {j}', description='Deep hole on the road', category='Roads',
+                                 district='Gasabo', province='Kigali', user_id=f'u{j % 10}'))
+        db.session.commit()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def count_statements(engine, callback):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        callback()
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    return len(statements)
+
+
+@pytest.mark.parametrize('include_reporter_contact', [False, True])
+def test_serialize_issues_query_count_is_constant(app, include_reporter_contact):
+    counts = {}
+    for per_page in PAGE_SIZES:
+        # A fresh session per page, as in a request, so nothing is served from the identity map
+        db.session.remove()
+        issues = Issue.query.order_by(Issue.created_at.desc(), Issue.id.desc()).limit(per_page).all()
+        assert len(issues) == per_page
+
+        results = []
+        counts[per_page] = count_statements(
+            db.engine, lambda: results.extend(serialize_issues(issues, include_reporter_contact))
+        )
+        assert len(results) == per_page
+        assert all(result['reporter_username'] for result in results)
+
+    assert len(set(counts.values())) == 1, counts
+    assert counts[PAGE_SIZES[0]] <= 1
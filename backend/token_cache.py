@@ -0,0 +1,121 @@
+"""
+Verified-token cache for CivicFix authentication
+Maps a token digest to what was learned when it was verified (claims and a user snapshot)
+so polled endpoints skip signature checks and user lookups on repeat requests
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+def token_digest(token):
+    """Cache key for a token; raw bearer tokens are never kept in memory"""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+class UserSnapshot:
+    """Detached copy of a User row's fields, safe to share between requests"""
+
+    FIELDS = ('id', 'email', 'username', 'phone', 'province', 'district', 'sector',
+              'is_admin', 'is_district_admin', 'is_email_verified', 'created_at')
+
+    def __init__(self, user):
+        for field in self.FIELDS:
+            setattr(self, field, getattr(user, field, None))
+        self._serialized = user.to_dict()
+
+    def to_dict(self):
+        return dict(self._serialized)
+
+    def __repr__(self):
+        return f'<UserSnapshot {self.email}>'
+
+
+class TokenCache:
+    """Bounded LRU of verified tokens.
+
+    Entries expire at the token's exp claim, or after max_ttl seconds so that
+    changes made on another worker are picked up; invalidate_user drops every
+    token of a user on this worker straight away.
+    """
+
+    def __init__(self, max_entries=1024, max_ttl=300):
+        self.max_entries = max_entries
+        self.max_ttl = max_ttl
+        self._entries = OrderedDict()  # digest -> (expires_at, user_id, value)
+        self._user_digests = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def configure(self, max_entries=None, max_ttl=None):
+        with self._lock:
+            if max_entries is not None:
+                self.max_entries = max_entries
+            if max_ttl is not None:
+                self.max_ttl = max_ttl
+            self._entries.clear()
+            self._user_digests.clear()
+
+    def get(self, token):
+        digest = token_digest(token)
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None or entry[0] <= time.time():
+                if entry is not None:
+                    self._remove(digest)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, token, value, user_id, exp=None):
+        """Cache value for token until exp (a unix timestamp) or max_ttl, whichever is sooner"""
+        expires_at = time.time() + self.max_ttl
+        if exp is not None:
+            expires_at = min(expires_at, float(exp))
+        digest = token_digest(token)
+        user_id = str(user_id)
+        with self._lock:
+            self._remove(digest)
+            self._entries[digest] = (expires_at, user_id, value)
+            self._user_digests.setdefault(user_id, set()).add(digest)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+        return value
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for digest in list(self._user_digests.get(str(user_id), ())):
+                self._remove(digest)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._user_digests.clear()
+
+    def _remove(self, digest):
+        entry = self._entries.pop(digest, None)
+        if entry is None:
+            return
+        digests = self._user_digests.get(entry[1])
+        if digests is not None:
+            digests.discard(digest)
+            if not digests:
+                del self._user_digests[entry[1]]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions
+            }
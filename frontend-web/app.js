@@ -177,13 +177,27 @@ class CivicFixApp {
         issuesContainer.innerHTML = this.issues.map(issue => this.createIssueCard(issue)).join('');
     }
 
+    // Card-sized variant of an issue image, resized by the backend (local uploads and Supabase Storage)
+    imageVariantUrl(imageUrl, width) {
+        if (!imageUrl) return '';
+        if (imageUrl.startsWith('/uploads/')) {
+            return `${API_BASE_URL}${imageUrl}?w=${width}&fmt=webp`;
+        }
+        const storedMarker = '/storage/v1/object/public/issue-images/';
+        const storedIndex = imageUrl.indexOf(storedMarker);
+        if (storedIndex !== -1) {
+            const filename = imageUrl.slice(storedIndex + storedMarker.length);
+            return `${API_BASE_URL}/api/images/stored/${encodeURIComponent(filename)}?w=${width}&fmt=webp`;
+        }
+        return imageUrl.startsWith('http') ? imageUrl : `${API_BASE_URL}${imageUrl}`;
+    }
+
     createIssueCard(issue) {
         const statusClass = issue.status.toLowerCase().replace(/\s+/g, '-');
-        // Use full URL for Supabase Storage images, prepend API_BASE_URL for local uploads
-        const imageSrc = issue.image_url ? 
-            (issue.image_url.startsWith('http') ? issue.image_url : `${API_BASE_URL}${issue.image_url}`) : '';
+        // Full images stay on the original URL; the feed card loads a small variant
+        const imageSrc = this.imageVariantUrl(issue.image_url, 640);
         const imageHtml = imageSrc ? 
-            `<img src="${imageSrc}" alt="Issue photo" class="issue-image">` : '';
+            `<img src="${imageSrc}" alt="Issue photo" class="issue-image" loading="lazy">` : '';
         
         // Format location information
         const locationInfo = this.formatLocationInfo(issue);
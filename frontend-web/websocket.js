@@ -1,4 +1,4 @@
-// WebSocket real-time notifications for CivicFix
+// Real-time notifications for CivicFix (Server-Sent Events, Socket.IO kept for reference)
 
 // API configuration is defined in auth.js and available as window.API_BASE_URL
 // No need to redeclare it here
@@ -6,6 +6,7 @@
 class WebSocketManager {
     constructor() {
         this.socket = null;
+        this.eventSource = null;
         this.isConnected = false;
         this.reconnectAttempts = 0;
         this.maxReconnectAttempts = 5;
@@ -14,8 +15,8 @@ class WebSocketManager {
     }
 
     init() {
-        // Socket.IO disabled - using HTTP polling instead
-        console.log('WebSocket disabled - using HTTP polling for real-time updates');
+        // Socket.IO disabled - using a Server-Sent Events stream, with HTTP polling as fallback
+        this.connectEventStream();
         // this.loadSocketIO().then(() => {
         //     this.connect();
         // }).catch(error => {
@@ -23,6 +24,95 @@ class WebSocketManager {
         // });
     }
 
+    connectEventStream() {
+        if (!window.EventSource) {
+            console.log('EventSource not supported - using HTTP polling for real-time updates');
+            return;
+        }
+
+        const token = this.getStreamToken();
+        this.streamToken = token;
+        const url = token
+            ? `${API_BASE_URL}/api/events/stream?token=${encodeURIComponent(token)}`
+            : `${API_BASE_URL}/api/events/stream`;
+
+        this.eventSource = new EventSource(url);
+
+        this.eventSource.onopen = () => {
+            console.log('Connected to CivicFix event stream - polling paused');
+            this.isConnected = true;
+            this.setPollingEnabled(false);
+        };
+
+        this.eventSource.onerror = () => {
+            // EventSource reconnects by itself (sending Last-Event-ID); poll meanwhile
+            if (this.isConnected) {
+                console.log('Event stream interrupted - resuming polling');
+            }
+            this.isConnected = false;
+            this.setPollingEnabled(true);
+        };
+
+        const handlers = {
+            status_update: (data) => this.handleStatusUpdate(data),
+            admin_update: (data) => this.handleAdminUpdate(data),
+            new_issue: (data) => this.handleNewIssue(data),
+            vote_update: (data) => this.handleVoteUpdate(data),
+            notification: () => this.updateNotificationDisplay()
+        };
+        Object.entries(handlers).forEach(([eventType, handler]) => {
+            this.eventSource.addEventListener(eventType, (event) => {
+                try {
+                    handler(JSON.parse(event.data));
+                } catch (error) {
+                    console.error(`Error handling ${eventType} event:`, error);
+                }
+            });
+        });
+
+        // Server dropped events for us (buffer overflow or history gap): reload once
+        this.eventSource.addEventListener('resync', () => this.handleResync());
+    }
+
+    getStreamToken() {
+        const adminToken = localStorage.getItem('admin_token');
+        if (adminToken) {
+            return adminToken;
+        }
+        if (window.authManager && authManager.token) {
+            return authManager.token;
+        }
+        return null;
+    }
+
+    getPollers() {
+        const citizenApp = window.app || (typeof app !== 'undefined' ? app : null);
+        return [citizenApp, window.adminDashboard].filter(poller =>
+            poller && typeof poller.startAutoRefresh === 'function' && typeof poller.stopAutoRefresh === 'function'
+        );
+    }
+
+    setPollingEnabled(enabled) {
+        this.getPollers().forEach(poller => {
+            if (enabled && !poller.autoRefreshInterval) {
+                poller.startAutoRefresh();
+            } else if (!enabled && poller.autoRefreshInterval) {
+                poller.stopAutoRefresh();
+            }
+        });
+    }
+
+    handleResync() {
+        this.getPollers().forEach(poller => {
+            if (typeof poller.loadIssues !== 'function') return;
+            if (poller === window.adminDashboard) {
+                poller.loadIssues(true);
+            } else {
+                poller.loadIssues(poller.currentPage || 1, true);
+            }
+        });
+    }
+
     loadSocketIO() {
         return new Promise((resolve, reject) => {
             if (window.io) {
@@ -109,6 +199,15 @@ class WebSocketManager {
     }
 
     joinUserRooms() {
+        // Event stream: rooms are derived from the token, so reconnect if the login changed
+        if (!this.socket) {
+            if (this.eventSource && this.getStreamToken() !== this.streamToken) {
+                this.eventSource.close();
+                this.connectEventStream();
+            }
+            return;
+        }
+
         // Citizen side: join user-specific room if authManager exists
         if (window.authManager && typeof authManager.isAuthenticated === 'function' && authManager.isAuthenticated()) {
             if (authManager.currentUser && authManager.currentUser.id) {
@@ -399,13 +498,13 @@ class WebSocketManager {
         // Update notification badge/count if exists
         const notificationBadge = document.getElementById('notification-badge');
         if (notificationBadge && window.authManager && typeof authManager.isAuthenticated === 'function' && authManager.isAuthenticated()) {
-            // Fetch latest notification count
-            fetch(`${API_BASE_URL}/api/notifications`, {
+            // Fetch latest unread count (a single counter read on the server)
+            fetch(`${API_BASE_URL}/api/notifications/unread-count`, {
                 headers: authManager.getAuthHeaders()
             })
             .then(response => response.json())
             .then(data => {
-                const unreadCount = data.notifications.filter(n => !n.is_read).length;
+                const unreadCount = data.unread_count || 0;
                 if (unreadCount > 0) {
                     notificationBadge.textContent = unreadCount;
                     notificationBadge.style.display = 'inline';
@@ -435,6 +534,11 @@ class WebSocketManager {
     }
 
     disconnect() {
+        if (this.eventSource) {
+            this.eventSource.close();
+            this.eventSource = null;
+            this.isConnected = false;
+        }
         if (this.socket) {
             this.socket.disconnect();
             this.socket = null;